@@ -0,0 +1,69 @@
+'''
+Helpers shared by the benchmarks: benchmark apps on their own database, synthetic question banks and statistics.
+'''
+import os
+import tempfile
+import time
+from unittest import mock
+
+from flaskr import create_app
+from models import db, Question, Category
+
+CATEGORIES = ['Science', 'Art', 'Geography', 'History', 'Entertainment', 'Sports']
+INSERT_CHUNK_SIZE = 10000
+
+# vocabulary of the synthetic question texts, 400 words of two syllables
+SYLLABLES = ['ka', 'lo', 'mi', 'ne', 'ru', 'sa', 'ti', 'vo', 'pe', 'da',
+             'fu', 'go', 'hi', 'je', 'bu', 'zo', 'wa', 'yi', 'ce', 'xo']
+WORDS = [first + second for first in SYLLABLES for second in SYLLABLES]
+
+
+def create_benchmark_app(database_uri, **settings):
+    '''
+    Creates the app on given database; further settings override the config, e.g. RESPONSE_CACHE_MAX_ENTRIES=0.
+    '''
+    settings_file = tempfile.NamedTemporaryFile('w', suffix='.cfg', delete=False)
+    settings_file.write(f'SQLALCHEMY_DATABASE_URI="{database_uri}"\nSQLALCHEMY_TRACK_MODIFICATIONS=False\n')
+    for key, value in settings.items():
+        settings_file.write(f'{key}={value!r}\n')
+    settings_file.close()
+    try:
+        # the previous TRIVIA_SETTINGS of the caller is restored afterwards
+        with mock.patch.dict(os.environ, {'TRIVIA_SETTINGS': settings_file.name}):
+            return create_app(test_config=True)
+    finally:
+        os.remove(settings_file.name)
+
+
+def seed(size, rng, categories=CATEGORIES):
+    '''
+    Inserts the categories and size synthetic questions spread randomly over them, each mentioning two words
+    of WORDS, within the app context of the benchmark app.
+    '''
+    db.session.execute(Category.__table__.insert(),
+                       [{'id': idx + 1, 'type': category_type} for idx, category_type in enumerate(categories)])
+    for start in range(0, size, INSERT_CHUNK_SIZE):
+        db.session.execute(Question.__table__.insert(), [{
+            'question': f'Synthetic question number {idx} about {rng.choice(WORDS)} and {rng.choice(WORDS)}?',
+            'answer': f'Answer {idx} {rng.choice(WORDS)}',
+            'difficulty': rng.randint(1, 5),
+            'category_id': rng.randint(1, len(categories))
+        } for idx in range(start, min(start + INSERT_CHUNK_SIZE, size))])
+    db.session.commit()
+
+
+def timed(fn, repeat):
+    '''
+    Calls fn repeat times and returns the durations in milliseconds.
+    '''
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def percentile(samples, p):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))]
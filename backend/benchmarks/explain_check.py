@@ -0,0 +1,106 @@
+'''
+Check of the query plans of the hot queries on a large synthetic question bank.
+
+Creates the schema through the migrations (flask db upgrade), seeds the bank, runs ANALYZE and prints the
+EXPLAIN plan of every hot query. Exits with status 1 if any of them scans the questions table sequentially
+instead of using an index, e.g. because an index is missing from the migrations.
+
+Runs on a temporary SQLite database by default; --database-uri runs it on an empty PostgreSQL database,
+which is downgraded to an empty schema again afterwards.
+
+Inspection
+----------
+> python -m benchmarks.explain_check --size 200000
+> python -m benchmarks.explain_check --database-uri postgresql://localhost:5432/trivia_explain
+'''
+import argparse
+import random
+import re
+import sys
+import tempfile
+
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import func, text
+
+# plan lines of a sequential scan of the questions table, for SQLite and PostgreSQL
+SEQUENTIAL_SCAN = re.compile(r'\bSCAN (TABLE )?questions\b(?! USING (INTEGER PRIMARY KEY|INDEX))|Seq Scan on questions')
+
+
+def hot_queries(category_id, question_ids):
+    '''
+    The queries of the endpoints by name, with the parameters of a mid-size category.
+    '''
+    from models import db, Question
+
+    category_rows = Question.rows().filter(Question.category_id == category_id)
+    return {
+        'category page': category_rows.order_by(Question.id).limit(10).offset(20),
+        'category cursor': category_rows.filter(Question.id > question_ids[0]).order_by(Question.id).limit(11),
+        'category count': db.session.query(func.count(Question.id)).filter(Question.category_id == category_id),
+        'question by id': Question.rows().filter(Question.id == question_ids[0]),
+        'questions by ids': Question.rows().filter(Question.id.in_(question_ids)),
+        'export category': category_rows.order_by(Question.id),
+        'export category and difficulty': category_rows.filter(Question.difficulty == 3).order_by(Question.id),
+    }
+
+
+def explain(query):
+    '''
+    The plan of query as lines of text.
+    '''
+    from models import db
+
+    dialect = db.engine.dialect
+    statement = str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.execute(text(prefix + statement)).fetchall()
+    # SQLite: (id, parent, notused, detail), PostgreSQL: (line,)
+    return [row[-1] for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Fail if the hot queries scan the questions table sequentially')
+    parser.add_argument('--size', type=int, default=200000, help='questions of the synthetic bank')
+    parser.add_argument('--categories', type=int, default=100, help='categories of the synthetic bank')
+    parser.add_argument('--database-uri', help='empty database to run the check on, default a temporary SQLite one')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from benchmarks.common import create_benchmark_app, seed
+    from models import db, Question
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_uri = args.database_uri or f'sqlite:///{tmp_dir}/trivia_explain.db'
+        app = create_benchmark_app(database_uri, DB_CREATE_ALL=False, DB_MIGRATE=True, WARM_UP=False)
+        with app.app_context():
+            upgrade()
+            try:
+                seed(args.size, random.Random(args.seed), [f'Category {idx}' for idx in range(args.categories)])
+                db.session.execute(text('ANALYZE'))
+                db.session.commit()
+
+                category_id = args.categories // 2
+                question_ids = [question_id for (question_id,) in db.session.query(Question.id)
+                                .filter(Question.category_id == category_id).order_by(Question.id).limit(20)]
+                failed = []
+                for name, query in hot_queries(category_id, question_ids).items():
+                    plan = explain(query)
+                    scans = any(SEQUENTIAL_SCAN.search(line) for line in plan)
+                    if scans:
+                        failed.append(name)
+                    print(f"{name}: {'SEQUENTIAL SCAN' if scans else 'ok'}")
+                    for line in plan:
+                        print(f'    {line}')
+            finally:
+                db.session.remove()
+                if args.database_uri:
+                    downgrade(revision='base')
+                db.engine.dispose()
+
+    if failed:
+        print(f"sequential scans of questions in: {', '.join(failed)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,287 @@
+'''
+Load generator replaying the requests of the Postman collection against a running server.
+
+Virtual users (--users) are started evenly over --ramp-up seconds and send requests for --duration seconds.
+Each iteration a user either plays a whole quiz (with probability --quiz-share) or sends one request of the
+collection, chosen by the weights of the traffic mix (--weight 'list questions=40' overrides a weight):
+* quizzes fetch the categories, pick one and ask /play for --quiz-length questions, as quiz session
+  (--quiz-mode session) or with the list of previous questions (--quiz-mode legacy), with --think-time between,
+* 'insert question' creates a question and remembers its id, 'delete question' deletes one of those
+  instead of the fixed id of the collection; the remaining ones are deleted after the test.
+
+Reports throughput, latency percentiles and error rates (status >= 400 or connection errors) per request,
+optionally as JSON (--output).
+
+Inspection
+----------
+> FLASK_APP=flaskr flask run
+> python -m benchmarks.load_test --users 20 --ramp-up 10 --duration 60
+'''
+import argparse
+import http.client
+import json
+import os
+import random
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+from benchmarks.common import percentile
+
+COLLECTION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'trivia.postman_collection.json')
+
+# share of the traffic per request of the collection, quizzes are simulated separately
+DEFAULT_WEIGHTS = {
+    'get categories': 10,
+    'list questions': 30,
+    'search question': 15,
+    'show categeories questions by id': 25,
+    'insert question': 2,
+    'delete question': 2,
+    'play trivia': 0,
+}
+QUIZ = 'quiz'
+PLAY = 'play (quiz)'
+START_QUIZ = 'get categories (quiz)'
+
+
+class Operation(NamedTuple):
+    name: str
+    method: str
+    path: str
+    body: Optional[bytes]
+
+
+def load_operations(collection_path: str) -> List[Operation]:
+    '''
+    Reads the requests of a Postman collection (v2.1), folders included.
+    '''
+    with open(collection_path) as collection_file:
+        collection = json.load(collection_file)
+
+    operations = []
+
+    def walk(items):
+        for item in items:
+            if 'item' in item:
+                walk(item['item'])
+                continue
+            request = item['request']
+            url = request['url'] if isinstance(request['url'], str) else request['url']['raw']
+            parts = urlsplit(url)
+            body = (request.get('body') or {}).get('raw')
+            operations.append(Operation(item['name'], request['method'],
+                                        parts.path + (f'?{parts.query}' if parts.query else ''),
+                                        body.encode() if body else None))
+
+    walk(collection['item'])
+    return operations
+
+
+class Stats:
+    ''' Latencies and errors per request name, shared by all users '''
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+        self.statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+
+    def record(self, name: str, latency_ms: float, status: Optional[int]):
+        with self._lock:
+            self.latencies[name].append(latency_ms)
+            self.statuses[name][status or 0] += 1
+            if status is None or status >= 400:
+                self.errors[name] += 1
+
+    def report(self, duration: float) -> List[dict]:
+        with self._lock:
+            return [{
+                'name': name,
+                'requests': len(latencies),
+                'throughput_per_second': round(len(latencies) / duration, 2),
+                'error_rate': round(self.errors[name] / len(latencies), 4),
+                'p50_ms': round(percentile(latencies, 50), 2),
+                'p95_ms': round(percentile(latencies, 95), 2),
+                'p99_ms': round(percentile(latencies, 99), 2),
+                'statuses': {str(status): count for status, count in sorted(self.statuses[name].items())}
+            } for name, latencies in sorted(self.latencies.items())]
+
+
+class VirtualUser(threading.Thread):
+    ''' Sends requests over its own persistent connection until stop_at '''
+
+    def __init__(self, load_test, rng: random.Random, start_at: float):
+        super().__init__(daemon=True)
+        self.load_test = load_test
+        self.rng = rng
+        self.start_at = start_at
+        self.connection = http.client.HTTPConnection(load_test.host, load_test.port, timeout=30)
+
+    def request(self, name: str, method: str, path: str, body: Optional[bytes] = None):
+        headers = {'Content-Type': 'application/json'} if body is not None else {}
+        start = time.perf_counter()
+        try:
+            self.connection.request(method, path, body=body, headers=headers)
+            response = self.connection.getresponse()
+            data = response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            self.connection.close()
+            data, status = None, None
+        self.load_test.stats.record(name, (time.perf_counter() - start) * 1000, status)
+        if status == 200 and data:
+            try:
+                return json.loads(data)
+            except ValueError:
+                return None
+        return None
+
+    def run(self):
+        time.sleep(max(0.0, self.start_at - time.monotonic()))
+        while time.monotonic() < self.load_test.stop_at:
+            name = self.rng.choices(self.load_test.mix_names, self.load_test.mix_weights)[0]
+            if name == QUIZ:
+                self.play_quiz()
+            else:
+                self.send(self.load_test.operations[name])
+        self.connection.close()
+
+    def send(self, operation: Operation):
+        if operation.name == 'delete question':
+            question_id = self.load_test.pop_created_question()
+            if question_id is None:
+                return
+            self.request(operation.name, operation.method, f'/questions/{question_id}')
+            return
+
+        data = self.request(operation.name, operation.method, operation.path, operation.body)
+        if operation.name == 'insert question' and data:
+            self.load_test.push_created_question(data['question']['id'])
+
+    def play_quiz(self):
+        data = self.request(START_QUIZ, 'GET', '/categories')
+        if not data or not data['categories']:
+            return
+        category_id, category_type = self.rng.choice(list(data['categories'].items()))
+        payload = {'quiz_category': {'type': category_type, 'id': str(category_id)}}
+        if self.load_test.quiz_mode == 'session':
+            payload['session'] = None
+        else:
+            payload['previous_questions'] = []
+
+        for _ in range(self.load_test.quiz_length):
+            time.sleep(self.load_test.think_time)
+            data = self.request(PLAY, 'POST', '/play', json.dumps(payload).encode())
+            if not data or not isinstance(data.get('question'), dict):
+                return
+            if self.load_test.quiz_mode == 'session':
+                payload['session'] = data['session']
+            else:
+                payload['previous_questions'].append(data['question']['id'])
+
+
+class LoadTest:
+    ''' Traffic mix, shared state and statistics of a load test against the server at base_url '''
+
+    def __init__(self, base_url: str, operations: List[Operation], weights: Dict[str, float], quiz_share: float,
+                 quiz_mode: str, quiz_length: int, think_time: float):
+        parts = urlsplit(base_url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.operations = {operation.name: operation for operation in operations}
+        operation_share = 1.0 - quiz_share
+        total_weight = sum(weights.get(name, 1) for name in self.operations) or 1
+        self.mix_names = list(self.operations) + [QUIZ]
+        self.mix_weights = [operation_share * weights.get(name, 1) / total_weight for name in self.operations] + \
+            [quiz_share]
+        self.quiz_mode = quiz_mode
+        self.quiz_length = quiz_length
+        self.think_time = think_time
+        self.stats = Stats()
+        self.stop_at = 0.0
+        self._created_lock = threading.Lock()
+        self._created_questions: List[int] = []
+
+    def push_created_question(self, question_id: int):
+        with self._created_lock:
+            self._created_questions.append(question_id)
+
+    def pop_created_question(self) -> Optional[int]:
+        with self._created_lock:
+            return self._created_questions.pop() if self._created_questions else None
+
+    def run(self, users: int, ramp_up: float, duration: float, seed: int) -> float:
+        '''
+        Runs the load test and returns the elapsed seconds.
+        '''
+        started_at = time.monotonic()
+        self.stop_at = started_at + duration
+        virtual_users = [VirtualUser(self, random.Random(seed + idx), started_at + ramp_up * idx / users)
+                         for idx in range(users)]
+        for user in virtual_users:
+            user.start()
+        for user in virtual_users:
+            user.join()
+        elapsed = time.monotonic() - started_at
+        self.delete_created_questions()
+        return elapsed
+
+    def delete_created_questions(self):
+        '''
+        Deletes the questions inserted by the load test that were not deleted during the test.
+        '''
+        connection = http.client.HTTPConnection(self.host, self.port, timeout=30)
+        question_id = self.pop_created_question()
+        while question_id is not None:
+            connection.request('DELETE', f'/questions/{question_id}')
+            connection.getresponse().read()
+            question_id = self.pop_created_question()
+        connection.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replay the Postman collection as weighted load against a server')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--collection', default=COLLECTION)
+    parser.add_argument('--users', type=int, default=10, help='concurrent virtual users')
+    parser.add_argument('--ramp-up', type=float, default=5.0, help='seconds until all users are started')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds of the whole test')
+    parser.add_argument('--weight', action='append', default=[], metavar='NAME=WEIGHT',
+                        help='weight of a request of the collection, by its name')
+    parser.add_argument('--quiz-share', type=float, default=0.3, help='share of iterations playing a whole quiz')
+    parser.add_argument('--quiz-mode', choices=['session', 'legacy'], default='session')
+    parser.add_argument('--quiz-length', type=int, default=5, help='questions per quiz')
+    parser.add_argument('--think-time', type=float, default=0.0, help='seconds between the questions of a quiz')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the report as JSON to this file')
+    args = parser.parse_args()
+
+    weights = dict(DEFAULT_WEIGHTS)
+    for weight in args.weight:
+        name, _, value = weight.rpartition('=')
+        weights[name] = float(value)
+
+    load_test = LoadTest(args.base_url, load_operations(args.collection), weights, args.quiz_share,
+                         args.quiz_mode, args.quiz_length, args.think_time)
+    elapsed = load_test.run(args.users, args.ramp_up, args.duration, args.seed)
+    report = load_test.stats.report(elapsed)
+
+    total = sum(entry['requests'] for entry in report)
+    errors = sum(round(entry['error_rate'] * entry['requests']) for entry in report)
+    print(f"{'request':<34} {'requests':>9} {'req/s':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for entry in report:
+        print(f"{entry['name']:<34} {entry['requests']:>9} {entry['throughput_per_second']:>8.1f} "
+              f"{entry['error_rate']:>7.2%} {entry['p50_ms']:>8.1f} {entry['p95_ms']:>8.1f} {entry['p99_ms']:>8.1f}")
+    print(f"{'total':<34} {total:>9} {total / elapsed:>8.1f} {errors / (total or 1):>7.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'users': args.users, 'ramp_up': args.ramp_up, 'duration': elapsed,
+                       'quiz_mode': args.quiz_mode, 'requests': report}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
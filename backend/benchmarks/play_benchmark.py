@@ -0,0 +1,78 @@
+'''
+Benchmark of /play for growing question banks.
+
+Generates synthetic question banks into temporary SQLite databases and measures, for every bank size,
+* the time to load the in-memory selection index,
+* the latency of /play mid-quiz (4 previous questions), which picks from the selection index,
+* the latency of the former ORDER BY random() query /play used before.
+
+Inspection
+----------
+> python -m benchmarks.play_benchmark --sizes 1000 10000 100000 1000000
+'''
+import argparse
+import random
+import statistics
+import tempfile
+
+from sqlalchemy.sql.expression import func
+
+from benchmarks.common import create_benchmark_app, seed, timed, percentile
+from models import db, Question, question_selection
+
+
+def run(size, repeat, rng):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        app = create_benchmark_app(f'sqlite:///{tmp_dir}/trivia_benchmark.db')
+        client = app.test_client()
+
+        with app.app_context():
+            seed(size, rng)
+            index_load_ms = timed(question_selection.reload, 1)[0]
+            sports_ids = [question_id for (question_id,) in
+                          db.session.query(Question.id).filter(Question.category_id == 6).limit(1000)]
+        previous_questions = rng.sample(sports_ids, 4)
+
+        def play():
+            response = client.post('/play', json={
+                'previous_questions': previous_questions,
+                'quiz_category': {'type': 'Sports', 'id': '6'}
+            })
+            assert response.status_code == 200, response.get_json()
+
+        def legacy_play_query():
+            with app.app_context():
+                Question.query \
+                    .filter(Question.category.has(type='Sports')) \
+                    .filter(~Question.id.in_(previous_questions)) \
+                    .order_by(func.random()) \
+                    .first()
+
+        play_ms = timed(play, repeat)
+        legacy_ms = timed(legacy_play_query, repeat)
+
+        with app.app_context():
+            db.session.remove()
+            db.get_engine(app).dispose()
+
+    return index_load_ms, play_ms, legacy_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark /play for growing question banks')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    print(f"{'questions':>10} {'index load ms':>14} {'/play p50 ms':>13} {'/play p95 ms':>13} "
+          f"{'ORDER BY random() p50 ms':>25}")
+    for size in args.sizes:
+        index_load_ms, play_ms, legacy_ms = run(size, args.repeat, rng)
+        print(f'{size:>10} {index_load_ms:>14.1f} {statistics.median(play_ms):>13.2f} '
+              f'{percentile(play_ms, 95):>13.2f} {statistics.median(legacy_ms):>25.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+'''
+Benchmark of the cold start of a worker: importing the app, create_app and the first requests.
+
+Every sample is a fresh Python process on a synthetic question bank in a temporary SQLite database, started in
+- 'default' mode: create_all on startup, Swagger docs parsed on the first request to /apispec_1.json,
+- 'fast' mode (FAST_STARTUP = True, WARM_UP = False): built spec, no create_all, no Flask-Migrate,
+- 'fast + warm-up' mode (FAST_STARTUP = True): additionally opens pool connections and loads the indexes
+  in create_app, so the first requests do not pay for it.
+
+Inspection
+----------
+> python -m benchmarks.startup_benchmark --size 10000 --repeat 10
+'''
+import argparse
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIRST_REQUESTS = [
+    ('GET', '/categories', None),
+    ('GET', '/questions', None),
+    ('POST', '/questions/search', {'searchTerm': 'question'}),
+    ('POST', '/play', {'previous_questions': [], 'quiz_category': {'type': 'Science', 'id': '1'}}),
+    ('GET', '/apispec_1.json', None),
+]
+
+
+def child():
+    '''
+    Measures one cold start in this process and prints the durations in ms as JSON.
+    '''
+    start = time.perf_counter()
+    from flaskr import create_app
+    imported = time.perf_counter()
+    app = create_app(test_config=True)
+    created = time.perf_counter()
+
+    timings = {'import_ms': (imported - start) * 1000, 'create_app_ms': (created - imported) * 1000}
+    client = app.test_client()
+    for method, path, body in FIRST_REQUESTS:
+        request_start = time.perf_counter()
+        response = client.open(path, method=method, json=body)
+        assert response.status_code == 200, f'{path}: {response.status_code}'
+        timings[f'{method} {path} ms'] = (time.perf_counter() - request_start) * 1000
+    timings['total_ms'] = (time.perf_counter() - start) * 1000
+    print(json.dumps(timings))
+
+
+def write_settings(path, database_uri, settings):
+    with open(path, 'w') as settings_file:
+        settings_file.write(f'SQLALCHEMY_DATABASE_URI="{database_uri}"\nSQLALCHEMY_TRACK_MODIFICATIONS=False\n')
+        for key, value in settings.items():
+            settings_file.write(f'{key}={value!r}\n')
+
+
+def cold_start(settings_path, log_file):
+    environment = dict(os.environ, TRIVIA_SETTINGS=settings_path, LOG_FILE=log_file)
+    output = subprocess.run([sys.executable, '-m', 'benchmarks.startup_benchmark', '--child'], cwd=BACKEND,
+                            env=environment, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the cold start of a worker in each startup mode')
+    parser.add_argument('--size', type=int, default=10000, help='questions of the synthetic bank')
+    parser.add_argument('--repeat', type=int, default=10, help='cold starts per mode')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child()
+        return
+    # imported here, the cold starts must import the app themselves
+    from benchmarks.common import create_benchmark_app, seed
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        database_uri = f'sqlite:///{tmp_dir}/trivia_startup.db'
+        spec_file = os.path.join(tmp_dir, 'apispec.json')
+        app = create_benchmark_app(database_uri, RESPONSE_CACHE_MAX_ENTRIES=0)
+        with app.app_context():
+            seed(args.size, random.Random(args.seed))
+        with app.test_request_context():
+            spec = app.swag.get_apispecs('apispec_1')
+        with open(spec_file, 'w') as output:
+            json.dump(spec, output)
+
+        modes = {
+            'default': {},
+            'fast': {'FAST_STARTUP': True, 'WARM_UP': False, 'SWAGGER_SPEC_FILE': spec_file},
+            'fast + warm-up': {'FAST_STARTUP': True, 'SWAGGER_SPEC_FILE': spec_file},
+        }
+        results = {}
+        for mode, settings in modes.items():
+            settings_path = os.path.join(tmp_dir, f'{len(results)}.cfg')
+            write_settings(settings_path, database_uri, settings)
+            samples = [cold_start(settings_path, os.path.join(tmp_dir, 'trivia.log')) for _ in range(args.repeat)]
+            results[mode] = {metric: round(statistics.median(sample[metric] for sample in samples), 2)
+                             for metric in samples[0]}
+
+    metrics = list(results['default'])
+    print(f"{'median ms':<34}" + ''.join(f'{mode:>16}' for mode in results))
+    for metric in metrics:
+        print(f'{metric[:-3]:<34}' + ''.join(f'{results[mode][metric]:>16.1f}' for mode in results))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump({'size': args.size, 'repeat': args.repeat, 'results': results}, output, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,34 @@
-import sys
-import traceback
-
-from flask import Flask
+import hmac
+import json
+import os
+import secrets
+import time
+from collections import Counter
+from functools import partial
+
+import click
+from flask import Flask, Response, abort, g, jsonify, request, stream_with_context
 from flasgger import Swagger
 from flasgger import swag_from
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import is_resource_modified
 from flask_cors import CORS
 from sqlalchemy.exc import IntegrityError
-from sqlalchemy.sql.expression import func
 
+from flaskr.bulk_import import parse_rows, category_map, question_values
+from flaskr.compression import Compression
+from flaskr.fieldsets import QUESTION_FIELDS, requested_fields, prefers_minimal, minimal
 from flaskr.logger import logger
+from flaskr.metrics import RequestMetrics, install_sql_timing, UNMATCHED_ROUTE, PROMETHEUS_CONTENT_TYPE
+from flaskr.pagination import is_cursor_request, paginate_query, paginate_ids
+from flaskr.profiling import RequestProfiler, SlowQueryLog, install_slow_query_recording
+from flaskr.quiz_session import new_quiz_session, load_quiz_session, dump_quiz_session, next_question_id
+from flaskr.request_schemas import compile_definitions, load_definitions, ValidationError
 from flaskr.validation import *
-from models import setup_db, Question, Category
+from flaskr.versions import ALL_CATEGORIES
+from flaskr.warm_up import WarmUp, open_connections
+from models import db, setup_db, install_postgres_search, Question, Category, question_counters, question_selection, \
+    question_search, data_versions, response_cache
 
 '''
 *********************************************************************************************************************
@@ -19,41 +37,312 @@ from models import setup_db, Question, Category
 '''
 
 QUESTIONS_PER_PAGE = 10
+MAX_QUESTIONS_PER_PAGE = 100
+EXPORT_BATCH_SIZE = 1000
+BULK_INSERT_BATCH_SIZE = 1000
+BULK_IMPORT_MAX_ERRORS = 1000
+PROFILING_ENABLED = False
+PROFILE_STORE_SIZE = 20
+SLOW_QUERY_THRESHOLD = 0.1
+SLOW_QUERY_LOG_SIZE = 100
+FAST_STARTUP = False
+READ_YOUR_WRITES_WINDOW = 5
+READ_YOUR_WRITES_COOKIE = 'trivia_read_primary_until'
+SWAGGER_SPEC_FILE = 'docs/apispec.json'
+COMPRESSION_ENABLED = True
+COMPRESSION_LEVEL = 6
+COMPRESSION_MIN_SIZE = 500
+
+
+def running_migrations():
+    '''
+    Whether the app is created by a flask db ... command, which creates the tables itself: db.create_all() would make
+    the baseline migration of a new database fail.
+    '''
+    ctx = click.get_current_context(silent=True)
+    while ctx is not None:
+        if ctx.info_name == 'db':
+            return True
+        ctx = ctx.parent
+    return False
+
 
 def create_app(test_config=None):
     # create and configure the app
     app = Flask(__name__)
     if test_config is None:
         app.config.from_pyfile('./app_local.cfg')
-        logger.debug(f"environment: {app.config}")
+        logger.debug('environment: %s', app.config)
     elif test_config:
         app.config.from_pyfile('./app_test.cfg')
-        logger.debug(f"environment: {app.config}")
+        logger.debug('environment: %s', app.config)
+    # optional overrides, e.g. for benchmarks against a different database
+    app.config.from_envvar('TRIVIA_SETTINGS', silent=True)
+    # secrets are not committed: SECRET_KEY comes from the environment (or the TRIVIA_SETTINGS file)
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY') or app.config['SECRET_KEY']
+    if not app.config['SECRET_KEY']:
+        logger.warning('SECRET_KEY is not set, using a random key: quiz sessions are only valid in this process')
+        app.config['SECRET_KEY'] = secrets.token_hex(32)
+    # likewise ADMIN_TOKEN; without one the admin endpoints and profiling are disabled
+    app.config['ADMIN_TOKEN'] = os.environ.get('ADMIN_TOKEN') or app.config.get('ADMIN_TOKEN')
+    if not app.config['ADMIN_TOKEN']:
+        logger.info('ADMIN_TOKEN is not set, the admin endpoints are disabled')
+
+    app.config.setdefault('QUESTIONS_PER_PAGE', QUESTIONS_PER_PAGE)
+    app.config.setdefault('MAX_QUESTIONS_PER_PAGE', MAX_QUESTIONS_PER_PAGE)
+    app.config.setdefault('EXPORT_BATCH_SIZE', EXPORT_BATCH_SIZE)
+    app.config.setdefault('BULK_INSERT_BATCH_SIZE', BULK_INSERT_BATCH_SIZE)
+    app.config.setdefault('BULK_IMPORT_MAX_ERRORS', BULK_IMPORT_MAX_ERRORS)
+    app.config.setdefault('PROFILING_ENABLED', PROFILING_ENABLED)
+    app.config.setdefault('PROFILE_STORE_SIZE', PROFILE_STORE_SIZE)
+    app.config.setdefault('SLOW_QUERY_THRESHOLD', SLOW_QUERY_THRESHOLD)
+    app.config.setdefault('SLOW_QUERY_LOG_SIZE', SLOW_QUERY_LOG_SIZE)
+    # production startup mode, see README: tables only come from migrations, docs from a built spec
+    fast_startup = app.config.setdefault('FAST_STARTUP', FAST_STARTUP)
+    app.config.setdefault('DB_CREATE_ALL', not fast_startup and not running_migrations())
+    # the flask CLI (flask db ...) always gets Flask-Migrate
+    app.config.setdefault('DB_MIGRATE', not fast_startup or click.get_current_context(silent=True) is not None)
+    app.config.setdefault('WARM_UP', fast_startup)
+    app.config.setdefault('SWAGGER_SPEC_FILE', SWAGGER_SPEC_FILE)
+    app.config.setdefault('READ_YOUR_WRITES_WINDOW', READ_YOUR_WRITES_WINDOW)
+    app.config.setdefault('COMPRESSION_ENABLED', COMPRESSION_ENABLED)
+    app.config.setdefault('COMPRESSION_LEVEL', COMPRESSION_LEVEL)
+    app.config.setdefault('COMPRESSION_MIN_SIZE', COMPRESSION_MIN_SIZE)
 
     app.config['SWAGGER'] = {
         'title': 'Trivia API',
         'uiversion': 3,
     }
     Swagger(app)
+    spec_file = os.path.join(app.root_path, app.config['SWAGGER_SPEC_FILE'])
+    if fast_startup and os.path.exists(spec_file):
+        # served instead of parsing all docs on the first request of every worker
+        with open(spec_file) as spec:
+            app.swag.apispecs['apispec_1'] = json.load(spec)
+        request_schemas = compile_definitions(app.swag.apispecs['apispec_1']['definitions'])
+    else:
+        # request bodies are validated against the definitions of the API docs, compiled once
+        request_schemas = compile_definitions(load_definitions(os.path.join(app.root_path, 'docs', 'definitions.yaml')))
 
     setup_db(app)
 
     # Seting up CORS. Allow '*' for origins.
     CORS(app)  # , resources={r"/api/*": {"origins": "*"}}
 
+    @app.cli.command('install-search')
+    def install_search():
+        '''
+        Adds the PostgreSQL full-text search columns, trigger and indexes to an existing database.
+        '''
+        install_postgres_search()
+
+    @app.cli.command('init-db')
+    def init_db():
+        '''
+        Creates the tables of a new database, for deployments that start workers with DB_CREATE_ALL = False,
+        and marks it as migrated to the latest revision. Existing databases are upgraded with flask db upgrade.
+        '''
+        from flask_migrate import stamp
+        db.create_all()
+        stamp()
+
+    @app.cli.command('build-spec')
+    def build_spec():
+        '''
+        Writes the Swagger spec to SWAGGER_SPEC_FILE, which workers load in fast startup mode.
+        '''
+        with app.test_request_context():
+            spec = app.swag.get_apispecs('apispec_1')
+        with open(spec_file, 'w') as output:
+            json.dump(spec, output, indent=1)
+        click.echo(f'written {spec_file}')
+
+    warm_up = WarmUp()
+    app.extensions['warm_up'] = warm_up
+
+    @warm_up.step('pool')
+    def open_pool_connections():
+        engine = db.get_engine(app)
+        open_connections(engine, app.config.get('WARM_UP_CONNECTIONS', getattr(engine.pool, 'size', lambda: 1)()))
+
+    warm_up.step('question_counters')(question_counters.reconcile)
+    warm_up.step('question_selection')(question_selection.reload)
+    warm_up.step('data_versions')(data_versions.reconcile)
+
+    @warm_up.step('question_search')
+    def load_question_search():
+        if not Question.uses_full_text_search():
+            question_search.reload()
+
+    request_metrics = RequestMetrics()
+    install_sql_timing()
+
+    @app.before_request
+    def start_metrics():
+        '''
+        Registered first, so every request is measured, including requests answered by another before_request hook.
+        '''
+        request_metrics.start()
+
+    @app.after_request
+    def finish_metrics(response):
+        '''
+        Registered first, so it runs after all other after_request hooks.
+        '''
+        route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+        request_metrics.finish(route, request.method, response.status_code)
+        return response
+
+    request_profiler = RequestProfiler(app.config['PROFILE_STORE_SIZE'])
+    app.extensions['slow_queries'] = SlowQueryLog(app.config['SLOW_QUERY_THRESHOLD'], app.config['SLOW_QUERY_LOG_SIZE'])
+    install_slow_query_recording()
+
+    @app.before_request
+    def start_profile():
+        '''
+        Profiles the request if PROFILING_ENABLED and the X-Profile header carries the ADMIN_TOKEN.
+        '''
+        g.profiler = None
+        if app.config['PROFILING_ENABLED'] and is_admin_token(request.headers.get('X-Profile', '')):
+            g.profiler = request_profiler.start()
+
+    @app.after_request
+    def finish_profile(response):
+        '''
+        Reports the id of the profile; the profiler is stopped by stop_profile, which also runs if a later
+        after_request hook fails.
+        '''
+        if g.get('profiler') is not None:
+            g.profile_status = response.status_code
+            if g.get('profile_id') is None:
+                g.profile_id = request_profiler.next_id()
+            response.headers['X-Profile-Id'] = str(g.profile_id)
+        return response
+
+    @app.teardown_request
+    def stop_profile(exception):
+        profiler = g.pop('profiler', None)
+        if profiler is not None:
+            route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+            status = g.get('profile_status', 500) if exception is None else 500
+            request_profiler.stop(profiler, route, request.method, status, g.get('profile_id'))
+
+    @app.before_request
+    def track_pool():
+        app.extensions['pool_metrics'].track()
+
+    # GET endpoints not derived from the questions, which are not validated by the data versions
+    unversioned_endpoints = {'static', 'get_metrics', 'get_profiles', 'get_profile', 'get_slow_queries',
+                             'get_pool_metrics', 'get_cache_stats'}
+
+    # POST endpoints that only read, their queries go to replicas like those of GET endpoints
+    read_only_endpoints = {'search_questions', 'play_trivia'}
+
+    @app.before_request
+    def route_reads():
+        '''
+        Marks reading requests for the read replicas (SQLALCHEMY_REPLICA_URIS), unless the client wrote within
+        the last READ_YOUR_WRITES_WINDOW seconds: it then reads from the primary, so it sees its own writes.
+        '''
+        if app.extensions.get('replicas') is None:
+            return
+        try:
+            reads_own_writes = float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time()
+        except ValueError:
+            reads_own_writes = False
+        g.use_replica = (request.method in ('GET', 'HEAD') or request.endpoint in read_only_endpoints) \
+            and not reads_own_writes
+        # the cache may hold a response read from a replica that has not caught up with the write yet
+        g.bypass_response_cache = reads_own_writes
+
+    @app.after_request
+    def remember_write(response):
+        if app.extensions.get('replicas') is not None and request.method not in ('GET', 'HEAD', 'OPTIONS') \
+                and request.endpoint not in read_only_endpoints and response.status_code < 400:
+            window = app.config['READ_YOUR_WRITES_WINDOW']
+            response.set_cookie(READ_YOUR_WRITES_COOKIE, f'{time.time() + window:.3f}', max_age=window,
+                                httponly=True)
+        return response
+
+    @app.before_request
+    def conditional_get():
+        '''
+        Answers GET requests with 304 Not Modified, before any query, if the client's copy (If-None-Match /
+        If-Modified-Since) matches the data version of the questions, per category for category routes.
+        '''
+        g.etag = None
+        if request.method not in ('GET', 'HEAD') or request.endpoint not in app.view_functions \
+                or request.endpoint in unversioned_endpoints or '.' in request.endpoint:
+            return None
+        category_id = (request.view_args or {}).get('category_id', ALL_CATEGORIES)
+        g.etag = data_versions.etag(category_id)
+        g.last_modified = data_versions.last_modified(category_id)
+        if not is_resource_modified(request.environ, etag=g.etag, last_modified=g.last_modified):
+            response = Response(status=304)
+            if app.extensions['compression'] is not None:
+                # the 200 varies by Accept-Encoding, and so does the 304 validating it
+                response.vary.add('Accept-Encoding')
+            return response
+
+    app.extensions['compression'] = Compression(app.config['COMPRESSION_LEVEL'], app.config['COMPRESSION_MIN_SIZE']) \
+        if app.config['COMPRESSION_ENABLED'] else None
+
+    @app.after_request
+    def compress_response(response):
+        '''
+        gzip compresses responses for clients accepting it, after the validators are set and before the request
+        is measured; responses of the response cache come compressed already.
+        '''
+        compression = app.extensions['compression']
+        return compression.apply(request, response) if compression is not None else response
+
     @app.after_request
     def after_request(response):
         '''
         after_request decorator to set Access-Control-Allow
+        and the validators (ETag, Last-Modified) of versioned GET responses; they are computed on the primary,
+        so responses read from a replica right after a write, which may not have caught up with it, get none
         '''
         response.headers.add('Access-Control-Allow-Origin', '*')
-        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization')
-        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,DELETE')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type,Authorization,Prefer')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,PUT,POST,PATCH,DELETE')
+        validated = response.status_code == 304 or not g.get('use_replica') or response_cache.stores_replica_reads()
+        if g.get('etag') and response.status_code in (200, 304) and validated:
+            response.set_etag(g.etag, weak=True)
+            if g.last_modified is not None:
+                # Werkzeug sends the current time for None, which would never validate
+                response.last_modified = g.last_modified
+            response.cache_control.no_cache = True
         return response
 
+    @app.teardown_request
+    def teardown_request(exception):
+        '''
+        Ends the database session of every request in one place, returning its connection to the pool.
+        Streamed responses keep the request context, and with it the session, until the stream is finished.
+        '''
+        Question.db_close()
+
+    def is_admin_token(token):
+        '''
+        Checks token against the configured ADMIN_TOKEN; always False if no ADMIN_TOKEN is configured.
+        '''
+        admin_token = app.config.get('ADMIN_TOKEN')
+        return bool(admin_token) and hmac.compare_digest(token.encode(), admin_token.encode())
+
+    def require_admin():
+        '''
+        Aborts with 403 unless the request carries the configured ADMIN_TOKEN as bearer token.
+        Admin endpoints are disabled if no ADMIN_TOKEN is configured.
+        '''
+        authorization = request.headers.get('Authorization', '')
+        if not authorization.startswith('Bearer ') or not is_admin_token(authorization[len('Bearer '):]):
+            abort(403)
+
 
     @app.route('/categories')
     @swag_from('docs/get_categories.yaml')
+    @response_cache.cached
     def get_categories():
         '''
         Endpoint to handle GET requests for all available categories.
@@ -65,7 +354,7 @@ def create_app(test_config=None):
                 for category in categories:
                     category_types[category.id] = category.type
         except:
-            logger.error(f'{request.path}: 404 with {sys.exc_info()} and trace: {traceback.format_exc()}')
+            logger.exception('%s: 404', request.path)
             abort(404)
 
         return jsonify({
@@ -74,16 +363,73 @@ def create_app(test_config=None):
         })
 
 
-    def paginate_questions(request, filter_func=lambda: True):
-        page = request.args.get('page', 1, type=int)
-        questions = Question.query.order_by(
-            Question.id.asc()
-        ).filter(filter_func()).paginate(page, per_page=QUESTIONS_PER_PAGE).items
-        if len(questions) > 0:
-            formatted_questions = [q.format() for q in questions]
-            return formatted_questions
+    def paginate_questions(request, conditions=(), total=None, fields=None):
+        '''
+        Returns a page of formatted questions matching conditions and the total number of questions of the
+        listing as dictionary to be merged into the response. See paginate_query for offset and keyset (cursor)
+        pagination. Pass total if it is known (e.g. from question_counters), otherwise it is selected along with
+        the page. Only the columns of fields (default ?fields=..., all fields without it) are selected.
+        '''
+        fields = fields or requested_fields(request)
+        page = paginate_query(request, Question.rows(fields).filter(*conditions), Question.id, total=total)
+        return page.to_response(partial(Question.format_row, fields=fields))
+
+    def paginate_search(request, search_term, include_answers, ranked):
+        '''
+        Returns a page of formatted questions matching search_term and their total, see paginate_questions.
+        '''
+        fields = requested_fields(request)
+        if Question.uses_full_text_search():
+            query, rank = Question.full_text_search(search_term, include_answers, fields)
+            page = paginate_query(request, query, Question.id, order_by=(rank,) if ranked else ())
         else:
-            return []
+            ids = question_search.search(search_term, include_answers, ranked and not is_cursor_request(request))
+            page = paginate_ids(request, ids)
+            page.items = questions_by_ids(page.items, fields)
+        return page.to_response(partial(Question.format_row, fields=fields))
+
+    def questions_by_ids(ids, fields=None):
+        '''
+        Loads the question rows (only fields, if given) with given ids, keeping the order of ids.
+        '''
+        questions = {question.id: question for question in Question.rows(fields).filter(Question.id.in_(ids))} \
+            if ids else {}
+        return [questions[question_id] for question_id in ids if question_id in questions]
+
+    def question_conditions(data):
+        '''
+        Conditions selecting the questions of a bulk request by 'ids', 'category', 'difficulty', 'min_id' and
+        'max_id'; aborts with 422 if none is given, so a bulk request never hits all questions by accident.
+        '''
+        conditions = []
+        if 'ids' in data:
+            conditions.append(Question.id.in_(data['ids']))
+        if 'category' in data:
+            conditions.append(Question.category_id == data['category'])
+        if 'difficulty' in data:
+            conditions.append(Question.difficulty == data['difficulty'])
+        if 'min_id' in data:
+            conditions.append(Question.id >= data['min_id'])
+        if 'max_id' in data:
+            conditions.append(Question.id <= data['max_id'])
+        if not conditions:
+            message = "Error: select the questions by 'ids', 'category', 'difficulty', 'min_id' or 'max_id'"
+            logger.error('%s: 422 %s', request.path, message)
+            abort(422, description=message)
+        return conditions
+
+    def validated_json(schema_name):
+        '''
+        The JSON body of the request, parsed once; aborts with 400 unless it is JSON and
+        with 422 listing all errors unless it matches the request schema.
+        '''
+        data = extract_incoming_json(request)
+        try:
+            request_schemas[schema_name].validate(data)
+        except ValidationError as validation_error:
+            logger.error('%s: 422 %s', request.path, validation_error.description)
+            raise
+        return data
 
     def question_or_abort(question_id):
         question = Question.query.filter(Question.id == question_id).one_or_none()
@@ -92,8 +438,63 @@ def create_app(test_config=None):
         else:
             return question
 
+    def random_question(category_id, previous_question_ids):
+        '''
+        Picks a random question of given category (all categories for None) not in previous_question_ids
+        using the in-memory selection index and loads only the picked row.
+        '''
+        question_id = question_selection.pick(category_id, previous_question_ids)
+        while question_id is not None:
+            question = Question.rows().filter(Question.id == question_id).one_or_none()
+            if question is not None:
+                return question
+            # deleted by another process since the index was loaded
+            question_selection.remove(question_id)
+            question_id = question_selection.pick(category_id, previous_question_ids)
+        return None
+
+    def random_questions(category_id, previous_question_ids, count):
+        '''
+        Picks up to count distinct random questions of given category not in previous_question_ids, filled up
+        with questions of all categories when the category runs out, and loads all of them with one query.
+        '''
+        questions = []
+        exclude = set(previous_question_ids)
+        while len(questions) < count:
+            missing = count - len(questions)
+            ids = question_selection.pick_many(category_id, missing, exclude) if category_id is not None else []
+            if len(ids) < missing:
+                ids += question_selection.pick_many(None, missing - len(ids), exclude.union(ids))
+            if not ids:
+                break
+            exclude.update(ids)
+            loaded = questions_by_ids(ids)
+            questions.extend(loaded)
+            # deleted by another process since the index was loaded, picked again
+            for question_id in set(ids) - {question.id for question in loaded}:
+                question_selection.remove(question_id)
+        return questions
+
+    def next_session_questions(quiz_session, count):
+        '''
+        The next count questions of a quiz session (fewer at its end) and the advanced session.
+        '''
+        questions = []
+        while len(questions) < count:
+            ids = []
+            while len(ids) < count - len(questions):
+                question_id, quiz_session = next_question_id(quiz_session, question_selection)
+                if question_id is None:
+                    break
+                ids.append(question_id)
+            if not ids:
+                break
+            questions.extend(questions_by_ids(ids))
+        return questions, quiz_session
+
     @app.route('/questions')
     @swag_from('docs/get_questions.yaml')
+    @response_cache.cached
     def get_questions():
         '''
         GET questions
@@ -103,16 +504,23 @@ def create_app(test_config=None):
          * number of total questions
          * current category
          * categories.
+
+        With ?fields=..., 'categories' is one of the fields, the category map is only queried if it is requested.
         '''
+        fields = requested_fields(request, allowed=QUESTION_FIELDS + ('categories',))
+        question_fields = tuple(field for field in fields if field != 'categories') if fields else None
         try:
-            return jsonify({
+            response = {
                 'success': True,
-                'questions': paginate_questions(request),
-                'total_questions': Question.count(),
-                'categories': {category.id: category.type for category in Category.query.all()}
-            })
+                **paginate_questions(request, total=question_counters.total(), fields=question_fields)
+            }
+            if fields is None or 'categories' in fields:
+                response['categories'] = {category.id: category.type for category in Category.query.all()}
+            return jsonify(response)
+        except HTTPException:
+            raise
         except:
-            logger.error(f'{request.path}: 404 with {sys.exc_info()} and trace: {traceback.format_exc()}')
+            logger.exception('%s: 404', request.path)
             abort(404)
 
 
@@ -121,6 +529,7 @@ def create_app(test_config=None):
     def delete_questions(question_id):
         '''
         Endpoint to DELETE question using a question ID.
+        With Prefer: return=minimal, the page of remaining questions is left out.
         '''
         try:
             question = question_or_abort(question_id)
@@ -128,16 +537,71 @@ def create_app(test_config=None):
                 abort(404)
             question.delete()
 
+            if prefers_minimal(request):
+                return minimal(jsonify({'success': True, 'deleted': question_id}))
             return jsonify({
                 'success': True,
                 'deleted': question_id,
-                'questions': paginate_questions(request),
-                'total_questions': Question.count()
+                **paginate_questions(request, total=question_counters.total())
             })
+        except HTTPException:
+            raise
         except:
             abort(404)
-        finally:
-            Question.db_close()
+
+
+    @app.route('/questions', methods=['DELETE'])
+    @swag_from('docs/bulk_delete_questions.yaml')
+    def bulk_delete_questions():
+        '''
+        Endpoint to DELETE all questions with given ids and/or matching a filter with a single statement.
+        '''
+        data: json = validated_json('BulkDeleteQuestionsRequest')
+        conditions = question_conditions(data)
+
+        try:
+            return jsonify({
+                'success': True,
+                'deleted': Question.delete_where(*conditions)
+            })
+        except Exception:
+            Question.rollback()
+            logger.exception('%s: 500', request.path)
+            abort(500)
+
+
+    @app.route('/questions', methods=['PATCH'])
+    @swag_from('docs/bulk_update_questions.yaml')
+    def bulk_update_questions():
+        '''
+        Endpoint to PATCH category and/or difficulty of all questions with given ids and/or matching a filter
+        with a single statement.
+        '''
+        data: json = validated_json('BulkUpdateQuestionsRequest')
+        conditions = question_conditions(data)
+
+        values = {}
+        if 'category' in data['set']:
+            values['category_id'] = data['set']['category']
+        if 'difficulty' in data['set']:
+            values['difficulty'] = data['set']['difficulty']
+        try:
+            assert values, "Error: 'set' needs a 'category' or a 'difficulty'"
+            assert 'category_id' not in values or Category.query.get(values['category_id']) is not None, \
+                f"Error: category {values.get('category_id')} does not exist"
+        except AssertionError as assert_error:
+            logger.error('%s: 422 %s', request.path, assert_error)
+            abort(422, description=str(assert_error))
+
+        try:
+            return jsonify({
+                'success': True,
+                'updated': Question.update_where(values, *conditions)
+            })
+        except Exception:
+            Question.rollback()
+            logger.exception('%s: 500', request.path)
+            abort(500)
 
 
     @app.route('/questions', methods=['POST'])
@@ -147,46 +611,115 @@ def create_app(test_config=None):
         Endpoint to POST a new question,
         which will require the question and answer text,
         category, and difficulty score.
+        With Prefer: return=minimal, only the id of the new question is returned.
         '''
-        try:
-            data: json = extract_incoming_json(request)
-        except Exception as e:
-            abort(400, description=f'Bad request with {e}')
-
-        try:
-            assert valid_string(data, "question"), INVALID_STRING_VALUE_MESSAGE % 'question'
-            assert valid_string(data, "answer"), INVALID_STRING_VALUE_MESSAGE % 'answer'
-            assert valid_int(data, "category"), INVALID_STRING_VALUE_MESSAGE % 'category'
-            assert valid_int(data, "difficulty"), INVALID_INTEGER_VALUE_MESSAGE % 'difficulty'
-
-        except AssertionError as assert_error:
-            logger.error(f'{request.path}: 442 {assert_error}')
-            abort(422, description=str(assert_error))
+        data: json = validated_json('CreateQuestionRequest')
 
-        category = Category.query.filter_by(id=data['category']).first()
+        category = Category.query.filter_by(id=int(data['category'])).first()
 
+        # both may be strings of digits, the counters are keyed by int
         question = Question(
             question=data['question'],
             answer=data['answer'],
-            difficulty=data['difficulty'],
+            difficulty=int(data['difficulty']),
             category=category
         )
 
         try:
-            question.insert()
+            question_id = question.insert()
+            if prefers_minimal(request):
+                # question.format() would reload the committed row
+                return minimal(jsonify({'success': True, 'created': question_id}))
             return jsonify({
                 'success': True,
                 'question': question.format()
             })
         except IntegrityError:
-            logger.error(f'{request.path}: 404 with {sys.exc_info()} and trace: {traceback.format_exc()}')
-            abort(404,
-                  description=f"IntegrityError, question was already inserted {sys.exc_info()} and trace: {traceback.format_exc()}")
+            logger.exception('%s: 404', request.path)
+            abort(404, description="IntegrityError, question was already inserted")
         except:
-            logger.error(f'{request.path}: 404 with {sys.exc_info()} and trace: {traceback.format_exc()}')
-            abort(404, description=f"{sys.exc_info()} and trace: {traceback.format_exc()}")
-        finally:
-            Question.db_close()
+            logger.exception('%s: 404', request.path)
+            abort(404)
+
+
+    @app.route('/questions/bulk', methods=['POST'])
+    @swag_from('docs/bulk_create_questions.yaml')
+    def bulk_create_questions():
+        '''
+        Endpoint to POST many questions at once as NDJSON (one question object per line)
+        or CSV (header: question,answer,category,difficulty). Categories can be given by id or type.
+
+        Rows are validated while the body is streamed and inserted in batches of BULK_INSERT_BATCH_SIZE
+        (?batch_size=N) using executemany within a single transaction. Invalid rows are reported by line;
+        with ?atomic=true nothing is inserted if any row is invalid.
+        '''
+        batch_size = request.args.get('batch_size', app.config['BULK_INSERT_BATCH_SIZE'], type=int)
+        atomic = request.args.get('atomic', 'false').lower() == 'true'
+        max_errors = app.config['BULK_IMPORT_MAX_ERRORS']
+
+        try:
+            assert batch_size > 0, INVALID_INTEGER_VALUE_MESSAGE % 'batch_size'
+            rows = parse_rows(request.mimetype, request.stream)
+        except (AssertionError, ValueError) as error:
+            logger.error('%s: 400 %s', request.path, error)
+            abort(400, description=str(error))
+
+        categories = category_map(Category.query.all())
+        inserted = Counter()
+        errors = []
+        error_count = 0
+        batch = []
+
+        def insert_batch():
+            Question.insert_many(batch)
+            inserted.update((values['category_id'], values['difficulty']) for values in batch)
+            batch.clear()
+
+        try:
+            for line_number, row, error in rows:
+                if error is None:
+                    try:
+                        values = question_values(row, categories)
+                    except ValueError as e:
+                        error = str(e)
+                if error is not None:
+                    error_count += 1
+                    if len(errors) < max_errors:
+                        errors.append({'line': line_number, 'message': error})
+                    continue
+                if atomic and error_count:
+                    # rolled back anyway, only keep validating
+                    continue
+
+                batch.append(values)
+                if len(batch) >= batch_size:
+                    insert_batch()
+
+            if atomic and error_count:
+                Question.rollback()
+                return jsonify({
+                    'success': False,
+                    'inserted': 0,
+                    'rejected': error_count,
+                    'errors': errors
+                }), 422
+
+            if batch:
+                insert_batch()
+            Question.commit_many(inserted)
+
+            return jsonify({
+                'success': True,
+                'inserted': sum(inserted.values()),
+                'rejected': error_count,
+                'errors': errors
+            })
+        except HTTPException:
+            raise
+        except Exception:
+            Question.rollback()
+            logger.exception('%s: 500', request.path)
+            abort(500)
 
 
     @app.route('/questions/search', methods=['POST'])
@@ -194,43 +727,64 @@ def create_app(test_config=None):
     def search_questions():
         '''
         Endpoint to get questions based on a search term.
-        It should return any questions for whom the search term
-        is a substring of the question.
+        It returns all questions containing every word of the search term (words of at least
+        3 characters match as prefix), optionally searching the answers as well ('includeAnswers').
+        Results are ordered by relevance unless 'rank' is false or keyset pagination is used.
         '''
+        data: json = validated_json('SearchQuestionsRequest')
+        search_term = data['searchTerm']
+
         try:
-            data: json = extract_incoming_json(request)
+            return jsonify({
+                'success': True,
+                **paginate_search(request, search_term, data.get('includeAnswers', False), data.get('rank', True))
+            })
+        except HTTPException:
+            raise
         except Exception as e:
-            abort(400, description=f'Bad request with {e}')
+            logger.exception('%s: 404', request.path)
+            abort(404)
+
+
+    @app.route('/questions/export')
+    @swag_from('docs/export_questions.yaml')
+    def export_questions():
+        '''
+        GET endpoint to export all questions as newline delimited JSON (NDJSON), ordered by id,
+        optionally filtered by category and difficulty.
 
+        Rows are streamed from a server-side cursor in batches of EXPORT_BATCH_SIZE,
+        so memory stays constant and the first rows are sent right away. The request context,
+        and with it the database session, is kept until the stream is finished.
+        '''
+        filters = []
         try:
-            assert valid_string(data, "searchTerm"), INVALID_STRING_VALUE_MESSAGE % 'searchTerm'
-            search_term = data.get('searchTerm', '')
-            assert len(search_term) > 3, "Search term too short, type at least 3 characters"
+            if 'category' in request.args:
+                assert check_int(request.args['category']), INVALID_INTEGER_VALUE_MESSAGE % 'category'
+                filters.append(Question.category_id == int(request.args['category']))
+            if 'difficulty' in request.args:
+                assert check_int(request.args['difficulty']), INVALID_INTEGER_VALUE_MESSAGE % 'difficulty'
+                filters.append(Question.difficulty == int(request.args['difficulty']))
 
         except AssertionError as assert_error:
-            logger.error(
-                f'{assert_error}: 422 at {request.path} with: {sys.exc_info()} and trace: {traceback.format_exc()}')
+            logger.error('%s: 422 %s', request.path, assert_error)
             abort(422, description=str(assert_error))
 
-        def filter_question():
-            return getattr(Question, 'question').ilike(f"%{str(search_term).lower()}%")
+        batch_size = app.config['EXPORT_BATCH_SIZE']
+        fields = requested_fields(request)
 
-        try:
-            return jsonify({
-                'success': True,
-                'questions': paginate_questions(request, filter_func=filter_question),
-                'total_questions': Question.count()
-            })
-        except Exception as e:
-            logger.error(
-                f'{e}: 404 at {request.path} with: {sys.exc_info()} and trace: {traceback.format_exc()}')
-            abort(404)
-        finally:
-            Question.db_close()
+        def generate():
+            rows = Question.rows(fields).filter(*filters).order_by(Question.id) \
+                .execution_options(stream_results=True).yield_per(batch_size)
+            for row in rows:
+                yield json.dumps(Question.format_row(row, fields)) + '\n'
+
+        return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
 
 
     @app.route('/categories/<int:category_id>/questions')
     @swag_from('docs/get_questions_for_category_id.yaml')
+    @response_cache.cached
     def get_questions_for_category_id(category_id):
         '''
         GET endpoint to get questions based on category.
@@ -240,25 +794,21 @@ def create_app(test_config=None):
             assert type(category_id) is int, "Category_id should be numeric"
 
         except AssertionError as assert_error:
-            logger.error(
-                f'{assert_error}: 422 at {request.path} with: {sys.exc_info()} and trace: {traceback.format_exc()}')
+            logger.error('%s: 422 %s', request.path, assert_error)
             abort(422, description=str(assert_error))
 
-        def filter_question():
-            return Question.category.has(id=category_id)
-
         try:
             return jsonify({
                 'success': True,
-                'questions': paginate_questions(request, filter_func=filter_question),
-                'total_questions': Question.query.filter(category_id == category_id).count()
+                **paginate_questions(request,
+                                     conditions=(Question.category_id == category_id,),
+                                     total=question_counters.for_category(category_id))
             })
+        except HTTPException:
+            raise
         except Exception as e:
-            logger.error(
-                f'{e}: 404 at {request.path} with: {sys.exc_info()} and trace: {traceback.format_exc()}')
+            logger.exception('%s: 404', request.path)
             abort(404)
-        finally:
-            Question.db_close()
 
 
     @app.route('/play', methods=['POST'])
@@ -273,54 +823,134 @@ def create_app(test_config=None):
 
         If there are not enough questions in a given category, all questions are asked,
         and the the remaining questions are drawn from category 'ALL'
-        '''
-        try:
-            data: json = extract_incoming_json(request)
-        except Exception as e:
-            abort(400, description=f'Bad request with {e}')
 
-        try:
-            if 'previous_questions' in data:
-                assert data['previous_questions'] == [] or valid_numbers_array(data,
-                                                                               "previous_questions"), INVALID_NUMBERS_ARRAY_MESSAGE_TEMPLATE % 'previous_questions'
-            if 'quiz_category' in data:
-                assert valid_string(data['quiz_category'], "type"), INVALID_STRING_VALUE_MESSAGE % 'quiz_category_type'
-                assert valid_string(data['quiz_category'],
-                                    "id"), INVALID_STRING_VALUE_MESSAGE % 'quiz_category_id'
+        Instead of previous questions, clients can pass a quiz 'session' (null to start a quiz) and
+        get the session for the next call back. The session is a signed token, so the payload and the
+        cost of a call stay the same for the whole quiz.
 
-        except AssertionError as assert_error:
-            logger.error(f'{request.path}: 442 {assert_error}')
-            abort(422, description=str(assert_error))
+        With a 'count', the next count distinct questions are returned at once as 'questions', e.g. a whole
+        round or the next question to prefetch while the player answers.
+        '''
+        data: json = validated_json('PlayTriviaRequest')
 
         category = data['quiz_category'] if 'quiz_category' in data else None
         previous_question_ids = data['previous_questions'] if 'previous_questions' in data else None
 
-        q = Question.query \
-            .filter(Question.category.has(type=category['type']) if category else True) \
-            .filter(~Question.id.in_(previous_question_ids) if previous_question_ids else True).order_by(
-            func.random()
-        ).first()
+        category_id = int(category['id']) if category else None
+
+        if 'session' in data:
+            try:
+                quiz_session = load_quiz_session(data['session'], app.config['SECRET_KEY']) if data['session'] \
+                    else new_quiz_session(category_id)
+            except ValueError as e:
+                abort(422, description=str(e))
+
+            if 'count' in data:
+                questions, quiz_session = next_session_questions(quiz_session, data['count'])
+                return jsonify({
+                    'success': True,
+                    'questions': [Question.format_row(question) for question in questions],
+                    'session': dump_quiz_session(quiz_session, app.config['SECRET_KEY'])
+                })
+
+            q = None
+            while q is None:
+                question_id, quiz_session = next_question_id(quiz_session, question_selection)
+                if question_id is None:
+                    break
+                q = Question.rows().filter(Question.id == question_id).one_or_none()
+
+            return jsonify({
+                'success': True,
+                'question': Question.format_row(q) if q is not None else None,
+                'session': dump_quiz_session(quiz_session, app.config['SECRET_KEY'])
+            })
+
+        previous_question_ids = set(previous_question_ids or [])
+
+        if 'count' in data:
+            questions = random_questions(category_id, previous_question_ids, data['count'])
+            return jsonify({
+                'success': True,
+                'questions': [Question.format_row(question) for question in questions]
+            })
+
+        q = random_question(category_id, previous_question_ids)
 
         # in case no question of ask category are left, fill questions with other categories
-        if q is None or q.count() == 0:
-            q = Question.query \
-                .filter(~Question.id.in_(previous_question_ids) if previous_question_ids else True).order_by(
-                func.random()
-            ).first()
+        if q is None and category_id is not None:
+            q = random_question(None, previous_question_ids)
 
         try:
             return jsonify({
                 'success': True,
-                'question': q.format() if q is not None else f"all questions of {data['category']} answered"
+                'question': Question.format_row(q) if q is not None else f"all questions of {data['category']} answered"
             })
         except:
-            abort(404, description=f"{sys.exc_info()} and trace: {traceback.format_exc()}")
-            logger.error(f'{request.path}: 404 with {sys.exc_info()} and trace: {traceback.format_exc()}')
-        finally:
-            Question.db_close()
+            logger.exception('%s: 404', request.path)
+            abort(404)
+
+    @app.route('/metrics')
+    @swag_from('docs/get_metrics.yaml')
+    def get_metrics():
+        '''
+        Request and SQL metrics per route in the Prometheus text format.
+        '''
+        return Response(request_metrics.render(), content_type=PROMETHEUS_CONTENT_TYPE)
+
+    @app.route('/admin/profiles')
+    @swag_from('docs/get_profiles.yaml')
+    def get_profiles():
+        require_admin()
+        return jsonify({
+            'success': True,
+            'profiles': request_profiler.list()
+        })
+
+    @app.route('/admin/profiles/<int:profile_id>')
+    @swag_from('docs/get_profile.yaml')
+    def get_profile(profile_id):
+        require_admin()
+        profile = request_profiler.get(profile_id)
+        if profile is None:
+            abort(404)
+        return jsonify({
+            'success': True,
+            'profile': profile
+        })
+
+    @app.route('/admin/slow-queries')
+    @swag_from('docs/get_slow_queries.yaml')
+    def get_slow_queries():
+        require_admin()
+        explain = request.args.get('explain', 'true').lower() != 'false'
+        return jsonify({
+            'success': True,
+            'threshold_seconds': app.extensions['slow_queries'].threshold,
+            'slow_queries': [slow_query.format(explain) for slow_query in app.extensions['slow_queries'].entries()]
+        })
+
+    @app.route('/admin/pool')
+    @swag_from('docs/get_pool_metrics.yaml')
+    def get_pool_metrics():
+        require_admin()
+        return jsonify({
+            'success': True,
+            'pool': app.extensions['pool_metrics'].snapshot(),
+            'replicas': app.extensions['replicas'].snapshot() if app.extensions.get('replicas') is not None else []
+        })
+
+    @app.route('/admin/cache')
+    @swag_from('docs/get_cache_stats.yaml')
+    def get_cache_stats():
+        require_admin()
+        return jsonify({
+            'success': True,
+            'cache': response_cache.stats()
+        })
 
     '''
-    Error handlers for all expected errors codes 400, 404, 405, 422 and 500 
+    Error handlers for all expected errors codes 400, 403, 404, 405, 422 and 500 
     '''
 
     @app.errorhandler(500)
@@ -343,12 +973,15 @@ def create_app(test_config=None):
 
     @app.errorhandler(422)
     def unprocessable(error):
-        return jsonify({
+        body = {
             "success": False,
             "data": [],
             "error": 422,
             "message": f"Unprocessable: {error}"
-        }), 422
+        }
+        if isinstance(error, ValidationError):
+            body["errors"] = error.errors
+        return jsonify(body), 422
 
     @app.errorhandler(400)
     def bad_request(error):
@@ -359,6 +992,15 @@ def create_app(test_config=None):
             "message": f"Bad request: {error}"
         }), 400
 
+    @app.errorhandler(403)
+    def forbidden(error):
+        return jsonify({
+            "success": False,
+            "data": [],
+            "error": 403,
+            "message": f"Forbidden: {error}"
+        }), 403
+
     @app.errorhandler(405)
     def not_allowed(error):
         return jsonify({
@@ -368,4 +1010,8 @@ def create_app(test_config=None):
             "message": f"Not allowed: {error}"
         }), 405
 
+    if app.config['WARM_UP']:
+        with app.app_context():
+            warm_up.run()
+
     return app
@@ -0,0 +1,111 @@
+import csv
+from typing import Dict, Iterable, Iterator, Optional, Tuple
+
+from flask import json
+
+from flaskr.validation import *
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/jsonl')
+CSV_MIMETYPES = ('text/csv',)
+
+INVALID_ROW_MESSAGE = "Error: line is not a JSON object"
+INVALID_ENCODING_MESSAGE = "Error: row is not valid UTF-8"
+INVALID_HEADER_MESSAGE = "Error: the CSV header line is not valid UTF-8, no rows were imported"
+UNKNOWN_CATEGORY_MESSAGE = "Error: category '%s' does not exist"
+UNSUPPORTED_MIMETYPE_MESSAGE = "Error: Content-Type must be one of %s" % ', '.join(NDJSON_MIMETYPES + CSV_MIMETYPES)
+
+# (line number, parsed row or None, error message or None)
+ParsedRow = Tuple[int, Optional[dict], Optional[str]]
+
+
+def parse_ndjson(lines: Iterable[bytes]) -> Iterator[ParsedRow]:
+    """ Parses newline delimited JSON lazily, one object per line; blank lines are skipped """
+    for line_number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_number, None, f"Error: invalid JSON: {e}"
+            continue
+        if isinstance(row, dict):
+            yield line_number, row, None
+        else:
+            yield line_number, None, INVALID_ROW_MESSAGE
+
+
+def parse_csv(lines: Iterable[bytes]) -> Iterator[ParsedRow]:
+    """
+    Parses CSV with a header line (question,answer,category,difficulty) lazily. Rows with bytes that are not UTF-8
+    and rows the csv module rejects are reported as errors.
+    """
+    # undecodable bytes become lone surrogates, so the lines around them are still parsed
+    reader = csv.DictReader(line.decode('utf-8', 'surrogateescape') for line in lines)
+    while True:
+        try:
+            row = next(reader)
+        except StopIteration:
+            return
+        except csv.Error as e:
+            # the line of the underlying reader, DictReader only counts the rows it returned
+            yield reader.reader.line_num, None, f"Error: invalid CSV: {e}"
+            continue
+        if not all(is_utf8(name) for name in reader.fieldnames):
+            yield reader.line_num, None, INVALID_HEADER_MESSAGE
+            return
+        if all(is_utf8(value) for value in row.values()):
+            yield reader.line_num, row, None
+        else:
+            yield reader.line_num, None, INVALID_ENCODING_MESSAGE
+
+
+def is_utf8(value) -> bool:
+    """ Whether a value decoded with surrogateescape was valid UTF-8; values that are not strings are """
+    if not isinstance(value, str):
+        return True
+    try:
+        value.encode('utf-8')
+    except UnicodeEncodeError:
+        return False
+    return True
+
+
+def parse_rows(mimetype: str, lines: Iterable[bytes]) -> Iterator[ParsedRow]:
+    """ Parses the rows of a bulk import according to its mimetype, raises ValueError for unsupported ones """
+    if mimetype in NDJSON_MIMETYPES:
+        return parse_ndjson(lines)
+    if mimetype in CSV_MIMETYPES:
+        return parse_csv(lines)
+    raise ValueError(UNSUPPORTED_MIMETYPE_MESSAGE)
+
+
+def category_map(categories) -> Dict[str, int]:
+    """ Maps category ids and lower case category types to category ids, to resolve categories without queries """
+    mapping = {}
+    for category in categories:
+        mapping[str(category.id)] = category.id
+        mapping[category.type.lower()] = category.id
+    return mapping
+
+
+def question_values(row: dict, categories: Dict[str, int]) -> dict:
+    """ Validates a row and returns the column values of the question, raises ValueError if it is invalid """
+    if not (valid_string(row, 'question') and row['question'].strip()):
+        raise ValueError(INVALID_STRING_VALUE_MESSAGE % 'question')
+    if not (valid_string(row, 'answer') and row['answer'].strip()):
+        raise ValueError(INVALID_STRING_VALUE_MESSAGE % 'answer')
+    if not valid_int(row, 'difficulty') or isinstance(row['difficulty'], bool):
+        raise ValueError(INVALID_INTEGER_VALUE_MESSAGE % 'difficulty')
+    if not has_key(row, 'category') or not (check_int(row['category']) or check_string(row['category'])):
+        raise ValueError(INVALID_STRING_VALUE_MESSAGE % 'category')
+
+    category_id = categories.get(str(row['category']).lower())
+    if category_id is None:
+        raise ValueError(UNKNOWN_CATEGORY_MESSAGE % row['category'])
+
+    return {
+        'question': row['question'],
+        'answer': row['answer'],
+        'category_id': category_id,
+        'difficulty': int(row['difficulty'])
+    }
@@ -0,0 +1,89 @@
+import gzip
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Response
+
+COMPRESSIBLE_MIMETYPES = frozenset({
+    'application/json', 'application/x-ndjson', 'text/csv', 'text/plain', 'text/html', 'text/css',
+    'application/javascript'
+})
+GZIP = 'gzip'
+# streamed responses are flushed after their first chunk, so the first byte is sent right away, and then whenever
+# this many bytes were compressed since the last flush; flushing every chunk (a row of an export) would double
+# the compressed size
+STREAM_FLUSH_SIZE = 16 * 1024
+
+
+class Compression:
+    """
+    gzip compression of responses, negotiated by Accept-Encoding. Bodies smaller than min_size bytes are sent as
+    they are, as the gzip header and the CPU would outweigh the saved bytes; streamed responses (exports) are
+    compressed while they are streamed.
+
+    Compressed bodies are deterministic (no timestamp), so the response cache stores them in the entries of the
+    plain ones and hits are not compressed again.
+    """
+
+    def __init__(self, level: int = 6, min_size: int = 500, mimetypes: frozenset = COMPRESSIBLE_MIMETYPES,
+                 flush_size: int = STREAM_FLUSH_SIZE):
+        self.level = level
+        self.min_size = min_size
+        self.mimetypes = mimetypes
+        self.flush_size = flush_size
+
+    @staticmethod
+    def accepted(request) -> bool:
+        """ Whether the client accepts gzip (Accept-Encoding: gzip, also by *) """
+        return request.accept_encodings[GZIP] > 0
+
+    def compress(self, body: bytes) -> bytes:
+        return gzip.compress(body, compresslevel=self.level, mtime=0)
+
+    def stream(self, chunks: Iterable) -> Iterator[bytes]:
+        """ Compresses a streamed body, yielding whenever the compressor has output, see STREAM_FLUSH_SIZE """
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        # the first chunk is flushed right away
+        unflushed = self.flush_size
+        try:
+            for chunk in chunks:
+                chunk = chunk.encode() if isinstance(chunk, str) else chunk
+                unflushed += len(chunk)
+                data = compressor.compress(chunk)
+                if unflushed >= self.flush_size:
+                    data += compressor.flush(zlib.Z_SYNC_FLUSH)
+                    unflushed = 0
+                if data:
+                    yield data
+            yield compressor.flush()
+        finally:
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+    @staticmethod
+    def compressed(response: Response, body: bytes) -> Response:
+        """ Sets an already compressed body on response """
+        response.set_data(body)
+        response.headers['Content-Encoding'] = GZIP
+        response.vary.add('Accept-Encoding')
+        return response
+
+    def apply(self, request, response: Response) -> Response:
+        """ Compresses response for request, if the client accepts gzip and the body is worth it """
+        if response.mimetype not in self.mimetypes or response.status_code in (204, 304) \
+                or response.direct_passthrough or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        if not self.accepted(request):
+            return response
+
+        if response.is_streamed:
+            response.response = self.stream(response.response)
+            response.headers.pop('Content-Length', None)
+            response.headers['Content-Encoding'] = GZIP
+            return response
+        body = response.get_data()
+        if len(body) < self.min_size:
+            return response
+        return self.compressed(response, self.compress(body))
@@ -0,0 +1,109 @@
+import threading
+import time
+from collections import Counter
+from typing import Callable, Iterable, Optional, Tuple
+
+from flaskr.logger import logger
+
+# rows of (category_id, difficulty, number of questions)
+GroupedCounts = Iterable[Tuple[Optional[int], Optional[int], int]]
+
+# loads of a reconciliation until no add() interferes, the last one is kept anyway
+RECONCILE_ATTEMPTS = 3
+
+
+class QuestionCounters:
+    """
+    Maintained question counters (total, per category and per difficulty).
+
+    Counters are loaded lazily from the database using the given loader, kept up to date by
+    Question.insert() / Question.delete() and reconciled against the database again when they
+    are older than max_age seconds (None disables the periodic reconciliation). This keeps them
+    correct even if other processes write to the same database.
+
+    Every add() bumps a generation: a reconciliation during which the generation changed may miss
+    that write, so it is discarded and loaded again, up to RECONCILE_ATTEMPTS times.
+    """
+
+    def __init__(self, loader: Callable[[], GroupedCounts], max_age: Optional[float] = None):
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._total = 0
+        self._by_category = Counter()
+        self._by_difficulty = Counter()
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+
+    def invalidate(self):
+        """ Marks the counters as stale, they are reloaded on the next read """
+        with self._lock:
+            self._loaded_at = None
+
+    def reconcile(self) -> bool:
+        """ Reloads the counters from the database, returns True if they had drifted """
+        for attempt in range(1, RECONCILE_ATTEMPTS + 1):
+            with self._lock:
+                generation = self._generation
+            total, by_category, by_difficulty = self._load()
+            with self._lock:
+                if generation != self._generation and attempt < RECONCILE_ATTEMPTS:
+                    # an add() during the load, which may be missing from it
+                    continue
+                if generation != self._generation:
+                    logger.info('question counters were written while reconciled, they may be off until the next')
+                drifted = self._loaded_at is not None and (
+                        total != self._total or
+                        +by_category != +self._by_category or
+                        +by_difficulty != +self._by_difficulty
+                )
+                self._total = total
+                self._by_category = by_category
+                self._by_difficulty = by_difficulty
+                self._loaded_at = time.monotonic()
+                break
+
+        if drifted:
+            logger.info('question counters drifted from the database and were reconciled')
+        return drifted
+
+    def _load(self) -> Tuple[int, Counter, Counter]:
+        total = 0
+        by_category = Counter()
+        by_difficulty = Counter()
+        for category_id, difficulty, count in self.loader():
+            total += count
+            by_category[category_id] += count
+            by_difficulty[difficulty] += count
+        return total, by_category, by_difficulty
+
+    def add(self, category_id: Optional[int], difficulty: Optional[int], delta: int = 1):
+        """ Applies an insert (delta > 0) or delete (delta < 0) of delta questions """
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                # not loaded yet, the next read loads the committed state anyway
+                return
+            self._total += delta
+            self._by_category[category_id] += delta
+            self._by_difficulty[difficulty] += delta
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.max_age is not None and time.monotonic() - loaded_at > self.max_age):
+            self.reconcile()
+
+    def total(self) -> int:
+        """ Number of all questions """
+        self._ensure_loaded()
+        return self._total
+
+    def for_category(self, category_id: int) -> int:
+        """ Number of questions in given category """
+        self._ensure_loaded()
+        return self._by_category.get(category_id, 0)
+
+    def for_difficulty(self, difficulty: int) -> int:
+        """ Number of questions with given difficulty """
+        self._ensure_loaded()
+        return self._by_difficulty.get(difficulty, 0)
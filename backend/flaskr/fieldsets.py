@@ -0,0 +1,38 @@
+from typing import Optional, Tuple
+
+from flask import abort
+
+QUESTION_FIELDS = ('id', 'question', 'answer', 'category', 'difficulty')
+UNKNOWN_FIELD_MESSAGE = "Error: unknown field '%s' in 'fields', use %s"
+MINIMAL_PREFERENCE = 'return=minimal'
+
+
+def requested_fields(request, allowed: Tuple[str, ...] = QUESTION_FIELDS) -> Optional[Tuple[str, ...]]:
+    """
+    Fields requested with ?fields=a,b (sparse fieldset), in the requested order and always including id;
+    None to return all fields. Aborts with 422 for fields not in allowed.
+    """
+    if 'fields' not in request.args:
+        return None
+    fields = ['id']
+    for field in request.args['fields'].split(','):
+        field = field.strip()
+        if not field or field in fields:
+            continue
+        if field not in allowed:
+            abort(422, description=UNKNOWN_FIELD_MESSAGE % (field, ', '.join(allowed)))
+        fields.append(field)
+    return tuple(fields)
+
+
+def prefers_minimal(request) -> bool:
+    """ Whether the client sent Prefer: return=minimal (RFC 7240), i.e. does not need a representation back """
+    preferences = request.headers.get('Prefer', '')
+    return any(preference.split(';')[0].strip().lower() == MINIMAL_PREFERENCE
+               for preference in preferences.split(','))
+
+
+def minimal(response):
+    """ Marks a response as answering Prefer: return=minimal """
+    response.headers['Preference-Applied'] = MINIMAL_PREFERENCE
+    return response
@@ -1,29 +1,177 @@
+import atexit
+import json
 import logging
 import os
+import queue
 import sys
+import threading
+import time
 from logging import Logger
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
 
 logger: Logger
+listener: Optional['ProcessQueueListener'] = None
+
+LOG_FORMAT = '[%(asctime)s:%(module)s:%(lineno)s:%(levelname)s] %(message)s'
+
+# of duplicate errors, the first DUPLICATE_BURST per DUPLICATE_INTERVAL seconds are logged,
+# afterwards 1 in DUPLICATE_SAMPLE_RATE
+DUPLICATE_BURST = 5
+DUPLICATE_INTERVAL = 60.0
+DUPLICATE_SAMPLE_RATE = 100
+
+
+class ProcessQueueListener(QueueListener):
+    """
+    QueueListener whose thread is started by the first record of each process, not on import: a worker forked
+    from a process that imported the module (e.g. gunicorn --preload) inherits the queue but not the thread,
+    so it starts its own. Records the parent had not written yet when it forked are left to the parent.
+    """
+
+    def __init__(self, log_queue, *handlers, respect_handler_level=False):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            if self._pid is not None:
+                # forked from a process with a running listener, whose thread does not exist here
+                self._thread = None
+                while True:
+                    try:
+                        self.queue.get_nowait()
+                    except queue.Empty:
+                        break
+            self.start()
+            self._pid = os.getpid()
+
+    def stop(self):
+        """ Writes the queued records and stops the thread, if it was started by this process """
+        with self._start_lock:
+            if self._pid == os.getpid():
+                super().stop()
+                self._pid = None
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Hands records to the listener thread unformatted: message arguments and tracebacks are only formatted there,
+    the logging call itself costs no more than putting the record on the queue. Starts the listener of the
+    current process, if given, with its first record.
+    """
+
+    def __init__(self, log_queue, listener: Optional[ProcessQueueListener] = None):
+        super().__init__(log_queue)
+        self.listener = listener
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        if self.listener is not None:
+            self.listener.ensure_started()
+        super().enqueue(record)
+
+
+class DuplicateFilter(logging.Filter):
+    """
+    Rate limits records logged from the same place with the same message template (and exception type):
+    the first burst per interval pass, afterwards only every sample_rate-th. Passing records carry the number
+    of records suppressed since the previous one as attribute 'suppressed'.
+    """
+
+    def __init__(self, burst: int = DUPLICATE_BURST, interval: float = DUPLICATE_INTERVAL,
+                 sample_rate: int = DUPLICATE_SAMPLE_RATE):
+        super().__init__()
+        self.burst = burst
+        self.interval = interval
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        # key -> [window start, records in window, suppressed since last passing record]
+        self._windows: Dict[Tuple, list] = {}
+
+    def filter(self, record) -> bool:
+        if record.levelno < logging.ERROR:
+            return True
+
+        exc_type = record.exc_info[0] if record.exc_info else None
+        key = (record.pathname, record.lineno, record.msg, exc_type)
+        now = time.monotonic()
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None or now - window[0] > self.interval:
+                window = self._windows[key] = [now, 0, window[2] if window else 0]
+            window[1] += 1
+            if window[1] > self.burst and (window[1] - self.burst) % self.sample_rate != 0:
+                window[2] += 1
+                return False
+            record.suppressed, window[2] = window[2], 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """ Formats records as JSON lines, for log shippers """
+
+    def format(self, record) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'module': record.module,
+            'line': record.lineno,
+            'message': record.getMessage()
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        return json.dumps(entry)
+
+
+class TextFormatter(logging.Formatter):
+    """ The plain text format, noting suppressed duplicates """
+
+    def format(self, record) -> str:
+        text = super().format(record)
+        if getattr(record, 'suppressed', 0):
+            text += f' ({record.suppressed} similar messages suppressed)'
+        return text
+
 
 def init_logger_singleton():
-    global logger
+    '''
+    Sets up the logger: records are put on a queue and written to stdout (errors) and LOG_FILE (default trivia.log)
+    by a background listener, started by the first record of each process. LOG_FORMAT=json writes JSON lines
+    instead of plain text.
+    '''
+    global logger, listener
 
     logger = logging.getLogger(name='trivia_logger')
     if os.getenv('ENV') == 'debug':
         logger.setLevel(logging.DEBUG)
     else:
         logger.setLevel(logging.ERROR)
-    formatter = logging.Formatter(
-        '[%(asctime)s:%(module)s:%(lineno)s:%(levelname)s] %(message)s'
-    )
+    formatter = JsonFormatter() if os.getenv('LOG_FORMAT') == 'json' else TextFormatter(LOG_FORMAT)
     streamhandler = logging.StreamHandler(sys.stdout)
     streamhandler.setLevel(logging.ERROR)
     streamhandler.setFormatter(formatter)
-    logger.addHandler(streamhandler)
-    filehandler = logging.FileHandler('trivia.log')
+    # opened with the first record, not on import
+    filehandler = logging.FileHandler(os.getenv('LOG_FILE', 'trivia.log'), delay=True)
     filehandler.setLevel(logging.DEBUG)
     filehandler.setFormatter(formatter)
-    logger.addHandler(filehandler)
+
+    log_queue = queue.SimpleQueue()
+    listener = ProcessQueueListener(log_queue, streamhandler, filehandler, respect_handler_level=True)
+    queuehandler = DeferredQueueHandler(log_queue, listener)
+    queuehandler.addFilter(DuplicateFilter())
+    logger.addHandler(queuehandler)
+    # flush the queue on shutdown
+    atexit.register(listener.stop)
 
 
 init_logger_singleton()
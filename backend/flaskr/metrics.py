@@ -0,0 +1,156 @@
+import bisect
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from flask import g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SQL_STATEMENT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# route label of requests not matching any route
+UNMATCHED_ROUTE = 'unmatched'
+
+_sql_timing_installed = False
+
+
+class Histogram:
+    """ Cumulative histogram in the Prometheus sense: counts per upper bound, sum and count """
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self) -> Iterable[Tuple[str, int]]:
+        total = 0
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            yield ('+Inf' if bound == float('inf') else repr(bound)), total
+
+
+class RouteMetrics:
+    """ Metrics of one route and method """
+
+    def __init__(self):
+        self.statuses: Dict[int, int] = {}
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.sql_statements = Histogram(SQL_STATEMENT_BUCKETS)
+        self.sql_seconds = 0.0
+
+
+class RequestMetrics:
+    """
+    Per route request counts by status, latency histograms and SQL statement counts and time per request.
+
+    start() and finish() are called once per request by the hooks of the app factory, SQL statements are timed
+    with engine events (see install_sql_timing). Rendered in the Prometheus text format by render().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._routes: Dict[Tuple[str, str], RouteMetrics] = {}
+
+    @staticmethod
+    def start():
+        g.metrics_started_at = time.perf_counter()
+        g.sql_statements = 0
+        g.sql_seconds = 0.0
+
+    def finish(self, route: str, method: str, status: int):
+        started_at = g.get('metrics_started_at')
+        if started_at is None:
+            return
+        latency = time.perf_counter() - started_at
+        g.metrics_started_at = None
+        with self._lock:
+            metrics = self._routes.get((route, method))
+            if metrics is None:
+                metrics = self._routes[(route, method)] = RouteMetrics()
+            metrics.statuses[status] = metrics.statuses.get(status, 0) + 1
+            metrics.latency.observe(latency)
+            metrics.sql_statements.observe(g.sql_statements)
+            metrics.sql_seconds += g.sql_seconds
+
+    def render(self) -> str:
+        """ Prometheus text exposition format """
+        with self._lock:
+            routes = sorted(self._routes.items())
+            lines: List[str] = [
+                '# HELP trivia_http_requests_total Requests by route, method and status code',
+                '# TYPE trivia_http_requests_total counter',
+            ]
+            for (route, method), metrics in routes:
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(f'trivia_http_requests_total{{{_labels(route, method)},status="{status}"}} {count}')
+
+            lines += _histogram('trivia_http_request_duration_seconds', 'Request latency by route and method',
+                                routes, lambda metrics: metrics.latency)
+            lines += _histogram('trivia_sql_statements_per_request', 'SQL statements per request by route and method',
+                                routes, lambda metrics: metrics.sql_statements)
+
+            lines += [
+                '# HELP trivia_sql_duration_seconds_total Cumulative time of SQL statements by route and method',
+                '# TYPE trivia_sql_duration_seconds_total counter',
+            ]
+            for (route, method), metrics in routes:
+                lines.append(f'trivia_sql_duration_seconds_total{{{_labels(route, method)}}} {metrics.sql_seconds!r}')
+        return '\n'.join(lines) + '\n'
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(route: str, method: str) -> str:
+    return f'route="{_escape(route)}",method="{method}"'
+
+
+def _histogram(name, help_text, routes, histogram_of) -> List[str]:
+    lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+    for (route, method), metrics in routes:
+        histogram = histogram_of(metrics)
+        labels = _labels(route, method)
+        for bound, count in histogram.cumulative_counts():
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+        lines.append(f'{name}_sum{{{labels}}} {histogram.sum!r}')
+        lines.append(f'{name}_count{{{labels}}} {histogram.count}')
+    return lines
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None:
+        context.metrics_started_at = time.perf_counter()
+
+
+def statement_duration(context) -> Optional[float]:
+    """ Seconds the statement of an execution context took so far, None if it was not timed """
+    started_at = getattr(context, 'metrics_started_at', None)
+    return time.perf_counter() - started_at if started_at is not None else None
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    duration = statement_duration(context)
+    if duration is not None and has_app_context() and g.get('metrics_started_at') is not None:
+        g.sql_statements += 1
+        g.sql_seconds += duration
+
+
+def install_sql_timing():
+    """ Times the SQL statements of all engines for the metrics of the current request, once per process """
+    global _sql_timing_installed
+    if _sql_timing_installed:
+        return
+    event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _sql_timing_installed = True
@@ -0,0 +1,137 @@
+import base64
+import binascii
+import bisect
+from typing import Callable, List, Optional
+
+from flask import abort, current_app
+from sqlalchemy import func
+
+CURSOR_PREFIX = 'q:'
+INVALID_CURSOR_MESSAGE = "Error: 'after' is not a valid cursor"
+INVALID_LIMIT_MESSAGE = "Error: 'limit' must be a positive integer"
+
+
+def encode_cursor(question_id: int) -> str:
+    """ Encodes a question id into an opaque, url safe cursor """
+    return base64.urlsafe_b64encode(f'{CURSOR_PREFIX}{question_id}'.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    """ Decodes a cursor created by encode_cursor into the question id; plain numeric ids are accepted as well """
+    if cursor.isdigit():
+        return int(cursor)
+
+    try:
+        decoded = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+    except (binascii.Error, UnicodeDecodeError):
+        raise ValueError(INVALID_CURSOR_MESSAGE)
+
+    if not decoded.startswith(CURSOR_PREFIX) or not decoded[len(CURSOR_PREFIX):].isdigit():
+        raise ValueError(INVALID_CURSOR_MESSAGE)
+    return int(decoded[len(CURSOR_PREFIX):])
+
+
+def is_cursor_request(request) -> bool:
+    """ Checks if the client asked for keyset (cursor) pagination, i.e. passed ?after=<cursor> """
+    return 'after' in request.args
+
+
+def page_size(request) -> int:
+    """ Returns the requested page size (?limit=N), capped at MAX_QUESTIONS_PER_PAGE """
+    limit = request.args.get('limit', current_app.config['QUESTIONS_PER_PAGE'], type=int)
+    if limit < 1:
+        abort(422, description=INVALID_LIMIT_MESSAGE)
+    return min(limit, current_app.config['MAX_QUESTIONS_PER_PAGE'])
+
+
+def after_id(request) -> int:
+    """ Returns the question id to seek after, 0 for the first page of a cursor request """
+    cursor = request.args.get('after', '')
+    if cursor == '':
+        return 0
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        abort(422, description=str(e))
+
+
+def page_number(request) -> int:
+    """ Returns the requested page (?page=N) of offset pagination, aborts with 404 for pages below 1 """
+    page = request.args.get('page', 1, type=int)
+    if page < 1:
+        abort(404)
+    return page
+
+
+class Page:
+    """ A page of a question listing together with the total number of questions matching the listing """
+
+    def __init__(self, items: list, total: int, cursor_mode: bool = False, next_cursor: Optional[str] = None):
+        self.items = items
+        self.total = total
+        self.cursor_mode = cursor_mode
+        self.next_cursor = next_cursor
+
+    def to_response(self, format_item: Callable) -> dict:
+        """ Returns the page as dictionary to be merged into the response """
+        response = {
+            'questions': [format_item(item) for item in self.items],
+            'total_questions': self.total
+        }
+        if self.cursor_mode:
+            response['next_cursor'] = self.next_cursor
+        return response
+
+
+def paginate_query(request, query, id_column, total: Optional[int] = None, order_by: tuple = ()) -> Page:
+    """
+    Returns the requested page of query, see README for the pagination parameters.
+    query has to select columns (not entities), the items of the page are its rows.
+
+    If total is not known (e.g. from the question counters), it is selected along with the page in the same
+    statement, so a page costs a single round trip: as window count in offset mode and as scalar subquery
+    in cursor mode, where the seek condition would otherwise narrow the count. Offset mode orders by
+    order_by (then id), cursor mode always by id.
+    """
+    limit = page_size(request)
+    count = query.with_entities(func.count(id_column)).order_by(None).as_scalar() if is_cursor_request(request) \
+        else func.count().over()
+    paged_query = query if total is not None else query.add_columns(count.label('total'))
+
+    if is_cursor_request(request):
+        rows = paged_query.filter(id_column > after_id(request)).order_by(id_column).limit(limit + 1).all()
+    else:
+        page = page_number(request)
+        rows = paged_query.order_by(*order_by, id_column).limit(limit).offset((page - 1) * limit).all()
+        if not rows and page != 1:
+            abort(404)
+
+    items = rows
+    if total is None:
+        # an empty page carries no count, only then the total costs a second statement
+        total = rows[0].total if rows else query.order_by(None).count()
+
+    if is_cursor_request(request):
+        next_cursor = encode_cursor(getattr(items[limit - 1], id_column.key)) if len(items) > limit else None
+        return Page(items[:limit], total, cursor_mode=True, next_cursor=next_cursor)
+    return Page(items, total)
+
+
+def paginate_ids(request, ids: List[int]) -> Page:
+    """
+    Returns the requested page of a list of ids, e.g. from an in-memory index. Cursor mode requires ids sorted
+    ascending. The items of the page are the ids, which are to be loaded by the caller.
+    """
+    limit = page_size(request)
+
+    if is_cursor_request(request):
+        start = bisect.bisect_right(ids, after_id(request))
+        page_ids = ids[start:start + limit + 1]
+        next_cursor = encode_cursor(page_ids[limit - 1]) if len(page_ids) > limit else None
+        return Page(page_ids[:limit], len(ids), cursor_mode=True, next_cursor=next_cursor)
+
+    page = page_number(request)
+    page_ids = ids[(page - 1) * limit:page * limit]
+    if not page_ids and page != 1:
+        abort(404)
+    return Page(page_ids, len(ids))
@@ -0,0 +1,116 @@
+import threading
+import time
+from typing import Callable, Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import TimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class InstrumentedQueuePool(QueuePool):
+    """ QueuePool measuring how long checkouts wait for a connection and how often they time out """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wait_lock = threading.Lock()
+        self.waits = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.timeouts = 0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except TimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._wait_lock:
+                self.waits += 1
+                self.wait_seconds_total += waited
+                self.wait_seconds_max = max(self.wait_seconds_max, waited)
+                self.timeouts += timed_out
+
+
+class PoolMetrics:
+    """
+    Connection pool statistics of the engine returned by get_engine.
+
+    Checkouts, checkins and new connections are counted with pool events, so they are available for every pool class.
+    Pool size, overflow and wait times are only available for QueuePool / InstrumentedQueuePool.
+    track() has to be called before the engine is used (e.g. before each request); if the engine was replaced
+    since the last call, the counters start over for the new engine.
+    """
+
+    def __init__(self, get_engine: Callable[[], Engine]):
+        self.get_engine = get_engine
+        self.engine: Optional[Engine] = None
+        self._lock = threading.Lock()
+        self.connects = 0
+        self.checkouts = 0
+        self.checkins = 0
+        self.invalidations = 0
+
+    def track(self):
+        """ Listens to the pool events of the current engine """
+        engine = self.get_engine()
+        if engine is self.engine:
+            return
+        with self._lock:
+            if engine is self.engine:
+                return
+            self.engine = engine
+            self.connects = self.checkouts = self.checkins = self.invalidations = 0
+            event.listen(engine, 'connect', self._on_connect)
+            event.listen(engine, 'checkout', self._on_checkout)
+            event.listen(engine, 'checkin', self._on_checkin)
+            event.listen(engine, 'invalidate', self._on_invalidate)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.connects += 1
+
+    def _on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self.checkouts += 1
+
+    def _on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self.checkins += 1
+
+    def _on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self.invalidations += 1
+
+    def snapshot(self) -> dict:
+        """ Current pool statistics """
+        self.track()
+        pool = self.engine.pool
+        with self._lock:
+            stats = {
+                'pool_class': type(pool).__name__,
+                'checked_out': self.checkouts - self.checkins,
+                'checkouts': self.checkouts,
+                'connects': self.connects,
+                'invalidations': self.invalidations,
+            }
+        if isinstance(pool, QueuePool):
+            stats.update({
+                'size': pool.size(),
+                'checked_in': pool.checkedin(),
+                'overflow': max(pool.overflow(), 0),
+                'max_overflow': pool._max_overflow,
+                'timeout_seconds': pool.timeout(),
+            })
+        if isinstance(pool, InstrumentedQueuePool):
+            stats.update({
+                'waits': pool.waits,
+                'wait_seconds_total': round(pool.wait_seconds_total, 6),
+                'wait_seconds_max': round(pool.wait_seconds_max, 6),
+                'timeouts': pool.timeouts,
+            })
+        return stats
@@ -0,0 +1,170 @@
+import cProfile
+import io
+import itertools
+import pstats
+import threading
+import time
+from collections import deque
+from typing import Deque, List, Optional
+
+from flask import current_app, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from flaskr.logger import logger
+from flaskr.metrics import statement_duration
+
+PROFILE_TOP_FUNCTIONS = 50
+MAX_PARAMETERS_LENGTH = 500
+
+_slow_query_recording_installed = False
+
+
+class RequestProfiler:
+    """
+    Runs cProfile around single requests on demand and keeps the stats of the last max_profiles requests.
+
+    Only one request is profiled at a time; requests asking for a profile while another one runs are served
+    without profile.
+    """
+
+    def __init__(self, max_profiles: int = 20):
+        self._lock = threading.Lock()
+        self._running = threading.Lock()
+        self._ids = itertools.count(1)
+        self._profiles: Deque[dict] = deque(maxlen=max_profiles)
+
+    def start(self) -> Optional[cProfile.Profile]:
+        """ Starts profiling the current request, returns None if another request is being profiled """
+        if not self._running.acquire(blocking=False):
+            return None
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def next_id(self) -> int:
+        """ Reserves the id of a profile, to report it before the profile is stopped """
+        with self._lock:
+            return next(self._ids)
+
+    def stop(self, profiler: cProfile.Profile, route: str, method: str, status: int,
+             profile_id: Optional[int] = None) -> int:
+        """ Stops profiling, stores the stats and returns the id of the profile (a new one unless reserved) """
+        profiler.disable()
+        self._running.release()
+
+        stream = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stream)
+        stats.sort_stats('cumulative').print_stats(PROFILE_TOP_FUNCTIONS)
+        with self._lock:
+            if profile_id is None:
+                profile_id = next(self._ids)
+            self._profiles.append({
+                'id': profile_id,
+                'route': route,
+                'method': method,
+                'status': status,
+                'total_seconds': round(stats.total_tt, 6),
+                'created_at': time.time(),
+                'stats': stream.getvalue()
+            })
+        return profile_id
+
+    def list(self) -> List[dict]:
+        """ The stored profiles without their stats, latest first """
+        with self._lock:
+            return [{key: value for key, value in profile.items() if key != 'stats'}
+                    for profile in reversed(self._profiles)]
+
+    def get(self, profile_id: int) -> Optional[dict]:
+        with self._lock:
+            return next((profile for profile in self._profiles if profile['id'] == profile_id), None)
+
+
+class SlowQuery:
+    """ A statement that took longer than the threshold of the SlowQueryLog """
+
+    def __init__(self, engine: Engine, statement: str, parameters, duration: float, route: Optional[str]):
+        self.engine = engine
+        self.statement = statement
+        # executemany: the plan of the first parameter set stands for all
+        self.parameters = parameters[0] if isinstance(parameters, list) and parameters else parameters
+        self.duration = duration
+        self.route = route
+        self.recorded_at = time.time()
+        self.plan: Optional[List[str]] = None
+
+    def explain(self) -> List[str]:
+        """ EXPLAIN plan of the statement, computed on first access with a separate connection """
+        if self.plan is None:
+            explain = 'EXPLAIN QUERY PLAN' if self.engine.dialect.name == 'sqlite' else 'EXPLAIN'
+            connection = self.engine.raw_connection()
+            try:
+                cursor = connection.cursor()
+                cursor.execute(f'{explain} {self.statement}', self.parameters or ())
+                self.plan = [' '.join(str(column) for column in row) for row in cursor.fetchall()]
+                cursor.close()
+                connection.rollback()
+            except Exception as e:
+                logger.error('EXPLAIN of slow query failed: %s', e)
+                return [f'EXPLAIN failed: {e}']
+            finally:
+                connection.close()
+        return self.plan
+
+    def format(self, explain: bool = True) -> dict:
+        slow_query = {
+            'statement': self.statement,
+            'parameters': repr(self.parameters)[:MAX_PARAMETERS_LENGTH],
+            'duration_seconds': round(self.duration, 6),
+            'route': self.route,
+            'recorded_at': self.recorded_at
+        }
+        if explain:
+            slow_query['plan'] = self.explain()
+        return slow_query
+
+
+class SlowQueryLog:
+    """
+    Bounded ring of the last max_entries SQL statements slower than threshold seconds, with the route that issued
+    them. Plans are computed when the log is read, so recording costs the slow request nothing extra.
+    """
+
+    def __init__(self, threshold: float = 0.1, max_entries: int = 100):
+        self.threshold = threshold
+        self._lock = threading.Lock()
+        self._entries: Deque[SlowQuery] = deque(maxlen=max_entries)
+
+    def record(self, slow_query: SlowQuery):
+        with self._lock:
+            self._entries.append(slow_query)
+
+    def entries(self) -> List[SlowQuery]:
+        """ Recorded slow queries, latest first """
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if not has_app_context():
+        return
+    slow_queries = current_app.extensions.get('slow_queries')
+    duration = statement_duration(context)
+    if slow_queries is None or duration is None or duration < slow_queries.threshold:
+        return
+    route = request.url_rule.rule if has_request_context() and request.url_rule is not None else None
+    slow_queries.record(SlowQuery(conn.engine, statement, parameters, duration, route))
+
+
+def install_slow_query_recording():
+    """ Records slow statements of all engines in the SlowQueryLog of the current app, once per process """
+    global _slow_query_recording_installed
+    if _slow_query_recording_installed:
+        return
+    event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+    _slow_query_recording_installed = True
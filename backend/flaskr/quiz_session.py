@@ -0,0 +1,105 @@
+import hashlib
+import secrets
+from typing import NamedTuple, Optional, Tuple
+
+from itsdangerous import BadSignature, URLSafeSerializer
+
+from flaskr.selection import ALL_CATEGORIES, QuestionSelectionIndex
+
+QUIZ_SESSION_SALT = 'quiz-session'
+INVALID_QUIZ_SESSION_MESSAGE = "Error: 'session' is not a valid quiz session"
+
+FEISTEL_ROUNDS = 4
+
+# the category phase asks the questions of the chosen category, the fill phase the remaining ones
+CATEGORY_PHASE = 0
+FILL_PHASE = 1
+
+
+class QuizSession(NamedTuple):
+    """
+    State of a quiz that is handed to the client as signed token instead of the list of previous questions.
+
+    The questions of the category are asked in the order of a pseudo random permutation of their ids
+    given by seed; cursor is the number of positions of the permutation already consumed.
+    """
+    seed: int
+    category_id: Optional[int]
+    phase: int = CATEGORY_PHASE
+    cursor: int = 0
+
+
+def new_quiz_session(category_id: Optional[int]) -> QuizSession:
+    """ Starts a quiz for given category (all categories for None) """
+    return QuizSession(
+        seed=secrets.randbits(32),
+        category_id=category_id,
+        phase=CATEGORY_PHASE if category_id is not ALL_CATEGORIES else FILL_PHASE
+    )
+
+
+def dump_quiz_session(quiz_session: QuizSession, secret_key: str) -> str:
+    """ Serializes and signs the quiz session into a compact url safe token """
+    return URLSafeSerializer(secret_key, salt=QUIZ_SESSION_SALT).dumps(list(quiz_session))
+
+
+def load_quiz_session(token: str, secret_key: str) -> QuizSession:
+    """ Verifies and deserializes a token created by dump_quiz_session, raises ValueError if it is invalid """
+    try:
+        seed, category_id, phase, cursor = URLSafeSerializer(secret_key, salt=QUIZ_SESSION_SALT).loads(token)
+    except (BadSignature, TypeError, ValueError):
+        raise ValueError(INVALID_QUIZ_SESSION_MESSAGE)
+    return QuizSession(seed, category_id, phase, cursor)
+
+
+def _round_value(seed: int, round_: int, value: int) -> int:
+    digest = hashlib.blake2b(f'{seed}:{round_}:{value}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'big')
+
+
+def permute(position: int, size: int, seed: int) -> int:
+    """
+    Maps position in [0, size) to a pseudo random position in [0, size); a bijection for every seed.
+
+    Uses a Feistel network on the smallest domain of an even number of bits covering size and
+    cycle walking to stay within size, so a single position is computed in O(1) (expected).
+    """
+    half_bits = max(1, ((size - 1).bit_length() + 1) // 2)
+    mask = (1 << half_bits) - 1
+    value = position
+    while True:
+        left, right = value >> half_bits, value & mask
+        for round_ in range(FEISTEL_ROUNDS):
+            left, right = right, left ^ (_round_value(seed, round_, right) & mask)
+        value = (left << half_bits) | right
+        if value < size:
+            return value
+
+
+def next_question_id(quiz_session: QuizSession,
+                     index: QuestionSelectionIndex) -> Tuple[Optional[int], QuizSession]:
+    """
+    Returns the next question id of the quiz (None if all questions were asked) and the advanced session.
+
+    If the questions of the category are exhausted, the quiz continues with the questions of all other
+    categories. Questions added or deleted during a quiz shift the permutation, so in that case a question
+    may be skipped or asked twice.
+    """
+    seed, category_id, phase, cursor = quiz_session
+    while True:
+        pool = category_id if phase == CATEGORY_PHASE else ALL_CATEGORIES
+        size = index.size(pool)
+        if cursor >= size:
+            if phase == FILL_PHASE:
+                return None, QuizSession(seed, category_id, phase, cursor)
+            phase, cursor = FILL_PHASE, 0
+            continue
+
+        question_id = index.sorted_id(pool, permute(cursor, size, seed))
+        cursor += 1
+        if question_id is None:
+            continue
+        if phase == FILL_PHASE and category_id is not ALL_CATEGORIES and index.category_of(question_id) == category_id:
+            # already asked in the category phase
+            continue
+        return question_id, QuizSession(seed, category_id, phase, cursor)
@@ -0,0 +1,141 @@
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+from typing import List, Optional
+
+from flask import g, has_request_context
+from flask_sqlalchemy import SQLAlchemy, SignallingSession
+from sqlalchemy import event, orm, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+from flaskr.logger import logger
+
+# seconds a replica is behind the primary, 0 on a primary or a database without replication
+REPLICATION_LAG_QUERY = {
+    'postgresql': 'SELECT CASE WHEN pg_is_in_recovery() '
+                  'THEN COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) ELSE 0 END',
+}
+DEFAULT_LAG_QUERY = 'SELECT 0'
+
+
+class Replica:
+    """ A read replica and its health, as last checked """
+
+    def __init__(self, engine: Engine):
+        self.engine = engine
+        self.healthy = True
+        self.lag: Optional[float] = None
+        self.checked_at: Optional[float] = None
+        self.reads = 0
+        self.failures = 0
+        self.check_lock = threading.Lock()
+
+
+class ReplicaSet:
+    """
+    Read replicas used round-robin. A replica is checked (connect and replication lag) when its last check is older
+    than check_interval seconds, by the request that picks it; a query failing with a connection error marks it
+    unhealthy until the next check succeeds. Replicas more than max_lag seconds behind are skipped as well.
+    """
+
+    def __init__(self, engines: List[Engine], check_interval: float = 5.0, max_lag: Optional[float] = None):
+        self.replicas = [Replica(engine) for engine in engines]
+        self.check_interval = check_interval
+        self.max_lag = max_lag
+        self._next = itertools.count()
+        for replica in self.replicas:
+            event.listen(replica.engine, 'handle_error', self._on_error(replica))
+
+    def engine(self) -> Optional[Engine]:
+        """ The next healthy replica, None if there is none and the primary has to serve the read """
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[next(self._next) % len(self.replicas)]
+            if self._is_healthy(replica):
+                replica.reads += 1
+                return replica.engine
+        return None
+
+    def _is_healthy(self, replica: Replica) -> bool:
+        due = replica.checked_at is None or time.monotonic() - replica.checked_at >= self.check_interval
+        # one request checks, the others use the last result meanwhile
+        if due and replica.check_lock.acquire(blocking=False):
+            try:
+                self.check(replica)
+            finally:
+                replica.check_lock.release()
+        return replica.healthy
+
+    def check(self, replica: Replica):
+        try:
+            with replica.engine.connect() as connection:
+                query = REPLICATION_LAG_QUERY.get(replica.engine.dialect.name, DEFAULT_LAG_QUERY)
+                replica.lag = float(connection.execute(text(query)).scalar() or 0)
+            healthy = self.max_lag is None or replica.lag <= self.max_lag
+            if not healthy:
+                logger.error('replica %r lags %.1f seconds behind', replica.engine.url, replica.lag)
+        except SQLAlchemyError as e:
+            # counted as failure by handle_error
+            logger.error('replica %r failed its health check: %s', replica.engine.url, e)
+            healthy = False
+        replica.healthy = healthy
+        replica.checked_at = time.monotonic()
+
+    def _on_error(self, replica: Replica):
+        def handle_error(context):
+            if context.is_disconnect or context.connection is None:
+                replica.failures += 1
+                replica.healthy = False
+                replica.checked_at = time.monotonic()
+
+        return handle_error
+
+    def snapshot(self) -> List[dict]:
+        return [{
+            'url': repr(replica.engine.url),
+            'healthy': replica.healthy,
+            'lag_seconds': replica.lag,
+            'reads': replica.reads,
+            'failures': replica.failures
+        } for replica in self.replicas]
+
+    def dispose(self):
+        for replica in self.replicas:
+            replica.engine.dispose()
+
+
+class RoutingSession(SignallingSession):
+    """
+    Sends the statements of requests marked with g.use_replica to a replica of app.extensions['replicas'], the same
+    one for the whole request; everything else (writes, flushes, CLI commands, warm-up, statements run inside
+    primary()) goes to the primary.
+    """
+
+    _primary_depth = 0
+
+    @contextmanager
+    def primary(self):
+        """ Sends the statements run inside to the primary, also in requests marked with g.use_replica """
+        self._primary_depth += 1
+        try:
+            yield self
+        finally:
+            self._primary_depth -= 1
+
+    def get_bind(self, mapper=None, clause=None):
+        replicas = self.app.extensions.get('replicas')
+        if replicas is not None and not self._flushing and not self._primary_depth and has_request_context() \
+                and g.get('use_replica'):
+            if 'replica_engine' not in g:
+                g.replica_engine = replicas.engine()
+            if g.replica_engine is not None:
+                return g.replica_engine
+        return super().get_bind(mapper, clause)
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """ SQLAlchemy with sessions routing reads to replicas """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
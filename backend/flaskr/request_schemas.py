@@ -0,0 +1,267 @@
+import json
+import re
+from typing import Any, Callable, Dict, List
+
+import yaml
+from werkzeug.exceptions import UnprocessableEntity
+
+from flaskr.validation import INVALID_INTEGER_VALUE_MESSAGE, INVALID_STRING_VALUE_MESSAGE, \
+    INVALID_BOOLEAN_VALUE_MESSAGE, INVALID_NUMBERS_ARRAY_MESSAGE_TEMPLATE
+
+INVALID_NUMBER_VALUE_MESSAGE = "Error: '%s' not present, not a number or invalid value"
+INVALID_OBJECT_VALUE_MESSAGE = "Error: '%s' not present, not an object or invalid value"
+INVALID_ARRAY_VALUE_MESSAGE = "Error: '%s' not present, not a list or invalid value"
+TOO_SHORT_MESSAGE = "Error: '%s' too short, type at least %d characters"
+TOO_SMALL_MESSAGE = "Error: '%s' must be at least %s"
+TOO_LARGE_MESSAGE = "Error: '%s' must be at most %s"
+
+# reported errors per request body, an array reports only its first invalid item
+MAX_ERRORS = 20
+
+# checks the value found at path, appends error messages and returns whether the value is valid
+Check = Callable[[Any, str, List[str]], bool]
+
+# python types of the JSON values per schema type, true/false are never accepted as numbers
+PYTHON_TYPES = {
+    'integer': (int,),
+    'int': (int,),
+    'number': (int, float),
+    'string': (str,),
+    'boolean': (bool,),
+    'array': (list,),
+    'object': (dict,),
+    'null': (type(None),),
+}
+
+
+class ValidationError(UnprocessableEntity):
+    """ 422 carrying all errors found in a request body """
+
+    def __init__(self, errors: List[str]):
+        super().__init__(description='; '.join(errors))
+        self.errors = errors
+
+
+def schema_types(schema: dict) -> List[str]:
+    """
+    Accepted types of a schema. Swagger 2.0 allows a single 'type' only, so 'x-types' lists several types
+    and 'x-nullable' adds null.
+    """
+    types = schema.get('x-types', schema.get('type', []))
+    types = list(types) if isinstance(types, list) else [types]
+    if schema.get('x-nullable'):
+        types.append('null')
+    return types
+
+
+def type_message(schema: dict) -> str:
+    """ Message template for a value of schema that is missing or of the wrong type """
+    types = schema_types(schema)
+    if 'array' in types:
+        item_types = schema_types(schema.get('items', {}))
+        return INVALID_NUMBERS_ARRAY_MESSAGE_TEMPLATE if {'integer', 'int', 'number'} & set(item_types) \
+            else INVALID_ARRAY_VALUE_MESSAGE
+    if {'integer', 'int'} & set(types):
+        return INVALID_INTEGER_VALUE_MESSAGE
+    if 'number' in types:
+        return INVALID_NUMBER_VALUE_MESSAGE
+    if 'string' in types:
+        return INVALID_STRING_VALUE_MESSAGE
+    if 'boolean' in types:
+        return INVALID_BOOLEAN_VALUE_MESSAGE
+    return INVALID_OBJECT_VALUE_MESSAGE
+
+
+def accepted_types(schema: dict) -> frozenset:
+    """ Python types of the values accepted by schema, empty to accept any value """
+    try:
+        return frozenset(python_type for type_name in schema_types(schema) for python_type in PYTHON_TYPES[type_name])
+    except KeyError as e:
+        raise ValueError(f'unsupported schema type {e}')
+
+
+def compile_pattern(pattern: str) -> re.Pattern:
+    """
+    Compiles the pattern of a schema with the semantics of JSON Schema (ECMA-262): $ outside of character classes
+    only matches at the end of the string, not before a trailing newline as in Python.
+    """
+    translated = []
+    escaped = in_class = False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == '\\':
+            escaped = True
+        elif char == '[':
+            in_class = True
+        elif char == ']':
+            in_class = False
+        elif char == '$' and not in_class:
+            char = r'\Z'
+        translated.append(char)
+    return re.compile(''.join(translated))
+
+
+def compile_predicate(schema: dict) -> Callable[[Any], bool]:
+    """ Compiles the schema of a scalar into a single predicate, without error messages """
+    accepted = accepted_types(schema)
+    constraints = []
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+        constraints.append(lambda value: type(value) is not str or len(value) >= min_length)
+    if 'pattern' in schema:
+        search = compile_pattern(schema['pattern']).search
+        constraints.append(lambda value: type(value) is not str or search(value) is not None)
+    if 'maximum' in schema:
+        maximum = schema['maximum']
+        constraints.append(lambda value: type(value) not in (int, float) or value <= maximum)
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+        if accepted and accepted <= {int, float} and not constraints:
+            # the common case of arrays of ids, a single expression per item
+            return lambda value: type(value) in accepted and value >= minimum
+        constraints.append(lambda value: type(value) not in (int, float) or value >= minimum)
+
+    if not accepted:
+        return lambda value: all(constraint(value) for constraint in constraints)
+    if not constraints:
+        return lambda value: type(value) in accepted
+    return lambda value: type(value) in accepted and all(constraint(value) for constraint in constraints)
+
+
+def compile_schema(schema: dict) -> Check:
+    """
+    Compiles a schema into nested checks, so validating a body does not interpret the schema again.
+
+    Supports the subset of JSON schema the request definitions use: type (x-types, x-nullable), properties,
+    required, items, minLength, pattern, minimum and maximum.
+    """
+    accepted = accepted_types(schema)
+    message = type_message(schema)
+    checks: List[Check] = []
+
+    if 'properties' in schema:
+        properties = [(name, compile_schema(property_schema))
+                      for name, property_schema in schema['properties'].items()]
+        required = [(name, type_message(schema['properties'].get(name, {}))) for name in schema.get('required', [])]
+
+        def check_properties(value, path, errors):
+            if type(value) is not dict:
+                return True
+            prefix = f'{path}.' if path else ''
+            valid = True
+            for name, missing_message in required:
+                if name not in value:
+                    errors.append(missing_message % f'{prefix}{name}')
+                    valid = False
+            for name, check_property in properties:
+                if name in value:
+                    valid = check_property(value[name], f'{prefix}{name}', errors) and valid
+            return valid
+
+        checks.append(check_properties)
+
+    if 'items' in schema:
+        items = schema['items']
+        if 'properties' in items or 'items' in items:
+            check_item = compile_schema(items)
+            is_valid_item = lambda item: check_item(item, '', [])
+        else:
+            # long arrays of scalars, e.g. previous_questions, are checked without any per item overhead
+            is_valid_item = compile_predicate(items)
+
+        def check_items(value, path, errors):
+            if type(value) is list and not all(map(is_valid_item, value)):
+                errors.append(message % path)
+                return False
+            return True
+
+        checks.append(check_items)
+
+    if 'minLength' in schema:
+        min_length = schema['minLength']
+
+        def check_min_length(value, path, errors):
+            if type(value) is str and len(value) < min_length:
+                errors.append(TOO_SHORT_MESSAGE % (path, min_length))
+                return False
+            return True
+
+        checks.append(check_min_length)
+
+    if 'pattern' in schema:
+        pattern = compile_pattern(schema['pattern'])
+
+        def check_pattern(value, path, errors):
+            if type(value) is str and pattern.search(value) is None:
+                errors.append(message % path)
+                return False
+            return True
+
+        checks.append(check_pattern)
+
+    if 'minimum' in schema:
+        minimum = schema['minimum']
+
+        def check_minimum(value, path, errors):
+            if (type(value) is int or type(value) is float) and value < minimum:
+                errors.append(TOO_SMALL_MESSAGE % (path, minimum))
+                return False
+            return True
+
+        checks.append(check_minimum)
+
+    if 'maximum' in schema:
+        maximum = schema['maximum']
+
+        def check_maximum(value, path, errors):
+            if (type(value) is int or type(value) is float) and value > maximum:
+                errors.append(TOO_LARGE_MESSAGE % (path, maximum))
+                return False
+            return True
+
+        checks.append(check_maximum)
+
+    def check(value, path, errors):
+        if accepted and type(value) not in accepted:
+            errors.append(message % path)
+            return False
+        valid = True
+        for value_check in checks:
+            valid = value_check(value, path, errors) and valid
+        return valid
+
+    return check
+
+
+class RequestSchema:
+    """ A compiled schema of a request body """
+
+    def __init__(self, name: str, schema: dict):
+        self.name = name
+        self._check = compile_schema(schema)
+
+    def errors(self, data: Any) -> List[str]:
+        """ All errors of data, empty if it is valid """
+        errors: List[str] = []
+        self._check(data, '', errors)
+        return errors[:MAX_ERRORS]
+
+    def validate(self, data: Any):
+        """ Raises a ValidationError (422) with all errors if data is invalid """
+        errors = self.errors(data)
+        if errors:
+            raise ValidationError(errors)
+
+
+def load_definitions(path: str) -> dict:
+    """ Reads the definitions of a Swagger definitions file (YAML) or of a built spec (JSON) """
+    with open(path) as definitions_file:
+        if path.endswith('.json'):
+            return json.load(definitions_file)['definitions']
+        return yaml.safe_load(definitions_file)
+
+
+def compile_definitions(definitions: dict) -> Dict[str, RequestSchema]:
+    """ Compiles the request body definitions (names ending in 'Request') """
+    return {name: RequestSchema(name, schema) for name, schema in definitions.items() if name.endswith('Request')}
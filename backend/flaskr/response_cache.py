@@ -0,0 +1,214 @@
+import struct
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable, Dict, Optional, Tuple
+
+from flask import Response, current_app, g, request
+
+# invalidation scope of all questions
+ALL_CATEGORIES = None
+# length of the plain body heading an entry, followed by the plain and the gzip compressed body (may be empty)
+ENTRY_HEADER = struct.Struct('>I')
+
+
+class CacheBackend:
+    """
+    Storage of a ResponseCache. Implement it to share the cache between processes (e.g. with Redis or memcached);
+    the generation counters have to be shared as well, so writes of any process invalidate the entries of all.
+    """
+
+    def get(self, key: str) -> Optional[bytes]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]):
+        raise NotImplementedError
+
+    def generation(self, name: str) -> int:
+        """ Current value of a generation counter, 0 if it was never incremented """
+        raise NotImplementedError
+
+    def increment(self, name: str):
+        """ Increments a generation counter atomically """
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+    def stats(self) -> dict:
+        return {}
+
+
+class LRUCacheBackend(CacheBackend):
+    """ In-process backend holding up to max_entries entries, evicting the least recently used ones """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: 'OrderedDict[str, Tuple[Optional[float], bytes]]' = OrderedDict()
+        self._generations: Dict[str, int] = {}
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and time.monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl if ttl is not None else None, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, name: str) -> int:
+        return self._generations.get(name, 0)
+
+    def increment(self, name: str):
+        with self._lock:
+            self._generations[name] = self._generations.get(name, 0) + 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'evictions': self.evictions,
+            'expirations': self.expirations
+        }
+
+
+def pack_entry(body: bytes, compressed_body: Optional[bytes] = None) -> bytes:
+    """ Value of a cache entry holding the plain body and, if any, its gzip compressed body """
+    return ENTRY_HEADER.pack(len(body)) + body + (compressed_body or b'')
+
+
+def unpack_entry(value: bytes) -> Tuple[bytes, Optional[bytes]]:
+    """ Plain and gzip compressed body (None if not stored) of a cache entry """
+    length, = ENTRY_HEADER.unpack_from(value)
+    start = ENTRY_HEADER.size
+    return value[start:start + length], value[start + length:] or None
+
+
+
+class ResponseCache:
+    """
+    Read-through cache of serialized JSON responses of GET endpoints, see cached().
+
+    Entries are keyed by endpoint, view arguments and query string, and by the generation of their invalidation
+    scope: the category of category routes, all questions otherwise. invalidate() bumps the generations of a
+    category and of all questions, so writes only invalidate the entries they affect. A backend of None
+    disables the cache.
+
+    Responses read from a replica (g.replica_engine) are not stored within replica_window seconds of the last
+    invalidation: the replica may not have caught up with the write yet, and its stale response would be cached
+    under the new generation.
+    """
+
+    def __init__(self, backend: Optional[CacheBackend] = None, ttl: Optional[float] = None,
+                 replica_window: float = 0):
+        self.backend = backend
+        self.ttl = ttl
+        self.replica_window = replica_window
+        self.invalidated_at: Optional[float] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, category_id: Optional[int]):
+        """ Invalidates the entries of given category and of all questions """
+        if self.backend is None:
+            return
+        self.invalidated_at = time.monotonic()
+        self.backend.increment(self._scope(ALL_CATEGORIES))
+        if category_id is not ALL_CATEGORIES:
+            self.backend.increment(self._scope(category_id))
+
+    def clear(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def stores_replica_reads(self) -> bool:
+        """ Whether responses read from a replica may be stored, i.e. the last write is old enough """
+        return self.invalidated_at is None or time.monotonic() - self.invalidated_at >= self.replica_window
+
+    @staticmethod
+    def _scope(category_id) -> str:
+        return 'all' if category_id is ALL_CATEGORIES else f'category:{category_id}'
+
+    def key(self, endpoint: str, view_args: dict, args) -> str:
+        """ Cache key of a request, query arguments in a canonical order """
+        scope = self._scope(view_args.get('category_id', ALL_CATEGORIES))
+        arguments = '&'.join(f'{name}={value}' for name, value in sorted(args.items(multi=True)))
+        view_arguments = ','.join(f'{name}={value}' for name, value in sorted(view_args.items()))
+        return f'{endpoint}:{view_arguments}:{scope}@{self.backend.generation(scope)}?{arguments}'
+
+    def cached(self, view: Callable) -> Callable:
+        """
+        Decorates a view returning a JSON response: successful responses are stored as serialized bytes,
+        hits are returned without running the view (no SQL and no jsonify).
+        Requests setting g.bypass_response_cache neither read nor fill the cache.
+
+        With compression (app.extensions['compression']), an entry holds the gzip compressed body next to the plain
+        one (both are compressed when it is filled), so hits are not compressed again and an entry counts once
+        against the capacity of the backend.
+        """
+
+        @wraps(view)
+        def cached_view(**view_args):
+            if self.backend is None or g.get('bypass_response_cache'):
+                return view(**view_args)
+
+            key = self.key(request.endpoint, view_args, request.args)
+            compression = current_app.extensions.get('compression')
+            value = self.backend.get(key)
+            if value is not None:
+                with self._lock:
+                    self.hits += 1
+                body, compressed_body = unpack_entry(value)
+                response = Response(body, mimetype='application/json')
+            else:
+                with self._lock:
+                    self.misses += 1
+                response = view(**view_args)
+                if not isinstance(response, Response) or response.status_code != 200 or response.is_streamed:
+                    return response
+                if g.get('replica_engine') is not None and not self.stores_replica_reads():
+                    return response
+                body = response.get_data()
+                compressed_body = compression.compress(body) \
+                    if compression is not None and len(body) >= compression.min_size else None
+                self.backend.set(key, pack_entry(body, compressed_body), self.ttl)
+
+            if compression is not None and compressed_body is not None and compression.accepted(request):
+                return compression.compressed(response, compressed_body)
+            return response
+
+        return cached_view
+
+    def stats(self) -> dict:
+        """ Hit, miss and eviction counters for tuning the size and ttl """
+        stats = {
+            'enabled': self.backend is not None,
+            'hits': self.hits,
+            'misses': self.misses,
+            'ttl_seconds': self.ttl
+        }
+        if self.backend is not None:
+            stats['backend'] = type(self.backend).__name__
+            stats.update(self.backend.stats())
+        return stats
@@ -0,0 +1,221 @@
+import bisect
+import math
+import re
+import threading
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from flaskr.logger import logger
+
+# rows of (question_id, question, answer)
+SearchDocuments = Iterable[Tuple[int, Optional[str], Optional[str]]]
+
+TOKEN_PATTERN = re.compile(r'\w+')
+# shorter search tokens only match whole words, longer ones match as prefix as well
+MIN_PREFIX_LENGTH = 3
+ANSWER_WEIGHT = 0.5
+# loads of a reload until no write interferes, the last one is kept anyway
+RELOAD_ATTEMPTS = 3
+
+QUESTION_FIELD = 'question'
+ANSWER_FIELD = 'answer'
+
+'''
+PostgreSQL full-text search: tsvector columns maintained by a trigger and indexed with GIN.
+The statements are idempotent, so they can be applied to existing databases as well.
+'''
+
+POSTGRES_SEARCH_DDL = [
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS question_tsv tsvector",
+    "ALTER TABLE questions ADD COLUMN IF NOT EXISTS answer_tsv tsvector",
+    """
+    CREATE OR REPLACE FUNCTION questions_tsv_update() RETURNS trigger AS $$
+    BEGIN
+        NEW.question_tsv := to_tsvector('simple', coalesce(NEW.question, ''));
+        NEW.answer_tsv := to_tsvector('simple', coalesce(NEW.answer, ''));
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS questions_tsv_update ON questions",
+    """
+    CREATE TRIGGER questions_tsv_update BEFORE INSERT OR UPDATE OF question, answer ON questions
+    FOR EACH ROW EXECUTE PROCEDURE questions_tsv_update()
+    """,
+    """
+    UPDATE questions SET
+        question_tsv = to_tsvector('simple', coalesce(question, '')),
+        answer_tsv = to_tsvector('simple', coalesce(answer, ''))
+    WHERE question_tsv IS NULL OR answer_tsv IS NULL
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_questions_question_tsv ON questions USING gin (question_tsv)",
+    "CREATE INDEX IF NOT EXISTS ix_questions_answer_tsv ON questions USING gin (answer_tsv)",
+]
+POSTGRES_SEARCH_COLUMNS = ('question_tsv', 'answer_tsv')
+
+
+def full_text_search_installed(dialect_name: str, question_columns: Iterable[str]) -> bool:
+    """ Whether the questions table of a database has the tsvector columns of the full-text search """
+    return dialect_name == 'postgresql' and set(POSTGRES_SEARCH_COLUMNS) <= set(question_columns)
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """ Splits a text into lower case word tokens """
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def to_tsquery(search_term: str) -> str:
+    """ Builds a PostgreSQL tsquery matching all tokens of the search term, with the same prefix rules as the index """
+    return ' & '.join(
+        f"'{token}':*" if len(token) >= MIN_PREFIX_LENGTH else f"'{token}'" for token in tokenize(search_term)
+    )
+
+
+class InvertedIndex:
+    """
+    In-process inverted index over question and answer texts, used where PostgreSQL full-text search is not available.
+
+    All tokens of a search term have to match, tokens of at least MIN_PREFIX_LENGTH characters match as prefix.
+    Results are ranked by tf-idf, answer matches weighted by ANSWER_WEIGHT. The index is loaded lazily using the
+    given loader, kept in sync by Question.insert() / Question.delete() and reloaded when it is older than
+    max_age seconds (None disables the reload).
+
+    Every write bumps a generation: a reload during which the generation changed may miss that write, so it is
+    discarded and loaded again, up to RELOAD_ATTEMPTS times.
+    """
+
+    def __init__(self, loader: Callable[[], SearchDocuments], max_age: Optional[float] = None):
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[str, Dict[int, int]]] = {QUESTION_FIELD: {}, ANSWER_FIELD: {}}
+        self._documents: Dict[int, Dict[str, Counter]] = {}
+        self._vocabulary: List[str] = []
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+
+    def invalidate(self):
+        """ Marks the index as stale, it is reloaded on the next search """
+        with self._lock:
+            self._loaded_at = None
+
+    def reload(self):
+        """ Rebuilds the index from the database """
+        for attempt in range(1, RELOAD_ATTEMPTS + 1):
+            with self._lock:
+                generation = self._generation
+            documents = list(self.loader())
+            with self._lock:
+                if generation != self._generation and attempt < RELOAD_ATTEMPTS:
+                    # a write during the load, which may be missing from it
+                    continue
+                if generation != self._generation:
+                    logger.info('question search index was written while reloaded, it may be off until the next')
+                self._postings = {QUESTION_FIELD: {}, ANSWER_FIELD: {}}
+                self._documents = {}
+                self._vocabulary = []
+                for question_id, question, answer in documents:
+                    self._add(question_id, question, answer, sort_vocabulary=False)
+                self._vocabulary.sort()
+                self._loaded_at = time.monotonic()
+                break
+
+    def add(self, question_id: int, question: Optional[str], answer: Optional[str]):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            self._remove(question_id)
+            self._add(question_id, question, answer)
+
+    def remove(self, question_id: int):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            self._remove(question_id)
+
+    def remove_many(self, question_ids: Iterable[int]):
+        """ Removes a batch of questions under a single lock """
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            for question_id in question_ids:
+                self._remove(question_id)
+
+    def _add(self, question_id, question, answer, sort_vocabulary=True):
+        fields = {QUESTION_FIELD: Counter(tokenize(question)), ANSWER_FIELD: Counter(tokenize(answer))}
+        self._documents[question_id] = fields
+        for field, terms in fields.items():
+            postings = self._postings[field]
+            for term, frequency in terms.items():
+                if term not in self._postings[QUESTION_FIELD] and term not in self._postings[ANSWER_FIELD]:
+                    if sort_vocabulary:
+                        bisect.insort(self._vocabulary, term)
+                    else:
+                        self._vocabulary.append(term)
+                postings.setdefault(term, {})[question_id] = frequency
+
+    def _remove(self, question_id):
+        fields = self._documents.pop(question_id, None)
+        if fields is None:
+            return
+        for field, terms in fields.items():
+            postings = self._postings[field]
+            for term in terms:
+                postings[term].pop(question_id, None)
+                if not postings[term]:
+                    del postings[term]
+                    if term not in self._postings[QUESTION_FIELD] and term not in self._postings[ANSWER_FIELD]:
+                        del self._vocabulary[bisect.bisect_left(self._vocabulary, term)]
+
+    def _expand(self, token: str) -> List[str]:
+        if len(token) < MIN_PREFIX_LENGTH:
+            return [token]
+        terms = []
+        for position in range(bisect.bisect_left(self._vocabulary, token), len(self._vocabulary)):
+            if not self._vocabulary[position].startswith(token):
+                break
+            terms.append(self._vocabulary[position])
+        return terms
+
+    def search(self, search_term: str, include_answers: bool = False, ranked: bool = True) -> List[int]:
+        """ Returns the ids of all questions matching the search term, by relevance if ranked, else by id """
+        tokens = tokenize(search_term)
+        if not tokens:
+            return []
+
+        self._ensure_loaded()
+        fields = [(QUESTION_FIELD, 1.0)] + ([(ANSWER_FIELD, ANSWER_WEIGHT)] if include_answers else [])
+        with self._lock:
+            documents_count = len(self._documents) or 1
+            scores: Optional[Dict[int, float]] = None
+            for token in tokens:
+                token_scores = {}
+                for term in self._expand(token):
+                    for field, weight in fields:
+                        postings = self._postings[field].get(term, {})
+                        if not postings:
+                            continue
+                        idf = math.log(1 + documents_count / len(postings))
+                        for question_id, frequency in postings.items():
+                            token_scores[question_id] = token_scores.get(question_id, 0.0) + weight * frequency * idf
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {question_id: score + token_scores[question_id]
+                              for question_id, score in scores.items() if question_id in token_scores}
+                if not scores:
+                    return []
+
+        if ranked:
+            return sorted(scores, key=lambda question_id: (-scores[question_id], question_id))
+        return sorted(scores)
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.max_age is not None and time.monotonic() - loaded_at > self.max_age):
+            self.reload()
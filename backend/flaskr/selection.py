@@ -0,0 +1,243 @@
+import bisect
+import random
+import threading
+import time
+from typing import Callable, Collection, Dict, Iterable, List, Optional, Set, Tuple
+
+from flaskr.logger import logger
+
+# rows of (question_id, category_id)
+QuestionIds = Iterable[Tuple[int, Optional[int]]]
+
+ALL_CATEGORIES = None
+MAX_REJECTION_SAMPLES = 32
+# loads of a reload until no write interferes, the last one is kept anyway
+RELOAD_ATTEMPTS = 3
+
+
+class QuestionIdPool:
+    """
+    Set of question ids supporting O(1) uniform random choice.
+
+    Ids are kept in a list with a position map, deletes swap the last id into the freed slot.
+    Additionally a sorted copy of the ids gives every id a stable position, which quiz sessions
+    use to walk through a deterministic permutation of the pool. Keeping it sorted makes insert
+    and delete O(n) (a memmove), except for appending a new highest id.
+    """
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self.positions: Dict[int, int] = {}
+        self.sorted_ids: List[int] = []
+
+    def __len__(self):
+        return len(self.ids)
+
+    def add(self, question_id: int):
+        if question_id not in self.positions:
+            self.positions[question_id] = len(self.ids)
+            self.ids.append(question_id)
+            if not self.sorted_ids or self.sorted_ids[-1] < question_id:
+                self.sorted_ids.append(question_id)
+            else:
+                bisect.insort(self.sorted_ids, question_id)
+
+    def remove(self, question_id: int):
+        position = self.positions.pop(question_id, None)
+        if position is None:
+            return
+        last = self.ids.pop()
+        if position < len(self.ids):
+            self.ids[position] = last
+            self.positions[last] = position
+        del self.sorted_ids[bisect.bisect_left(self.sorted_ids, question_id)]
+
+    def add_many(self, question_ids: Iterable[int]):
+        """ Adds a batch of ids, sorting the sorted copy once """
+        added = [question_id for question_id in dict.fromkeys(question_ids) if question_id not in self.positions]
+        for question_id in added:
+            self.positions[question_id] = len(self.ids)
+            self.ids.append(question_id)
+        if added:
+            self.sorted_ids = sorted(self.sorted_ids + added)
+
+    def remove_many(self, question_ids: Collection[int]):
+        """ Removes a batch of ids, rebuilding the lists once instead of once per id """
+        removed = {question_id for question_id in question_ids if question_id in self.positions}
+        if not removed:
+            return
+        self.ids = [question_id for question_id in self.ids if question_id not in removed]
+        self.positions = {question_id: position for position, question_id in enumerate(self.ids)}
+        self.sorted_ids = [question_id for question_id in self.sorted_ids if question_id not in removed]
+
+    def choice(self, exclude: Collection[int] = (), rng: random.Random = random) -> Optional[int]:
+        """ Picks a uniformly random id that is not in exclude, None if there is none left """
+        if not self.ids:
+            return None
+
+        # rejection sampling is O(1) as long as most of the pool is not excluded
+        if len(exclude) < len(self.ids) // 2:
+            for _ in range(MAX_REJECTION_SAMPLES):
+                question_id = self.ids[rng.randrange(len(self.ids))]
+                if question_id not in exclude:
+                    return question_id
+
+        candidates = [question_id for question_id in self.ids if question_id not in exclude]
+        return rng.choice(candidates) if candidates else None
+
+    def sample(self, count: int, exclude: Collection[int] = (), rng: random.Random = random) -> List[int]:
+        """ Picks up to count distinct uniformly random ids that are not in exclude, in random order """
+        picked: List[int] = []
+        if len(exclude) + count < len(self.ids) // 2:
+            seen = set()
+            for _ in range(MAX_REJECTION_SAMPLES * count):
+                question_id = self.ids[rng.randrange(len(self.ids))]
+                if question_id not in exclude and question_id not in seen:
+                    seen.add(question_id)
+                    picked.append(question_id)
+                    if len(picked) == count:
+                        return picked
+
+        candidates = [question_id for question_id in self.ids if question_id not in exclude]
+        return rng.sample(candidates, min(count, len(candidates)))
+
+
+class QuestionSelectionIndex:
+    """
+    In-memory index of question ids per category to pick random questions for the quiz.
+
+    Replaces ORDER BY random() on the questions table: a pick costs O(1) (expected) and only the
+    picked row has to be loaded afterwards. The index is loaded lazily using the given loader,
+    kept in sync by Question.insert() / Question.delete() and reloaded when it is older than
+    max_age seconds (None disables the reload).
+
+    Every write bumps a generation: a reload during which the generation changed may miss that
+    write, so it is discarded and loaded again, up to RELOAD_ATTEMPTS times.
+    """
+
+    def __init__(self, loader: Callable[[], QuestionIds], max_age: Optional[float] = None):
+        self.loader = loader
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._pools: Dict[Optional[int], QuestionIdPool] = {}
+        self._categories: Dict[int, Optional[int]] = {}
+        self._loaded_at: Optional[float] = None
+        self._generation = 0
+
+    def invalidate(self):
+        """ Marks the index as stale, it is reloaded on the next pick """
+        with self._lock:
+            self._loaded_at = None
+
+    def reload(self):
+        """ Rebuilds the index from the database """
+        for attempt in range(1, RELOAD_ATTEMPTS + 1):
+            with self._lock:
+                generation = self._generation
+            pools, categories = self._load()
+            with self._lock:
+                if generation != self._generation and attempt < RELOAD_ATTEMPTS:
+                    # a write during the load, which may be missing from it
+                    continue
+                if generation != self._generation:
+                    logger.info('question selection was written while reloaded, it may be off until the next')
+                self._pools = pools
+                self._categories = categories
+                self._loaded_at = time.monotonic()
+                break
+
+    def _load(self) -> Tuple[Dict[Optional[int], QuestionIdPool], Dict[int, Optional[int]]]:
+        pools = {ALL_CATEGORIES: QuestionIdPool()}
+        categories = {}
+        for question_id, category_id in self.loader():
+            pools[ALL_CATEGORIES].add(question_id)
+            pools.setdefault(category_id, QuestionIdPool()).add(question_id)
+            categories[question_id] = category_id
+        return pools, categories
+
+    def add(self, question_id: int, category_id: Optional[int]):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            self._pools[ALL_CATEGORIES].add(question_id)
+            self._pools.setdefault(category_id, QuestionIdPool()).add(question_id)
+            self._categories[question_id] = category_id
+
+    def remove(self, question_id: int):
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None or question_id not in self._categories:
+                return
+            category_id = self._categories.pop(question_id)
+            self._pools[ALL_CATEGORIES].remove(question_id)
+            self._pools[category_id].remove(question_id)
+
+    def add_many(self, rows: QuestionIds):
+        """ Adds a batch of (question_id, category_id) rows """
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            by_category: Dict[Optional[int], List[int]] = {}
+            for question_id, category_id in rows:
+                by_category.setdefault(category_id, []).append(question_id)
+                self._categories[question_id] = category_id
+            self._pools[ALL_CATEGORIES].add_many(question_id for ids in by_category.values() for question_id in ids)
+            for category_id, ids in by_category.items():
+                self._pools.setdefault(category_id, QuestionIdPool()).add_many(ids)
+
+    def remove_many(self, question_ids: Iterable[int]):
+        """ Removes a batch of question ids, each pool is rebuilt once """
+        with self._lock:
+            self._generation += 1
+            if self._loaded_at is None:
+                return
+            by_category: Dict[Optional[int], Set[int]] = {}
+            for question_id in question_ids:
+                if question_id in self._categories:
+                    by_category.setdefault(self._categories.pop(question_id), set()).add(question_id)
+            self._pools[ALL_CATEGORIES].remove_many(set().union(*by_category.values()))
+            for category_id, ids in by_category.items():
+                self._pools[category_id].remove_many(ids)
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is None or (self.max_age is not None and time.monotonic() - loaded_at > self.max_age):
+            self.reload()
+
+    def pick(self, category_id: Optional[int] = ALL_CATEGORIES, exclude: Collection[int] = ()) -> Optional[int]:
+        """ Picks a random question id of given category (all categories for None) that is not in exclude """
+        self._ensure_loaded()
+        with self._lock:
+            pool = self._pools.get(category_id)
+            return pool.choice(exclude) if pool is not None else None
+
+    def pick_many(self, category_id: Optional[int], count: int, exclude: Collection[int] = ()) -> List[int]:
+        """ Picks up to count distinct random question ids of given category (all for None) not in exclude """
+        self._ensure_loaded()
+        with self._lock:
+            pool = self._pools.get(category_id)
+            return pool.sample(count, exclude) if pool is not None else []
+
+    def size(self, category_id: Optional[int] = ALL_CATEGORIES) -> int:
+        """ Number of questions in given category (all categories for None) """
+        self._ensure_loaded()
+        with self._lock:
+            pool = self._pools.get(category_id)
+            return len(pool) if pool is not None else 0
+
+    def sorted_id(self, category_id: Optional[int], position: int) -> Optional[int]:
+        """ Question id at position of the id-ordered questions of given category, None if out of range """
+        self._ensure_loaded()
+        with self._lock:
+            pool = self._pools.get(category_id)
+            if pool is None or position >= len(pool.sorted_ids):
+                return None
+            return pool.sorted_ids[position]
+
+    def category_of(self, question_id: int) -> Optional[int]:
+        """ Category id of given question """
+        self._ensure_loaded()
+        with self._lock:
+            return self._categories.get(question_id)
@@ -1,23 +1,18 @@
 from typing import Any
 
-from flask import json, jsonify, request, abort
+from flask import json, abort
 
 INVALID_INTEGER_VALUE_MESSAGE = "Error: '%s' not present, not integer or invalid value"
 INVALID_STRING_VALUE_MESSAGE = "Error: '%s' not present, not string or invalid value"
+INVALID_BOOLEAN_VALUE_MESSAGE = "Error: '%s' not present, not boolean or invalid value"
 INVALID_NUMBERS_ARRAY_MESSAGE_TEMPLATE = "Error: '%s' not present or not a numeric list"
 
 
 def extract_incoming_json(request) -> json:
-    data: json = jsonify("")
-
-    try:
-        if request.is_json and json.loads(request.get_data()):
-            data = request.get_json()
-        else:
-            raise ValueError("Error: incorrect MIME-Type")
-    except ValueError:
+    """ Parses the JSON body once (Flask caches it), aborts with 400 unless it is a non-empty JSON document """
+    data: json = request.get_json(silent=True) if request.is_json else None
+    if not data:
         abort(400, description="Error: payload is not a valid json")
-
     return data
 
 
@@ -38,6 +33,11 @@ def check_strings_list(lst: Any) -> bool:
            all((isinstance(x, str) for x in lst))
 
 
+def check_bool(maybe_bool: Any) -> bool:
+    """ Checks if variable is of type bool """
+    return isinstance(maybe_bool, bool)
+
+
 def check_float(maybe_float: Any) -> bool:
     """ Checks if variable is of type float """
     return isinstance(maybe_float, float)
@@ -45,14 +45,14 @@ def check_float(maybe_float: Any) -> bool:
 
 def check_int(maybe_int: Any) -> bool:
     """ Checks if variable is of type int """
-    return isinstance(maybe_int, int) or str(maybe_int).isdigit()
+    return isinstance(maybe_int, int) or (isinstance(maybe_int, str) and maybe_int.isdigit())
 
 
 def check_numbers_list(lst: Any) -> bool:
     """ Checks if variable is a list, not empty with members of type int of float, i.e. List[int] or List[float] """
     return isinstance(lst, list) and \
            len(lst) > 0 and \
-           all((isinstance(x, int) and str(x).isdigit()) or isinstance(x, float) for x in lst)
+           all((type(x) is int and x >= 0) or type(x) is float for x in lst)
 
 
 def valid_string(data: dict, key: str) -> bool:
@@ -67,6 +67,12 @@ def valid_int(data: dict, key: str) -> bool:
            check_int(data[key])
 
 
+def valid_bool(data: dict, key: str) -> bool:
+    """ Checks dict contains key whose associated values represent a boolean """
+    return has_key(data, key) and \
+           check_bool(data[key])
+
+
 def valid_strings_array(data: dict, key: str) -> bool:
     """ Checks if dict contains a key whose associated value represents a list o number (int or float) """
     return has_key(data, key) and \
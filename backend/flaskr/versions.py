@@ -0,0 +1,92 @@
+import hashlib
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+# rows of (category_id, number of questions, highest question id, checksum of the updatable columns,
+# last modification as naive UTC datetime or None)
+CategoryFingerprints = Iterable[Tuple[Optional[int], int, Optional[int], Optional[int], Optional[datetime]]]
+
+# version scope of all questions
+ALL_CATEGORIES = None
+
+
+class DataVersions:
+    """
+    Data versions of the questions, a global one and one per category, to validate cached responses.
+
+    Versions are derived from the database only, so all processes serving the same data send the same validators:
+    the ETag is a hash of the per category fingerprints (number of questions, highest id, checksum of the updatable
+    columns, last modification) of the given loader, Last-Modified the last modification. Inserts and deletes change
+    the count or highest id, updates (also moves to another category) the checksums.
+
+    Question.insert() / Question.delete() of this process mark the fingerprints stale (bump()), so they are loaded
+    again on the next read; changes by other processes are detected when they are older than max_age seconds
+    (None disables the check). on_change is called with the category id of each change detected by a load.
+    """
+
+    def __init__(self, loader: Callable[[], CategoryFingerprints], max_age: Optional[float] = None,
+                 on_change: Optional[Callable[[Optional[int]], None]] = None):
+        self.loader = loader
+        self.max_age = max_age
+        self.on_change = on_change
+        self._lock = threading.Lock()
+        self._etags: Dict[Optional[int], str] = {}
+        self._modified: Dict[Optional[int], datetime] = {}
+        self._fingerprints: Dict[Optional[int], tuple] = {}
+        self._checked_at: Optional[float] = None
+        self._loaded = False
+
+    def invalidate(self):
+        """ Marks the fingerprints as stale, they are compared against the database on the next read """
+        with self._lock:
+            self._checked_at = None
+
+    def reconcile(self) -> bool:
+        """ Loads the fingerprints from the database and derives the versions, returns True if any changed """
+        fingerprints = {category_id: tuple(fingerprint) for category_id, *fingerprint in self.loader()}
+        etags = {category_id: self._hash(category_id, fingerprint) for category_id, fingerprint in fingerprints.items()}
+        etags[ALL_CATEGORIES] = self._hash(ALL_CATEGORIES, sorted(fingerprints.items(), key=repr))
+        modified = {category_id: fingerprint[-1] for category_id, fingerprint in fingerprints.items()
+                    if fingerprint[-1] is not None}
+        if modified:
+            modified[ALL_CATEGORIES] = max(modified.values())
+        with self._lock:
+            changed = set()
+            if self._loaded:
+                changed = {category_id for category_id in set(fingerprints) | set(self._fingerprints)
+                           if fingerprints.get(category_id) != self._fingerprints.get(category_id)}
+            self._fingerprints = fingerprints
+            self._etags = etags
+            self._modified = modified
+            self._checked_at = time.monotonic()
+            self._loaded = True
+        if self.on_change is not None:
+            for category_id in changed:
+                self.on_change(category_id)
+        return bool(changed)
+
+    def bump(self, category_id: Optional[int]):
+        """ Records a change of the questions of given category: the versions are loaded again on the next read """
+        self.invalidate()
+
+    @staticmethod
+    def _hash(category_id: Optional[int], fingerprint) -> str:
+        return hashlib.sha1(repr((category_id, fingerprint)).encode()).hexdigest()[:16]
+
+    def _ensure_checked(self):
+        checked_at = self._checked_at
+        if checked_at is None or (self.max_age is not None and time.monotonic() - checked_at > self.max_age):
+            self.reconcile()
+
+    def etag(self, category_id: Optional[int] = ALL_CATEGORIES) -> str:
+        """ Entity tag of the current version of given category (all questions for None) """
+        self._ensure_checked()
+        etag = self._etags.get(category_id)
+        return etag if etag is not None else self._hash(category_id, None)
+
+    def last_modified(self, category_id: Optional[int] = ALL_CATEGORIES) -> Optional[datetime]:
+        """ Last change (naive UTC) of given category, None if no write of the app recorded one """
+        self._ensure_checked()
+        return self._modified.get(category_id)
@@ -0,0 +1,46 @@
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from flaskr.logger import logger
+
+
+class WarmUp:
+    """
+    Steps run before a worker serves its first request, e.g. opening pool connections and loading the in-memory
+    indexes, so the first requests do not pay for them. Further steps are added with the step decorator.
+
+    A failing step is logged and skipped: whatever it should have prepared is loaded by the first request instead.
+    """
+
+    def __init__(self):
+        self.steps: List[Tuple[str, Callable[[], Any]]] = []
+        self.timings: Dict[str, float] = {}
+
+    def step(self, name: str):
+        """ Decorator adding a step, steps run in the order they were added """
+
+        def decorator(fn):
+            self.steps.append((name, fn))
+            return fn
+
+        return decorator
+
+    def run(self) -> Dict[str, float]:
+        """ Runs all steps within the app context of the caller and returns the seconds per step """
+        timings = {}
+        for name, fn in self.steps:
+            start = time.perf_counter()
+            try:
+                fn()
+            except Exception:
+                logger.exception('warm-up step %s failed', name)
+            timings[name] = time.perf_counter() - start
+        self.timings = timings
+        return timings
+
+
+def open_connections(engine, count: int):
+    """ Opens count connections at once and returns them to the pool, where they stay open for the first requests """
+    connections = [engine.connect() for _ in range(count)]
+    for connection in connections:
+        connection.close()
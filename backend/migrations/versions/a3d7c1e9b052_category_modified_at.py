@@ -0,0 +1,36 @@
+"""category modified_at
+
+Last change of the questions of a category, set by every write of the app within its transaction: the Last-Modified
+of the category's responses, the same in all processes.
+
+Revision ID: a3d7c1e9b052
+Revises: e5c75557f28f
+Create Date: 2026-10-18 15:02:27.104318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3d7c1e9b052'
+down_revision = 'e5c75557f28f'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    postgresql = op.get_bind().dialect.name == 'postgresql'
+    # naive UTC, also the default of rows inserted by other tools (e.g. COPY of a dump)
+    now = "timezone('utc', now())" if postgresql else 'CURRENT_TIMESTAMP'
+    # SQLite cannot add a column with a non-constant default, batch mode recreates the table there
+    with op.batch_alter_table('categories', recreate='auto' if postgresql else 'always') as batch_op:
+        batch_op.add_column(sa.Column('modified_at', sa.DateTime(), server_default=sa.text(now), nullable=True))
+    # existing data counts as modified now
+    op.execute(f'UPDATE categories SET modified_at = {now} WHERE modified_at IS NULL')
+
+
+def downgrade():
+    # batch mode, so SQLite recreates the table
+    with op.batch_alter_table('categories') as batch_op:
+        batch_op.drop_column('modified_at')
@@ -0,0 +1,28 @@
+"""question indexes
+
+(category_id, id) serves the category pages, cursors and counts and the category exports in id order, and the
+foreign key lookups of category_id; difficulty serves the exports filtered by difficulty.
+
+Revision ID: e5c75557f28f
+Revises: f8c39322da34
+Create Date: 2026-10-18 09:14:03.817442
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5c75557f28f'
+down_revision = 'f8c39322da34'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_questions_category_id_id', 'questions', ['category_id', 'id'], unique=False)
+    op.create_index('ix_questions_difficulty', 'questions', ['difficulty'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_questions_difficulty', table_name='questions')
+    op.drop_index('ix_questions_category_id_id', table_name='questions')
@@ -0,0 +1,46 @@
+"""baseline schema
+
+Tables of the models before migrations were introduced. Databases created by db.create_all() or trivia.psql
+are marked as migrated to this revision with: flask db stamp f8c39322da34
+
+Revision ID: f8c39322da34
+Revises:
+Create Date: 2026-10-18 09:12:41.531207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from flaskr.search import POSTGRES_SEARCH_DDL
+
+
+# revision identifiers, used by Alembic.
+revision = 'f8c39322da34'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('categories',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('type', sa.String(), nullable=True),
+                    sa.PrimaryKeyConstraint('id'))
+    op.create_table('questions',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('question', sa.String(), nullable=True),
+                    sa.Column('answer', sa.String(), nullable=True),
+                    sa.Column('difficulty', sa.Integer(), nullable=True),
+                    sa.Column('category_id', sa.Integer(), nullable=True),
+                    sa.ForeignKeyConstraint(['category_id'], ['categories.id']),
+                    sa.PrimaryKeyConstraint('id'))
+    if op.get_bind().dialect.name == 'postgresql':
+        for statement in POSTGRES_SEARCH_DDL:
+            op.execute(statement)
+
+
+def downgrade():
+    op.drop_table('questions')
+    op.drop_table('categories')
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP FUNCTION IF EXISTS questions_tsv_update()')
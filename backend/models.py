@@ -1,22 +1,145 @@
-from flask_migrate import Migrate
-from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import Column, String, Integer
+import os
+import time
+
+from collections import Counter
+from datetime import datetime
+from functools import wraps
+
+from sqlalchemy import BigInteger, Column, DateTime, String, Integer, DDL, Index, and_, cast, create_engine, event, false, func, \
+    inspect, select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+from flaskr.counters import QuestionCounters
 from flaskr.logger import logger
+from flaskr.pool_metrics import InstrumentedQueuePool, PoolMetrics
+from flaskr.replicas import ReplicaSet, RoutingSQLAlchemy
+from flaskr.response_cache import ResponseCache, LRUCacheBackend
+from flaskr.search import InvertedIndex, POSTGRES_SEARCH_DDL, ANSWER_WEIGHT, full_text_search_installed, to_tsquery
+from flaskr.selection import QuestionSelectionIndex
+from flaskr.versions import DataVersions
 
-db = SQLAlchemy()
-migrate = Migrate()
+db = RoutingSQLAlchemy()
+MIGRATIONS_DIRECTORY = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
 '''
 setup_db(app)
-    binds a flask application and a SQLAlchemy service
+    binds a flask application and a SQLAlchemy service;
+    DB_MIGRATE registers Flask-Migrate (flask db ...), DB_CREATE_ALL creates missing tables (both default True)
 '''
 
 
 def setup_db(app):
+    configured_options = app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+    for option, value in engine_options(app.config).items():
+        configured_options.setdefault(option, value)
     db.app = app
     db.init_app(app)
-    migrate.init_app(app, db)
-    db.create_all()
+    if app.config.get('DB_MIGRATE', True):
+        # imported here, so workers that do not need it skip importing alembic
+        from flask_migrate import Migrate
+        Migrate(app, db, directory=MIGRATIONS_DIRECTORY)
+    if app.config.get('DB_CREATE_ALL', True):
+        db.create_all()
+    app.extensions['pool_metrics'] = PoolMetrics(lambda: db.get_engine(app))
+    if app.extensions.get('replicas') is not None:
+        app.extensions['replicas'].dispose()
+    replica_uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+    app.extensions['replicas'] = ReplicaSet(
+        [create_engine(uri, **engine_options(app.config, uri)) for uri in replica_uris],
+        check_interval=app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 5),
+        max_lag=app.config.get('REPLICA_MAX_LAG')
+    ) if replica_uris else None
+    question_counters.max_age = app.config.get('QUESTION_COUNTERS_MAX_AGE', 60)
+    question_counters.invalidate()
+    question_selection.max_age = app.config.get('QUESTION_SELECTION_MAX_AGE', 300)
+    question_selection.invalidate()
+    question_search.max_age = app.config.get('QUESTION_SEARCH_MAX_AGE', 300)
+    question_search.invalidate()
+    data_versions.max_age = app.config.get('DATA_VERSIONS_MAX_AGE', 60)
+    data_versions.invalidate()
+    max_entries = app.config.get('RESPONSE_CACHE_MAX_ENTRIES', 1024)
+    response_cache.backend = app.config.get('RESPONSE_CACHE_BACKEND') or \
+        (LRUCacheBackend(max_entries) if max_entries else None)
+    response_cache.ttl = app.config.get('RESPONSE_CACHE_TTL', 60)
+    response_cache.replica_window = app.config.get('READ_YOUR_WRITES_WINDOW', 5)
+    # detected on the first search, see Question.uses_full_text_search
+    app.extensions['full_text_search'] = None
+
+
+'''
+on_primary(loader)
+    runs a loader of the process-wide indexes on the primary, also within requests reading from a replica:
+    a lagging replica would reset the indexes of all clients to stale data
+'''
+
+
+def on_primary(loader):
+    @wraps(loader)
+    def primary_loader(*args, **kwargs):
+        with db.session().primary():
+            return loader(*args, **kwargs)
+
+    return primary_loader
+
+
+'''
+engine_options(config, uri)
+    connection pool settings of the engine of uri (default SQLALCHEMY_DATABASE_URI), see README for the config keys
+'''
+
+
+def engine_options(config, uri=None) -> dict:
+    uri = uri or config['SQLALCHEMY_DATABASE_URI']
+    options = {
+        # test connections on checkout, so connections dropped by the server are replaced transparently
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DB_POOL_RECYCLE', 1800),
+    }
+    if not uri.startswith('sqlite'):
+        options.update({
+            'poolclass': InstrumentedQueuePool,
+            'pool_size': config.get('DB_POOL_SIZE', 5),
+            'max_overflow': config.get('DB_MAX_OVERFLOW', 10),
+            'pool_timeout': config.get('DB_POOL_TIMEOUT', 30),
+        })
+    if uri.startswith('postgresql'):
+        # executemany() as multi-row INSERT ... VALUES, used by bulk imports
+        options['executemany_mode'] = 'values'
+    return options
+
+
+'''
+install_postgres_search()
+    adds the full-text search columns, trigger and indexes to an existing PostgreSQL database
+'''
+
+
+def install_postgres_search():
+    for statement in POSTGRES_SEARCH_DDL:
+        db.session.execute(text(statement))
+    db.session.commit()
+    db.get_app().extensions['full_text_search'] = None
+
+
+'''
+utc_now()
+    the current time as naive UTC in SQL, like datetime.utcnow() of the app, e.g. as server default
+'''
+
+
+class utc_now(FunctionElement):
+    type = DateTime()
+
+
+@compiles(utc_now)
+def compile_utc_now(element, compiler, **kw):
+    # CURRENT_TIMESTAMP of SQLite is UTC
+    return 'CURRENT_TIMESTAMP'
+
+
+@compiles(utc_now, 'postgresql')
+def compile_utc_now_postgresql(element, compiler, **kw):
+    return "timezone('utc', now())"
 
 
 '''
@@ -30,6 +153,9 @@ class Category(db.Model):
 
     id = Column(Integer, primary_key=True)
     type = Column(String)
+    # last change of its questions (naive UTC), see Question.touch_categories; rows written by other tools
+    # (e.g. COPY of a dump) count as changed when they were inserted
+    modified_at = Column(DateTime, server_default=utc_now())
     category_questions = db.relationship("Question", backref="category")
 
     def __init__(self, type):
@@ -50,6 +176,11 @@ Question
 
 class Question(db.Model):
     __tablename__ = 'questions'
+    # category pages and cursors (category_id = ? ORDER BY id), filters by difficulty; see migrations/
+    __table_args__ = (
+        Index('ix_questions_category_id_id', 'category_id', 'id'),
+        Index('ix_questions_difficulty', 'difficulty'),
+    )
 
     id = Column(Integer, primary_key=True)
     question = Column(String)
@@ -65,31 +196,329 @@ class Question(db.Model):
 
     def insert(self):
         db.session.add(self)
+        db.session.flush()
+        question_id, category_id, difficulty = self.id, self.category_id, self.difficulty
+        question, answer = self.question, self.answer
+        Question.touch_categories({category_id})
         db.session.commit()
+        question_counters.add(category_id, difficulty, 1)
+        question_selection.add(question_id, category_id)
+        question_search.add(question_id, question, answer)
+        data_versions.bump(category_id)
+        response_cache.invalidate(category_id)
+        return question_id
 
     def update(self):
         db.session.commit()
 
     def delete(self):
+        question_id, category_id, difficulty = self.id, self.category_id, self.difficulty
         db.session.delete(self)
+        Question.touch_categories({category_id})
+        db.session.commit()
+        question_counters.add(category_id, difficulty, -1)
+        question_selection.remove(question_id)
+        question_search.remove(question_id)
+        data_versions.bump(category_id)
+        response_cache.invalidate(category_id)
+
+    @staticmethod
+    def insert_many(rows):
+        '''
+        Inserts question rows (dictionaries of column values) with a single executemany,
+        within the current transaction. Finish the import using commit_many or rollback.
+        '''
+        db.session.execute(Question.__table__.insert(), rows)
+
+    @staticmethod
+    def commit_many(counts):
+        '''
+        Commits the questions inserted by insert_many and updates counters and indexes once,
+        counts being a Counter of (category_id, difficulty) of the inserted questions.
+        '''
+        Question.touch_categories({category_id for category_id, _ in counts})
+        db.session.commit()
+        for (category_id, difficulty), count in counts.items():
+            question_counters.add(category_id, difficulty, count)
+            data_versions.bump(category_id)
+            response_cache.invalidate(category_id)
+        # ids of executemany inserts are not returned, the indexes reload on their next use
+        question_selection.invalidate()
+        question_search.invalidate()
+
+    @staticmethod
+    def delete_where(*conditions):
+        '''
+        Deletes the questions matching conditions with a single DELETE and commits, then updates counters,
+        indexes and caches once for the whole batch. Returns the number of deleted questions.
+        '''
+        table = Question.__table__
+        statement = table.delete().where(and_(*conditions))
+        if Question.uses_returning():
+            rows = db.session.execute(statement.returning(table.c.id, table.c.category_id, table.c.difficulty)) \
+                .fetchall()
+        else:
+            # the rows are selected within the same transaction, for the bookkeeping below
+            rows = Question.affected_rows(conditions)
+            if rows:
+                db.session.execute(statement)
+        Question.touch_categories({row.category_id for row in rows})
         db.session.commit()
 
+        question_ids = [row.id for row in rows]
+        for (category_id, difficulty), count in Counter((row.category_id, row.difficulty) for row in rows).items():
+            question_counters.add(category_id, difficulty, -count)
+        question_selection.remove_many(question_ids)
+        question_search.remove_many(question_ids)
+        Question.changed_categories({row.category_id for row in rows})
+        return len(rows)
+
+    @staticmethod
+    def update_where(values, *conditions):
+        '''
+        Sets values (category_id and/or difficulty) on the questions matching conditions with a single UPDATE
+        and commits, then updates counters, indexes and caches once for the whole batch.
+        Returns the number of updated questions.
+        '''
+        table = Question.__table__
+        if Question.uses_returning():
+            # UPDATE ... FROM the locked matching rows, RETURNING their values before the update
+            old = select([table.c.id, table.c.category_id, table.c.difficulty]) \
+                .where(and_(*conditions)).with_for_update().alias('old')
+            rows = db.session.execute(table.update().values(values).where(table.c.id == old.c.id)
+                                      .returning(old.c.id, old.c.category_id, old.c.difficulty)).fetchall()
+        else:
+            rows = Question.affected_rows(conditions)
+            if rows:
+                db.session.execute(table.update().values(values).where(and_(*conditions)))
+        category_ids = {row.category_id for row in rows}
+        if rows and 'category_id' in values:
+            category_ids.add(values['category_id'])
+        Question.touch_categories(category_ids)
+        db.session.commit()
+
+        moved = Counter()
+        for row in rows:
+            moved[row.category_id, row.difficulty] -= 1
+            moved[values.get('category_id', row.category_id), values.get('difficulty', row.difficulty)] += 1
+        for (category_id, difficulty), delta in moved.items():
+            if delta:
+                question_counters.add(category_id, difficulty, delta)
+        if 'category_id' in values:
+            question_selection.remove_many(row.id for row in rows)
+            question_selection.add_many((row.id, values['category_id']) for row in rows)
+        Question.changed_categories(category_ids)
+        return len(rows)
+
+    @staticmethod
+    def affected_rows(conditions):
+        return db.session.query(Question.id, Question.category_id, Question.difficulty) \
+            .filter(*conditions).with_for_update().all()
+
+    @staticmethod
+    def uses_returning():
+        '''
+        Whether DELETE / UPDATE ... RETURNING reports the affected rows, other databases select them first.
+        '''
+        return db.engine.dialect.name == 'postgresql'
+
+    @staticmethod
+    def touch_categories(category_ids):
+        '''
+        Sets modified_at of the categories within the current transaction, the Last-Modified of their questions
+        in all processes.
+        '''
+        category_ids = [category_id for category_id in category_ids if category_id is not None]
+        if category_ids:
+            table = Category.__table__
+            db.session.execute(table.update().where(table.c.id.in_(category_ids))
+                               .values(modified_at=datetime.utcnow()))
+
+    @staticmethod
+    def changed_categories(category_ids):
+        for category_id in category_ids:
+            data_versions.bump(category_id)
+            response_cache.invalidate(category_id)
+
+    @staticmethod
+    def rollback():
+        db.session.rollback()
+
     @staticmethod
     def db_close():
-        db.session.close()
+        '''
+        Ends the session of the current request, returning its connection to the pool.
+        Called once per request by the teardown handler of the app.
+        '''
+        db.session.remove()
 
     @staticmethod
     def count():
+        '''
+        Exact number of questions using SELECT count(*).
+        Endpoints should use the maintained question_counters instead.
+        '''
         return Question.query.count()
 
+    @staticmethod
+    @on_primary
+    def grouped_counts():
+        return db.session.query(
+            Question.category_id, Question.difficulty, func.count(Question.id)
+        ).group_by(Question.category_id, Question.difficulty).all()
+
+    @staticmethod
+    @on_primary
+    def ids_by_category():
+        return db.session.query(Question.id, Question.category_id).order_by(Question.id).all()
+
+    @staticmethod
+    @on_primary
+    def category_fingerprints():
+        '''
+        Per category: number of questions, highest id, the sum of id * difficulty, which changes with updates
+        of the difficulty (bigint, so it does not overflow on PostgreSQL), and its modified_at.
+        '''
+        modified = dict(db.session.query(Category.id, Category.modified_at).all())
+        fingerprints = [
+            (category_id, count, max_id, checksum, modified.pop(category_id, None))
+            for category_id, count, max_id, checksum in db.session.query(
+                Question.category_id, func.count(Question.id), func.max(Question.id),
+                func.sum(cast(Question.id, BigInteger) * Question.difficulty)
+            ).group_by(Question.category_id)
+        ]
+        # categories without questions
+        fingerprints.extend((category_id, 0, None, None, modified_at) for category_id, modified_at in modified.items())
+        return fingerprints
+
+    @staticmethod
+    @on_primary
+    def search_documents():
+        return db.session.query(Question.id, Question.question, Question.answer).all()
+
+    @staticmethod
+    def uses_full_text_search():
+        '''
+        Whether searches use the PostgreSQL full-text search, i.e. its tsvector columns exist (baseline migration
+        or flask install-search). Detected on first use and, while they are missing, again every
+        QUESTION_SEARCH_MAX_AGE seconds; the in-process index serves the searches meanwhile.
+        '''
+        app = db.get_app()
+        detected = app.extensions.get('full_text_search')
+        if detected is None or (not detected[0] and question_search.max_age is not None
+                                and time.monotonic() - detected[1] > question_search.max_age):
+            engine = db.engine
+            postgresql = engine.dialect.name == 'postgresql'
+            columns = [column['name'] for column in inspect(engine).get_columns('questions')] if postgresql else []
+            installed = full_text_search_installed(engine.dialect.name, columns)
+            if postgresql and not installed:
+                logger.warning('full-text search columns are missing, searching the in-process index; '
+                               'run flask db upgrade or flask install-search')
+            detected = app.extensions['full_text_search'] = (installed, time.monotonic())
+        return detected[0]
+
+    @staticmethod
+    def full_text_search(search_term, include_answers=False, fields=None):
+        '''
+        Returns the query of the question rows matching search_term and the relevance expression to order by.
+        Uses the full-text search columns of PostgreSQL, other databases use the question_search index.
+        '''
+        tsquery = to_tsquery(search_term)
+        if not tsquery:
+            return Question.rows(fields).filter(false()), text('0')
+
+        match = "question_tsv @@ to_tsquery('simple', :tsquery)"
+        rank = "ts_rank(question_tsv, to_tsquery('simple', :tsquery))"
+        if include_answers:
+            match = f"({match} OR answer_tsv @@ to_tsquery('simple', :tsquery))"
+            rank = f"{rank} + {ANSWER_WEIGHT} * ts_rank(answer_tsv, to_tsquery('simple', :tsquery))"
+
+        return Question.rows(fields).filter(text(match).bindparams(tsquery=tsquery)), \
+            text(f"{rank} DESC").bindparams(tsquery=tsquery)
+
+    @staticmethod
+    def rows(fields=None):
+        '''
+        Query of column-projected question rows holding the fields of format(), or only the given fields
+        (a sparse fieldset, see flaskr.fieldsets). Listings select these instead of Question objects,
+        so no relationship is ever loaded lazily.
+        '''
+        if fields is None:
+            return db.session.query(Question.id, Question.question, Question.answer,
+                                    Question.category_id.label('category'), Question.difficulty)
+        columns = {
+            'id': Question.id,
+            'question': Question.question,
+            'answer': Question.answer,
+            'category': Question.category_id.label('category'),
+            'difficulty': Question.difficulty
+        }
+        return db.session.query(*(columns[field] for field in fields))
+
+    @staticmethod
+    def format_row(row, fields=None):
+        if fields is not None:
+            return {field: getattr(row, field) for field in fields}
+        return {
+            'id': row.id,
+            'question': row.question,
+            'answer': row.answer,
+            'category': row.category,
+            'difficulty': row.difficulty
+        }
+
     def format(self):
         return {
             'id': self.id,
             'question': self.question,
             'answer': self.answer,
-            'category': self.category.id,
+            'category': self.category_id,
             'difficulty': self.difficulty
         }
 
     def __str__(self):
         return str(self.format())
+
+
+'''
+question_counters
+    maintained total, per category and per difficulty question counts
+
+'''
+
+question_counters = QuestionCounters(loader=Question.grouped_counts)
+
+'''
+question_selection
+    in-memory question ids per category to pick random quiz questions
+
+'''
+
+question_selection = QuestionSelectionIndex(loader=Question.ids_by_category)
+
+'''
+question_search
+    in-process inverted index for full-text search where PostgreSQL is not available
+
+'''
+
+question_search = InvertedIndex(loader=Question.search_documents)
+
+'''
+response_cache
+    serialized responses of listing endpoints, invalidated per category by writes
+
+'''
+
+response_cache = ResponseCache()
+
+'''
+data_versions
+    global and per category data versions validating cached responses (ETag / Last-Modified)
+
+'''
+
+data_versions = DataVersions(loader=Question.category_fingerprints, on_change=response_cache.invalidate)
+
+for search_statement in POSTGRES_SEARCH_DDL:
+    event.listen(Question.__table__, 'after_create', DDL(search_statement).execute_if(dialect='postgresql'))
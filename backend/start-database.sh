@@ -22,12 +22,10 @@ sleep 10
 # creates triviadb and trivia_test dbs;
 docker exec -i trivia_dbms psql -U postgres < init.sql
 
-# inits, migrates and upgrades db schema using Flask-Migrate
+# creates the schema of triviadb from the shipped migrations (incl. full-text search columns, trigger and indexes)
 source venv/bin/activate
 export FLASK_APP=flaskr
 export FLASK_ENV=development
-flask db init
-flask db migrate
 flask db upgrade
 
 # seed production database
@@ -36,3 +34,9 @@ docker exec -i trivia_dbms psql -U postgres -d triviadb < trivia_content.psql
 # seed testing database
 docker exec -i trivia_dbms psql -U postgres -d trivia_test < trivia.psql
 docker exec -i trivia_dbms psql -U postgres -d trivia_test -c "ALTER TABLE questions RENAME category TO category_id"
+
+# marks trivia_test (created by trivia.psql) as being at the baseline revision, adds the full-text search columns,
+# trigger and indexes of the baseline and upgrades it to the latest revision
+TRIVIA_SETTINGS=app_test.cfg flask db stamp f8c39322da34
+TRIVIA_SETTINGS=app_test.cfg flask install-search
+TRIVIA_SETTINGS=app_test.cfg flask db upgrade
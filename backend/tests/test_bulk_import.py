@@ -0,0 +1,115 @@
+import csv
+import unittest
+
+from flaskr.bulk_import import *
+
+
+class Category:
+    def __init__(self, id, type):
+        self.id = id
+        self.type = type
+
+
+class TestBulkImport(unittest.TestCase):
+    """
+    Testing parsing and validation of bulk imports.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_bulk_import.TestBulkImport
+    """
+
+    def setUp(self):
+        self.categories = category_map([Category(1, "Science"), Category(6, "Sports")])
+
+    def test_parse_ndjson(self):
+        lines = [
+            b'{"question": "q1"}\n',
+            b'\n',
+            b'not json\n',
+            b'[1, 2]\n',
+            b'{"question": "q2"}',
+        ]
+
+        parsed = list(parse_rows('application/x-ndjson', lines))
+
+        self.assertEqual([line_number for line_number, _, _ in parsed], [1, 3, 4, 5])
+        self.assertEqual(parsed[0][1], {"question": "q1"})
+        self.assertIsNotNone(parsed[1][2])
+        self.assertEqual(parsed[2][2], INVALID_ROW_MESSAGE)
+        self.assertEqual(parsed[3][1], {"question": "q2"})
+
+    def test_parse_csv(self):
+        lines = [
+            b'question,answer,category,difficulty\n',
+            b'"Who, if anyone?",Nobody,Sports,2\n',
+            b'q2,a2,1,3\n',
+        ]
+
+        parsed = list(parse_rows('text/csv', lines))
+
+        self.assertEqual([line_number for line_number, _, _ in parsed], [2, 3])
+        self.assertEqual(parsed[0][1]['question'], "Who, if anyone?")
+        self.assertEqual(parsed[1][1]['difficulty'], "3")
+
+    def test_parse_csv_reports_invalid_rows(self):
+        lines = [
+            b'question,answer,category,difficulty\n',
+            b'q\xff1,a1,1,2\n',
+            b'"multi\n',
+            b'line\xfe",a2,1,2\n',
+            b'q3,a3,1,3\n',
+            b'"' + b'x' * (csv.field_size_limit() + 1) + b'",a4,1,2\n',
+            b'q5,a5,1,3\n',
+        ]
+
+        parsed = list(parse_rows('text/csv', lines))
+
+        self.assertEqual([(line_number, error) for line_number, _, error in parsed], [
+            (2, INVALID_ENCODING_MESSAGE),
+            (4, INVALID_ENCODING_MESSAGE),
+            (5, None),
+            (6, "Error: invalid CSV: field larger than field limit (%d)" % csv.field_size_limit()),
+            (7, None),
+        ])
+        self.assertEqual(parsed[2][1]['question'], "q3")
+        self.assertEqual(parsed[4][1]['question'], "q5")
+
+    def test_parse_csv_with_invalid_header(self):
+        parsed = list(parse_rows('text/csv', [b'question\xff,answer\n', b'q,a\n', b'q2,a2\n']))
+
+        self.assertEqual(parsed, [(2, None, INVALID_HEADER_MESSAGE)])
+
+    def test_unsupported_mimetype(self):
+        with self.assertRaises(ValueError):
+            parse_rows('application/json', [])
+
+    def test_question_values(self):
+        self.assertEqual(
+            question_values({"question": "q", "answer": "a", "category": "sports", "difficulty": "2"}, self.categories),
+            {"question": "q", "answer": "a", "category_id": 6, "difficulty": 2}
+        )
+        self.assertEqual(
+            question_values({"question": "q", "answer": "a", "category": 1, "difficulty": 4}, self.categories),
+            {"question": "q", "answer": "a", "category_id": 1, "difficulty": 4}
+        )
+
+    def test_invalid_question_values(self):
+        test_values = [
+            {"answer": "a", "category": 1, "difficulty": 4},
+            {"question": " ", "answer": "a", "category": 1, "difficulty": 4},
+            {"question": "q", "answer": 42, "category": 1, "difficulty": 4},
+            {"question": "q", "answer": "a", "category": 1, "difficulty": "hard"},
+            {"question": "q", "answer": "a", "category": 1, "difficulty": True},
+            {"question": "q", "answer": "a", "category": 3, "difficulty": 4},
+            {"question": "q", "answer": "a", "category": "Cooking", "difficulty": 4},
+            {"question": "q", "answer": "a", "category": None, "difficulty": 4},
+        ]
+
+        for idx, test_value in enumerate(test_values):
+            with self.assertRaises(ValueError, msg=f"No error for case {idx} with value {test_value}"):
+                question_values(test_value, self.categories)
+
+
+if __name__ == '__main__':
+    unittest.main()
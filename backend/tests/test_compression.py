@@ -0,0 +1,91 @@
+import gzip
+import unittest
+import zlib
+
+from flask import Flask, Response, jsonify, request
+
+from flaskr.compression import Compression
+
+
+class TestCompression(unittest.TestCase):
+    """
+    Testing the gzip compression of responses.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_compression.TestCompression
+    """
+
+    def setUp(self):
+        self.compression = Compression(level=6, min_size=100)
+        app = Flask(__name__)
+
+        @app.route('/large')
+        def large():
+            return jsonify({'items': list(range(100))})
+
+        @app.route('/small')
+        def small():
+            return jsonify({'items': []})
+
+        @app.route('/stream')
+        def stream():
+            return Response((f'{{"id": {idx}}}\n' for idx in range(1000)), mimetype='application/x-ndjson')
+
+        @app.route('/image')
+        def image():
+            return Response(b'0' * 1000, mimetype='image/png')
+
+        @app.after_request
+        def compress(response):
+            return self.compression.apply(request, response)
+
+        self.client = app.test_client()
+
+    def test_compresses_when_accepted(self):
+        plain = self.client.get('/large')
+        compressed = self.client.get('/large', headers={'Accept-Encoding': 'deflate, gzip'})
+
+        self.assertIsNone(plain.headers.get('Content-Encoding'))
+        self.assertEqual(plain.headers['Vary'], 'Accept-Encoding')
+        self.assertEqual(compressed.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(int(compressed.headers['Content-Length']), len(compressed.data))
+        self.assertLess(len(compressed.data), len(plain.data))
+        self.assertEqual(gzip.decompress(compressed.data), plain.data)
+
+    def test_respects_quality_zero(self):
+        response = self.client.get('/large', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+        self.assertIsNone(response.headers.get('Content-Encoding'))
+
+    def test_skips_small_bodies_and_other_types(self):
+        for path in ('/small', '/image'):
+            response = self.client.get(path, headers={'Accept-Encoding': 'gzip'})
+            self.assertIsNone(response.headers.get('Content-Encoding'), path)
+
+    def test_compresses_streams(self):
+        response = self.client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+        body = gzip.decompress(response.data).decode()
+
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(len(body.splitlines()), 1000)
+        self.assertTrue(body.endswith('{"id": 999}\n'))
+
+    def test_stream_sends_the_first_chunk_right_away(self):
+        rows = (f'{{"id": {idx}}}\n' for idx in range(10000))
+        compressed = Compression(flush_size=1024).stream(rows)
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        self.assertEqual(decompressor.decompress(next(compressed)), b'{"id": 0}\n')
+        pieces = list(compressed)
+        body = b'{"id": 0}\n' + b''.join(decompressor.decompress(piece) for piece in pieces)
+
+        self.assertEqual(body.decode().splitlines()[-1], '{"id": 9999}')
+        # flushed every flush_size bytes, not every row
+        self.assertLess(len(pieces), 150)
+
+    def test_deterministic(self):
+        self.assertEqual(self.compression.compress(b'x' * 1000), self.compression.compress(b'x' * 1000))
+
+
+if __name__ == "__main__":
+    unittest.main()
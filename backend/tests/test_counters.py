@@ -0,0 +1,107 @@
+import unittest
+
+from flaskr.counters import QuestionCounters, RECONCILE_ATTEMPTS
+
+
+class TestQuestionCounters(unittest.TestCase):
+    """
+    Testing the maintained question counters.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_counters.TestQuestionCounters
+    """
+
+    def setUp(self):
+        self.rows = [(1, 2, 3), (1, 4, 1), (6, 2, 2)]
+        self.loads = 0
+
+        def loader():
+            self.loads += 1
+            return list(self.rows)
+
+        self.counters = QuestionCounters(loader=loader)
+
+    def test_loads_lazily(self):
+        self.assertEqual(self.loads, 0)
+        self.assertEqual(self.counters.total(), 6)
+        self.assertEqual(self.counters.for_category(1), 4)
+        self.assertEqual(self.counters.for_category(6), 2)
+        self.assertEqual(self.counters.for_category(3), 0)
+        self.assertEqual(self.counters.for_difficulty(2), 5)
+        self.assertEqual(self.counters.for_difficulty(4), 1)
+        self.assertEqual(self.loads, 1)
+
+    def test_add(self):
+        self.counters.total()
+        self.counters.add(6, 4, 1)
+        self.counters.add(1, 2, -2)
+
+        self.assertEqual(self.counters.total(), 5)
+        self.assertEqual(self.counters.for_category(6), 3)
+        self.assertEqual(self.counters.for_category(1), 2)
+        self.assertEqual(self.counters.for_difficulty(4), 2)
+        self.assertEqual(self.counters.for_difficulty(2), 3)
+        self.assertEqual(self.loads, 1)
+
+    def test_add_before_load_is_ignored(self):
+        self.counters.add(6, 4, 1)
+
+        self.assertEqual(self.counters.total(), 6)
+
+    def test_reconcile_detects_drift(self):
+        self.counters.total()
+        self.assertFalse(self.counters.reconcile())
+
+        self.rows.append((3, 1, 5))
+        self.assertTrue(self.counters.reconcile())
+        self.assertEqual(self.counters.total(), 11)
+        self.assertEqual(self.counters.for_category(3), 5)
+
+    def test_reconcile_reloads_when_written_during_the_load(self):
+        self.counters.total()
+
+        def loader():
+            self.loads += 1
+            rows = list(self.rows)
+            if self.loads == 2:
+                # a question inserted after the rows were read, applied by add() before the load ends
+                self.rows = self.rows + [(6, 4, 1)]
+                self.counters.add(6, 4, 1)
+            return rows
+
+        self.counters.loader = loader
+        self.counters.reconcile()
+
+        self.assertEqual(self.loads, 3)
+        self.assertEqual(self.counters.total(), 7)
+        self.assertEqual(self.counters.for_category(6), 3)
+
+    def test_reconcile_keeps_the_last_load_under_constant_writes(self):
+        def loader():
+            self.loads += 1
+            self.counters.add(6, 4, 1)
+            return list(self.rows)
+
+        self.counters.loader = loader
+
+        self.assertEqual(self.counters.total(), 6)
+        self.assertEqual(self.loads, RECONCILE_ATTEMPTS)
+
+    def test_max_age(self):
+        self.counters.max_age = 0
+        self.counters.total()
+        self.counters.total()
+
+        self.assertEqual(self.loads, 2)
+
+    def test_invalidate(self):
+        self.counters.total()
+        self.counters.invalidate()
+        self.counters.total()
+
+        self.assertEqual(self.loads, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
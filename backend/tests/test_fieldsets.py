@@ -0,0 +1,44 @@
+import unittest
+
+from flask import Flask, request
+from werkzeug.exceptions import UnprocessableEntity
+
+from flaskr.fieldsets import requested_fields, prefers_minimal
+
+
+class TestFieldsets(unittest.TestCase):
+    """
+    Testing the parsing of sparse fieldsets and of the Prefer header.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_fieldsets.TestFieldsets
+    """
+
+    def setUp(self):
+        self.app = Flask(__name__)
+
+    def test_requested_fields(self):
+        with self.app.test_request_context('/questions?fields=difficulty, category,,difficulty'):
+            self.assertEqual(requested_fields(request), ('id', 'difficulty', 'category'))
+        with self.app.test_request_context('/questions?fields='):
+            self.assertEqual(requested_fields(request), ('id',))
+        with self.app.test_request_context('/questions'):
+            self.assertIsNone(requested_fields(request))
+
+    def test_unknown_field(self):
+        with self.app.test_request_context('/questions?fields=category,categories'):
+            with self.assertRaises(UnprocessableEntity):
+                requested_fields(request)
+            self.assertEqual(requested_fields(request, allowed=('id', 'category', 'categories')),
+                             ('id', 'category', 'categories'))
+
+    def test_prefers_minimal(self):
+        for header, expected in (('return=minimal', True), ('respond-async, Return=Minimal; x=1', True),
+                                 ('return=representation', False), ('', False)):
+            with self.app.test_request_context('/questions', headers={'Prefer': header}):
+                self.assertEqual(prefers_minimal(request), expected, header)
+
+
+if __name__ == "__main__":
+    unittest.main()
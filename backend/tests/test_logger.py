@@ -0,0 +1,124 @@
+import json
+import logging
+import os
+import queue
+import sys
+import tempfile
+import unittest
+
+from flaskr.logger import DeferredQueueHandler, DuplicateFilter, JsonFormatter, ProcessQueueListener, TextFormatter, \
+    LOG_FORMAT
+
+
+def make_record(msg='%s: 404', args=('/questions',), level=logging.ERROR, lineno=10, exc_info=None):
+    return logging.LogRecord('trivia_logger', level, __file__, lineno, msg, args, exc_info)
+
+
+class TestLogger(unittest.TestCase):
+    """
+    Testing the queue based logging pipeline.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_logger.TestLogger
+    """
+
+    def test_records_are_queued_unformatted(self):
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        record = make_record()
+
+        handler.handle(record)
+        queued = log_queue.get_nowait()
+
+        self.assertIs(queued, record)
+        self.assertEqual(queued.args, ('/questions',))
+        self.assertIsNone(queued.exc_text)
+
+    def test_listener_starts_with_the_first_record(self):
+        log_queue = queue.SimpleQueue()
+        written = []
+        target = logging.Handler()
+        target.emit = written.append
+        listener = ProcessQueueListener(log_queue, target)
+        handler = DeferredQueueHandler(log_queue, listener)
+        self.assertIsNone(listener._thread)
+
+        handler.handle(make_record())
+        thread = listener._thread
+        handler.handle(make_record())
+        listener.stop()
+
+        self.assertIsNotNone(thread)
+        self.assertEqual(len(written), 2)
+        listener.stop()
+
+    @unittest.skipUnless(hasattr(os, 'fork'), 'requires fork')
+    def test_forked_process_starts_its_own_listener(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            log_file = os.path.join(tmp_dir, 'trivia.log')
+            target = logging.FileHandler(log_file, delay=True)
+            target.setFormatter(logging.Formatter('%(process)d %(message)s'))
+            log_queue = queue.SimpleQueue()
+            listener = ProcessQueueListener(log_queue, target)
+            handler = DeferredQueueHandler(log_queue, listener)
+            handler.handle(make_record(msg='parent', args=()))
+
+            pid = os.fork()
+            if pid == 0:
+                # a worker of a pre-forking server, its records must not pile up in the queue
+                try:
+                    handler.handle(make_record(msg='child', args=()))
+                    listener.stop()
+                finally:
+                    os._exit(0)
+            os.waitpid(pid, 0)
+            listener.stop()
+            target.close()
+
+            with open(log_file) as file:
+                lines = sorted(file.read().split('\n')[:-1])
+        self.assertEqual(lines, sorted([f'{os.getpid()} parent', f'{pid} child']))
+
+    def test_duplicates_are_rate_limited(self):
+        duplicate_filter = DuplicateFilter(burst=2, interval=60, sample_rate=3)
+        passed = [duplicate_filter.filter(make_record()) for _ in range(8)]
+
+        self.assertEqual(passed, [True, True, False, False, True, False, False, True])
+        self.assertTrue(duplicate_filter.filter(make_record(lineno=11)))
+
+    def test_passing_record_counts_suppressed(self):
+        duplicate_filter = DuplicateFilter(burst=1, interval=60, sample_rate=3)
+        for _ in range(3):
+            duplicate_filter.filter(make_record())
+
+        record = make_record()
+        self.assertTrue(duplicate_filter.filter(record))
+        self.assertEqual(record.suppressed, 2)
+
+    def test_lower_levels_are_not_limited(self):
+        duplicate_filter = DuplicateFilter(burst=1, interval=60, sample_rate=100)
+        self.assertTrue(all(duplicate_filter.filter(make_record(level=logging.INFO)) for _ in range(5)))
+
+    def test_json_lines(self):
+        try:
+            raise ValueError('broken')
+        except ValueError:
+            record = make_record(exc_info=sys.exc_info())
+        record.suppressed = 3
+
+        entry = json.loads(JsonFormatter().format(record))
+
+        self.assertEqual(entry['message'], '/questions: 404')
+        self.assertEqual(entry['level'], 'ERROR')
+        self.assertIn('ValueError: broken', entry['exception'])
+        self.assertEqual(entry['suppressed'], 3)
+
+    def test_text_notes_suppressed(self):
+        record = make_record()
+        record.suppressed = 3
+        self.assertIn('(3 similar messages suppressed)', TextFormatter(LOG_FORMAT).format(record))
+
+
+if __name__ == "__main__":
+    unittest.main()
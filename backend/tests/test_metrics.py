@@ -0,0 +1,44 @@
+import unittest
+
+from flaskr.metrics import Histogram, RequestMetrics
+from flask import Flask
+
+
+class TestMetrics(unittest.TestCase):
+    """
+    Testing the request metrics.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_metrics.TestMetrics
+    """
+
+    def test_histogram(self):
+        histogram = Histogram((0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2.0):
+            histogram.observe(value)
+
+        self.assertEqual(list(histogram.cumulative_counts()), [('0.1', 2), ('1.0', 3), ('+Inf', 4)])
+        self.assertEqual(histogram.count, 4)
+        self.assertAlmostEqual(histogram.sum, 2.65)
+
+    def test_render(self):
+        metrics = RequestMetrics()
+        with Flask(__name__).app_context():
+            for status in (200, 200, 404):
+                metrics.start()
+                metrics.finish('/questions', 'GET', status)
+            # not started, e.g. a second finish of the same request
+            metrics.finish('/questions', 'GET', 200)
+
+        text = metrics.render()
+
+        self.assertIn('trivia_http_requests_total{route="/questions",method="GET",status="200"} 2', text)
+        self.assertIn('trivia_http_requests_total{route="/questions",method="GET",status="404"} 1', text)
+        self.assertIn('trivia_http_request_duration_seconds_count{route="/questions",method="GET"} 3', text)
+        self.assertIn('trivia_sql_statements_per_request_bucket{route="/questions",method="GET",le="0"} 3', text)
+        self.assertIn('trivia_sql_duration_seconds_total{route="/questions",method="GET"} 0.0', text)
+
+
+if __name__ == "__main__":
+    unittest.main()
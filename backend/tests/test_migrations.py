@@ -0,0 +1,107 @@
+import os
+import tempfile
+import unittest
+
+from alembic.autogenerate import compare_metadata
+from alembic.migration import MigrationContext
+from click.testing import CliRunner
+from flask.cli import FlaskGroup
+from flask_migrate import downgrade, upgrade
+from sqlalchemy import create_engine, inspect, text
+
+from flaskr import create_app
+from models import db, Category, Question
+
+
+class TestMigrations(unittest.TestCase):
+    """
+    Testing the migrations on an empty SQLite database.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_migrations.TestMigrations
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.database_uri = f'sqlite:///{self.tmp_dir.name}/trivia_migrations.db'
+        self.previous_settings = os.environ.get('TRIVIA_SETTINGS')
+        self.app = self.create_app(DB_CREATE_ALL=False)
+
+    def create_app(self, **settings):
+        """ An app of the SQLite database only (not the one of app_test.cfg), by a TRIVIA_SETTINGS file """
+        settings_file = os.path.join(self.tmp_dir.name, 'app_migrations.cfg')
+        with open(settings_file, 'w') as file:
+            file.write(f'SQLALCHEMY_DATABASE_URI = "{self.database_uri}"\n'
+                       'SQLALCHEMY_TRACK_MODIFICATIONS = False\n')
+            for name, value in settings.items():
+                file.write(f'{name} = {value!r}\n')
+        os.environ['TRIVIA_SETTINGS'] = settings_file
+        return create_app(test_config=False)
+
+    def tearDown(self):
+        if self.previous_settings is None:
+            del os.environ['TRIVIA_SETTINGS']
+        else:
+            os.environ['TRIVIA_SETTINGS'] = self.previous_settings
+        with self.app.app_context():
+            db.session.remove()
+            db.engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_upgrade_matches_models(self):
+        with self.app.app_context():
+            upgrade()
+
+            indexes = {index['name']: index['column_names'] for index in inspect(db.engine).get_indexes('questions')}
+            self.assertEqual(indexes, {'ix_questions_category_id_id': ['category_id', 'id'],
+                                       'ix_questions_difficulty': ['difficulty']})
+            self.assertEqual(indexes.keys(), {index.name for index in Question.__table__.indexes})
+
+            with db.engine.connect() as connection:
+                self.assertEqual(compare_metadata(MigrationContext.configure(connection), db.metadata), [])
+
+    def test_categories_of_other_tools_are_modified(self):
+        # like the COPY of trivia_content.psql after flask db upgrade, which leaves out modified_at
+        with self.app.app_context():
+            upgrade()
+            db.session.execute(text("INSERT INTO categories (id, type) VALUES (1, 'Science')"))
+            db.session.commit()
+
+            self.assertIsNotNone(db.session.query(Category.modified_at).filter(Category.id == 1).scalar())
+
+    def test_flask_db_upgrade_creates_new_database(self):
+        # default settings: only being created by flask db keeps the app from creating the tables
+        cli = FlaskGroup(create_app=lambda: self.create_app())
+        result = CliRunner().invoke(cli, ['db', 'upgrade'], catch_exceptions=False)
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        engine = create_engine(self.database_uri)
+        try:
+            with engine.connect() as connection:
+                self.assertEqual(MigrationContext.configure(connection).get_current_revision(), 'a3d7c1e9b052')
+            self.assertEqual(set(inspect(engine).get_table_names()), {'alembic_version', 'categories', 'questions'})
+        finally:
+            engine.dispose()
+
+    def test_downgrade_to_base(self):
+        with self.app.app_context():
+            upgrade()
+            downgrade(revision='base')
+
+            self.assertEqual(inspect(db.engine).get_table_names(), ['alembic_version'])
+
+    def test_init_db_stamps_latest_revision(self):
+        result = self.app.test_cli_runner().invoke(args=['init-db'])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        with self.app.app_context():
+            with db.engine.connect() as connection:
+                context = MigrationContext.configure(connection)
+                self.assertEqual(context.get_current_revision(), 'a3d7c1e9b052')
+            self.assertIn('ix_questions_difficulty',
+                          {index['name'] for index in inspect(db.engine).get_indexes('questions')})
+
+
+if __name__ == "__main__":
+    unittest.main()
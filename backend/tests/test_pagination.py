@@ -0,0 +1,33 @@
+import unittest
+
+from flaskr.pagination import *
+
+
+class TestPagination(unittest.TestCase):
+    """
+    Testing cursor helpers of the keyset pagination.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_pagination.TestPagination
+    """
+
+    def test_cursor_round_trip(self):
+        for question_id in [1, 10, 23, 500000]:
+            cursor = encode_cursor(question_id)
+            self.assertFalse(cursor.isdigit())
+            self.assertEqual(decode_cursor(cursor), question_id)
+
+    def test_decode_cursor_accepts_plain_ids(self):
+        self.assertEqual(decode_cursor("23"), 23)
+
+    def test_decode_cursor_rejects_invalid_cursors(self):
+        test_values = ["not a cursor", "eDox", "cTph", "-1", "%%%"]
+
+        for idx, test_value in enumerate(test_values):
+            with self.assertRaises(ValueError, msg=f"No error for case {idx} with value {test_value}"):
+                decode_cursor(test_value)
+
+
+if __name__ == '__main__':
+    unittest.main()
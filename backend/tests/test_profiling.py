@@ -0,0 +1,65 @@
+import unittest
+
+from sqlalchemy import create_engine
+
+from flaskr.profiling import RequestProfiler, SlowQuery, SlowQueryLog
+
+
+class TestProfiling(unittest.TestCase):
+    """
+    Testing the request profiler and the slow query log.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_profiling.TestProfiling
+    """
+
+    def test_one_profile_at_a_time(self):
+        profiler = RequestProfiler(max_profiles=2)
+        first = profiler.start()
+
+        self.assertIsNotNone(first)
+        self.assertIsNone(profiler.start())
+
+        profile_id = profiler.stop(first, '/play', 'POST', 200)
+        self.assertEqual(profiler.get(profile_id)['route'], '/play')
+        second = profiler.start()
+        self.assertIsNotNone(second)
+        profiler.stop(second, '/play', 'POST', 200)
+
+    def test_reserved_id(self):
+        profiler = RequestProfiler()
+        profile_id = profiler.next_id()
+        stored_id = profiler.stop(profiler.start(), '/play', 'POST', 200, profile_id)
+        next_id = profiler.stop(profiler.start(), '/play', 'POST', 200)
+
+        self.assertEqual(stored_id, profile_id)
+        self.assertEqual(profiler.get(profile_id)['status'], 200)
+        self.assertGreater(next_id, profile_id)
+
+    def test_keeps_latest_profiles(self):
+        profiler = RequestProfiler(max_profiles=2)
+        ids = [profiler.stop(profiler.start(), '/play', 'POST', 200) for _ in range(3)]
+
+        self.assertEqual([profile['id'] for profile in profiler.list()], ids[:0:-1])
+        self.assertIsNone(profiler.get(ids[0]))
+
+    def test_slow_query_ring(self):
+        engine = create_engine('sqlite://')
+        log = SlowQueryLog(threshold=0.1, max_entries=2)
+        for number in range(3):
+            log.record(SlowQuery(engine, f'SELECT {number}', (), 0.2, '/play'))
+
+        self.assertEqual([entry.statement for entry in log.entries()], ['SELECT 2', 'SELECT 1'])
+
+    def test_explain(self):
+        engine = create_engine('sqlite://')
+        slow_query = SlowQuery(engine, 'SELECT ? + 1', [(1,), (2,)], 0.2, None)
+
+        self.assertEqual(slow_query.parameters, (1,))
+        self.assertGreater(len(slow_query.explain()), 0)
+        self.assertEqual(slow_query.format()['route'], None)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+
+from flaskr.quiz_session import *
+from flaskr.selection import QuestionSelectionIndex
+
+
+class TestQuizSession(unittest.TestCase):
+    """
+    Testing the stateless quiz sessions.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_quiz_session.TestQuizSession
+    """
+
+    def setUp(self):
+        rows = [(question_id, question_id % 3) for question_id in range(1, 31)]
+        self.index = QuestionSelectionIndex(loader=lambda: rows)
+
+    def test_permute_is_a_bijection(self):
+        for size in [1, 2, 3, 7, 16, 17, 100, 1000]:
+            for seed in [0, 1, 4242]:
+                positions = [permute(position, size, seed) for position in range(size)]
+                self.assertEqual(sorted(positions), list(range(size)), f"No bijection for {size} and {seed}")
+
+    def test_permute_depends_on_seed(self):
+        self.assertNotEqual([permute(position, 100, 1) for position in range(100)],
+                            [permute(position, 100, 2) for position in range(100)])
+
+    def test_token_round_trip(self):
+        quiz_session = QuizSession(seed=12345, category_id=6, phase=FILL_PHASE, cursor=3)
+        token = dump_quiz_session(quiz_session, 'secret')
+
+        self.assertEqual(load_quiz_session(token, 'secret'), quiz_session)
+
+    def test_invalid_tokens_are_rejected(self):
+        token = dump_quiz_session(new_quiz_session(6), 'secret')
+        test_values = [
+            [token, 'other secret'],
+            [token[:-2], 'secret'],
+            ['not a token', 'secret'],
+            [URLSafeSerializer('secret', salt=QUIZ_SESSION_SALT).dumps([1, 2]), 'secret'],
+        ]
+
+        for idx, (test_token, secret_key) in enumerate(test_values):
+            with self.assertRaises(ValueError, msg=f"No error for case {idx}"):
+                load_quiz_session(test_token, secret_key)
+
+    def test_walks_category_then_remaining_questions_once(self):
+        quiz_session = new_quiz_session(1)
+        asked = []
+
+        while True:
+            question_id, quiz_session = next_question_id(quiz_session, self.index)
+            if question_id is None:
+                break
+            asked.append(question_id)
+
+        self.assertEqual(len(asked), 30)
+        self.assertEqual(sorted(asked), list(range(1, 31)))
+        self.assertTrue(all(question_id % 3 == 1 for question_id in asked[:10]))
+
+    def test_all_categories(self):
+        quiz_session = new_quiz_session(None)
+        asked = set()
+
+        for _ in range(30):
+            question_id, quiz_session = next_question_id(quiz_session, self.index)
+            asked.add(question_id)
+
+        self.assertEqual(len(asked), 30)
+        self.assertEqual(next_question_id(quiz_session, self.index)[0], None)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,58 @@
+import tempfile
+import unittest
+
+from sqlalchemy import create_engine
+
+from flaskr.replicas import ReplicaSet
+
+
+class TestReplicaSet(unittest.TestCase):
+    """
+    Testing the round-robin and health checks of the read replicas.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_replicas.TestReplicaSet
+    """
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.first = create_engine(f'sqlite:///{self.tmp_dir.name}/first.db')
+        self.second = create_engine(f'sqlite:///{self.tmp_dir.name}/second.db')
+        self.broken = create_engine(f'sqlite:///{self.tmp_dir.name}/missing/broken.db')
+
+    def tearDown(self):
+        for engine in (self.first, self.second, self.broken):
+            engine.dispose()
+        self.tmp_dir.cleanup()
+
+    def test_round_robin(self):
+        replicas = ReplicaSet([self.first, self.second])
+        self.assertEqual([replicas.engine() for _ in range(4)], [self.first, self.second, self.first, self.second])
+        self.assertEqual([replica['reads'] for replica in replicas.snapshot()], [2, 2])
+
+    def test_skips_unhealthy_replica(self):
+        replicas = ReplicaSet([self.broken, self.first])
+        self.assertEqual([replicas.engine() for _ in range(3)], [self.first] * 3)
+
+        snapshot = replicas.snapshot()
+        self.assertEqual(snapshot[0]['healthy'], False)
+        self.assertGreater(snapshot[0]['failures'], 0)
+
+    def test_no_healthy_replica(self):
+        replicas = ReplicaSet([self.broken])
+        self.assertIsNone(replicas.engine())
+
+    def test_recovers_after_check_interval(self):
+        replicas = ReplicaSet([self.first], check_interval=0)
+        replicas.replicas[0].healthy = False
+        self.assertEqual(replicas.engine(), self.first)
+
+    def test_lagging_replica_is_skipped(self):
+        replicas = ReplicaSet([self.first], max_lag=-1)
+        self.assertIsNone(replicas.engine())
+        self.assertEqual(replicas.snapshot()[0]['lag_seconds'], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import os
+import unittest
+
+from flaskr.request_schemas import RequestSchema, ValidationError, compile_definitions, compile_pattern, \
+    load_definitions
+
+DEFINITIONS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'flaskr', 'docs', 'definitions.yaml')
+
+
+class TestRequestSchemas(unittest.TestCase):
+    """
+    Testing the request schemas compiled from the API definitions.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_request_schemas.TestRequestSchemas
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.schemas = compile_definitions(load_definitions(DEFINITIONS))
+
+    def test_compiles_request_definitions_only(self):
+        self.assertEqual(set(self.schemas), {'CreateQuestionRequest', 'SearchQuestionsRequest', 'PlayTriviaRequest',
+                                             'BulkDeleteQuestionsRequest', 'BulkUpdateQuestionsRequest'})
+
+    def test_valid_create_question(self):
+        schema = self.schemas['CreateQuestionRequest']
+        self.assertEqual(schema.errors({'question': 'Q?', 'answer': 'A', 'category': 1, 'difficulty': 2}), [])
+        self.assertEqual(schema.errors({'question': 'Q?', 'answer': 'A', 'category': '1', 'difficulty': '2'}), [])
+
+    def test_pattern_matches_the_whole_string(self):
+        schema = self.schemas['CreateQuestionRequest']
+        errors = schema.errors({'question': 'Q?', 'answer': 'A', 'category': '1\n', 'difficulty': '3\n'})
+
+        self.assertEqual(len(errors), 2)
+        self.assertEqual(compile_pattern('^[$]+$').search('$$\n'), None)
+        self.assertIsNotNone(compile_pattern(r'^\$[0-9]+$').search('$12'))
+
+    def test_reports_all_errors_at_once(self):
+        errors = self.schemas['CreateQuestionRequest'].errors({'question': 1, 'category': 'x', 'difficulty': True})
+
+        self.assertEqual(len(errors), 4)
+        self.assertTrue(any("'question'" in error for error in errors))
+        self.assertTrue(any("'answer'" in error for error in errors))
+        self.assertTrue(any("'category'" in error for error in errors))
+        self.assertTrue(any("'difficulty'" in error for error in errors))
+
+    def test_search_term_length_and_flags(self):
+        schema = self.schemas['SearchQuestionsRequest']
+        self.assertEqual(schema.errors({'searchTerm': 'title', 'includeAnswers': True, 'rank': False}), [])
+        self.assertEqual(len(schema.errors({'searchTerm': 'abc'})), 1)
+        self.assertEqual(len(schema.errors({'searchTerm': 'title', 'includeAnswers': 'yes', 'rank': 1})), 2)
+
+    def test_play_previous_questions(self):
+        schema = self.schemas['PlayTriviaRequest']
+        self.assertEqual(schema.errors({'previous_questions': []}), [])
+        self.assertEqual(schema.errors({'previous_questions': list(range(10000))}), [])
+        self.assertEqual(len(schema.errors({'previous_questions': [1, True]})), 1)
+        self.assertEqual(len(schema.errors({'previous_questions': [1, -2, 'x']})), 1)
+        self.assertEqual(len(schema.errors({'previous_questions': 1})), 1)
+
+    def test_play_count_range(self):
+        schema = self.schemas['PlayTriviaRequest']
+        self.assertEqual(schema.errors({'count': 5}), [])
+        self.assertEqual(len(schema.errors({'count': 0})), 1)
+        self.assertEqual(len(schema.errors({'count': 51})), 1)
+        self.assertEqual(len(schema.errors({'count': '5'})), 1)
+
+    def test_play_nested_category_and_session(self):
+        schema = self.schemas['PlayTriviaRequest']
+        self.assertEqual(schema.errors({'session': None, 'quiz_category': {'type': 'Sports', 'id': '6'}}), [])
+
+        errors = schema.errors({'session': 1, 'quiz_category': {'type': 'Sports', 'id': 'six'}})
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(any("'quiz_category.id'" in error for error in errors))
+
+        self.assertEqual(len(schema.errors({'quiz_category': {}})), 2)
+
+    def test_body_must_be_an_object(self):
+        self.assertEqual(len(self.schemas['PlayTriviaRequest'].errors([1, 2])), 1)
+
+    def test_validate_raises_with_errors(self):
+        schema = RequestSchema('Test', {'type': 'object', 'required': ['a', 'b'],
+                                        'properties': {'a': {'type': 'integer'}, 'b': {'type': 'string'}}})
+        schema.validate({'a': 1, 'b': 'b'})
+
+        with self.assertRaises(ValidationError) as context:
+            schema.validate({})
+        self.assertEqual(context.exception.code, 422)
+        self.assertEqual(len(context.exception.errors), 2)
+
+    def test_unsupported_type(self):
+        with self.assertRaises(ValueError):
+            RequestSchema('Test', {'type': 'date'})
+
+
+if __name__ == "__main__":
+    unittest.main()
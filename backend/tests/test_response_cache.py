@@ -0,0 +1,135 @@
+import gzip
+import time
+import unittest
+from unittest import mock
+
+from flask import Flask, jsonify
+
+from flaskr.compression import Compression
+from flaskr.response_cache import ResponseCache, LRUCacheBackend
+
+
+class TestLRUCacheBackend(unittest.TestCase):
+    """
+    Testing the in-process backend of the response cache.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_response_cache.TestLRUCacheBackend
+    """
+
+    def test_evicts_least_recently_used(self):
+        backend = LRUCacheBackend(max_entries=2)
+        backend.set('a', b'1', None)
+        backend.set('b', b'2', None)
+        backend.get('a')
+        backend.set('c', b'3', None)
+
+        self.assertEqual(backend.get('a'), b'1')
+        self.assertIsNone(backend.get('b'))
+        self.assertEqual(backend.get('c'), b'3')
+        self.assertEqual(backend.stats()['evictions'], 1)
+
+    def test_expires(self):
+        backend = LRUCacheBackend()
+        backend.set('a', b'1', 0.01)
+        time.sleep(0.02)
+
+        self.assertIsNone(backend.get('a'))
+        self.assertEqual(backend.stats()['expirations'], 1)
+
+    def test_generations(self):
+        backend = LRUCacheBackend()
+        self.assertEqual(backend.generation('all'), 0)
+        backend.increment('all')
+        self.assertEqual(backend.generation('all'), 1)
+
+
+class TestResponseCache(unittest.TestCase):
+    """
+    Testing the read-through response cache.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_response_cache.TestResponseCache
+    """
+
+    def setUp(self):
+        self.cache = ResponseCache(LRUCacheBackend(), ttl=60)
+        self.calls = 0
+        app = self.app = Flask(__name__)
+
+        @app.route('/items')
+        @self.cache.cached
+        def items():
+            self.calls += 1
+            return jsonify({'calls': self.calls})
+
+        @app.route('/categories/<int:category_id>/items')
+        @self.cache.cached
+        def category_items(category_id):
+            self.calls += 1
+            return jsonify({'category': category_id, 'calls': self.calls})
+
+        self.client = app.test_client()
+
+    def test_hit_skips_view(self):
+        first = self.client.get('/items?page=1&limit=2')
+        second = self.client.get('/items?limit=2&page=1')
+
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(second.mimetype, 'application/json')
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()['hits'], 1)
+        self.assertEqual(self.cache.stats()['misses'], 1)
+
+    def test_keyed_by_query_and_view_args(self):
+        self.client.get('/items?page=1')
+        self.client.get('/items?page=2')
+        self.client.get('/categories/1/items')
+        self.client.get('/categories/2/items')
+
+        self.assertEqual(self.calls, 4)
+
+    def test_invalidate_category(self):
+        self.client.get('/items')
+        self.client.get('/categories/1/items')
+        self.client.get('/categories/2/items')
+
+        self.cache.invalidate(1)
+        self.client.get('/items')
+        self.client.get('/categories/1/items')
+        self.client.get('/categories/2/items')
+
+        self.assertEqual(self.calls, 5)
+
+    def test_stores_compressed_body(self):
+        compression = self.app.extensions['compression'] = Compression(min_size=0)
+        headers = {'Accept-Encoding': 'gzip'}
+
+        with mock.patch.object(compression, 'compress', wraps=compression.compress) as compress:
+            plain = self.client.get('/items')
+            first = self.client.get('/items', headers=headers)
+            second = self.client.get('/items', headers=headers)
+
+        self.assertEqual(compress.call_count, 1)
+        self.assertNotIn('Content-Encoding', plain.headers)
+        self.assertEqual(second.headers['Content-Encoding'], 'gzip')
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(gzip.decompress(second.data), plain.data)
+        self.assertEqual(self.calls, 1)
+        self.assertEqual(self.cache.stats()['hits'], 2)
+        # both bodies in one entry, counted once against max_entries
+        self.assertEqual(self.cache.stats()['entries'], 1)
+
+    def test_disabled(self):
+        self.cache.backend = None
+        self.client.get('/items')
+        self.client.get('/items')
+
+        self.assertEqual(self.calls, 2)
+        self.assertFalse(self.cache.stats()['enabled'])
+
+
+if __name__ == "__main__":
+    unittest.main()
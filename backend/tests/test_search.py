@@ -0,0 +1,106 @@
+import unittest
+
+from flaskr.search import *
+
+
+class TestInvertedIndex(unittest.TestCase):
+    """
+    Testing the in-process full-text search index.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_search.TestInvertedIndex
+    """
+
+    def setUp(self):
+        self.documents = [
+            (1, "Which is the only team to play in every soccer World Cup tournament?", "Brazil"),
+            (2, "Which country won the first ever soccer World Cup in 1930?", "Uruguay"),
+            (3, "What is the heaviest organ in the human body?", "The Liver"),
+            (4, "Soccer, soccer, soccer: who scored most goals?", "Pele, a soccer legend"),
+            (5, "Who discovered penicillin?", "Alexander Fleming"),
+        ]
+        self.index = InvertedIndex(loader=lambda: list(self.documents))
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Soccer World-Cup, 1930?"), ["soccer", "world", "cup", "1930"])
+        self.assertEqual(tokenize(None), [])
+
+    def test_to_tsquery(self):
+        self.assertEqual(to_tsquery("Soccer in 1930"), "'soccer':* & 'in' & '1930':*")
+        self.assertEqual(to_tsquery("?!"), "")
+
+    def test_all_tokens_have_to_match(self):
+        self.assertEqual(self.index.search("world cup", ranked=False), [1, 2])
+        self.assertEqual(self.index.search("soccer 1930"), [2])
+        self.assertEqual(self.index.search("soccer penicillin"), [])
+
+    def test_prefix_match(self):
+        self.assertEqual(self.index.search("penic"), [5])
+        self.assertEqual(self.index.search("socc", ranked=False), [1, 2, 4])
+        # short tokens only match whole words
+        self.assertEqual(self.index.search("wh"), [])
+
+    def test_ranking(self):
+        self.assertEqual(self.index.search("soccer")[0], 4)
+
+    def test_include_answers(self):
+        self.assertEqual(self.index.search("liver"), [])
+        self.assertEqual(self.index.search("liver", include_answers=True), [3])
+        self.assertEqual(self.index.search("legend soccer", include_answers=True), [4])
+
+    def test_full_text_search_installed(self):
+        columns = ['id', 'question', 'answer', 'difficulty', 'category_id']
+        self.assertFalse(full_text_search_installed('postgresql', columns))
+        self.assertTrue(full_text_search_installed('postgresql', columns + list(POSTGRES_SEARCH_COLUMNS)))
+        self.assertFalse(full_text_search_installed('sqlite', columns + list(POSTGRES_SEARCH_COLUMNS)))
+
+    def test_add_and_remove(self):
+        self.index.search("soccer")
+        self.index.add(6, "Where was the first soccer world cup held?", "Uruguay")
+        self.assertEqual(self.index.search("held"), [6])
+
+        self.index.remove(6)
+        self.index.remove(5)
+        self.assertEqual(self.index.search("held"), [])
+        self.assertEqual(self.index.search("penicillin"), [])
+        self.assertEqual(self.index.search("soccer world", ranked=False), [1, 2])
+
+    def test_reload_again_when_written_during_the_load(self):
+        self.index.search("soccer")
+        loads = []
+
+        def loader():
+            loads.append(1)
+            documents = list(self.documents)
+            if len(loads) == 1:
+                # a question inserted and one deleted after the rows were read, applied before the load ends
+                self.documents = [document for document in self.documents if document[0] != 5] + \
+                                 [(6, "Where was the first soccer world cup held?", "Uruguay")]
+                self.index.add(6, "Where was the first soccer world cup held?", "Uruguay")
+                self.index.remove(5)
+            return documents
+
+        self.index.loader = loader
+        self.index.reload()
+
+        self.assertEqual(len(loads), 2)
+        self.assertEqual(self.index.search("held"), [6])
+        self.assertEqual(self.index.search("penicillin"), [])
+
+    def test_reload_keeps_the_last_load_under_constant_writes(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            self.index.remove(5)
+            return list(self.documents)
+
+        self.index.loader = loader
+
+        self.assertEqual(self.index.search("penicillin"), [5])
+        self.assertEqual(len(loads), RELOAD_ATTEMPTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import random
+import unittest
+
+from flaskr.selection import QuestionIdPool, QuestionSelectionIndex, RELOAD_ATTEMPTS
+
+
+class TestQuestionSelectionIndex(unittest.TestCase):
+    """
+    Testing the in-memory question selection index.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_selection.TestQuestionSelectionIndex
+    """
+
+    def setUp(self):
+        self.rows = [(1, 1), (2, 1), (3, 2), (4, 2), (5, 2), (6, None)]
+        self.index = QuestionSelectionIndex(loader=lambda: list(self.rows))
+
+    def test_pool_remove_keeps_positions(self):
+        pool = QuestionIdPool()
+        for question_id in range(10):
+            pool.add(question_id)
+        pool.remove(3)
+        pool.remove(9)
+        pool.remove(42)
+
+        self.assertEqual(len(pool), 8)
+        self.assertEqual(sorted(pool.ids), [0, 1, 2, 4, 5, 6, 7, 8])
+        for question_id, position in pool.positions.items():
+            self.assertEqual(pool.ids[position], question_id)
+
+    def test_pool_choice_is_uniform(self):
+        pool = QuestionIdPool()
+        for question_id in range(4):
+            pool.add(question_id)
+        rng = random.Random(0)
+
+        picks = [pool.choice(exclude={0}, rng=rng) for _ in range(3000)]
+
+        self.assertNotIn(0, picks)
+        for question_id in range(1, 4):
+            self.assertAlmostEqual(picks.count(question_id) / 3000, 1 / 3, delta=0.05)
+
+    def test_pool_sample_is_distinct(self):
+        pool = QuestionIdPool()
+        for question_id in range(100):
+            pool.add(question_id)
+        rng = random.Random(0)
+
+        for count, exclude in ((5, set()), (40, set(range(20))), (90, set(range(20)))):
+            sample = pool.sample(count, exclude=exclude, rng=rng)
+            self.assertEqual(len(sample), min(count, 100 - len(exclude)))
+            self.assertEqual(len(set(sample)), len(sample))
+            self.assertFalse(set(sample) & exclude)
+
+    def test_pick_many(self):
+        self.assertEqual(sorted(self.index.pick_many(2, 5)), [3, 4, 5])
+        self.assertEqual(self.index.pick_many(2, 5, exclude={3, 5}), [4])
+        self.assertEqual(len(self.index.pick_many(None, 4)), 4)
+        self.assertEqual(self.index.pick_many(42, 1), [])
+
+    def test_pool_add_and_remove_many(self):
+        pool = QuestionIdPool()
+        pool.add_many([5, 1, 3, 1])
+        pool.add_many([4, 2])
+        pool.remove_many({3, 5, 42})
+
+        self.assertEqual(pool.sorted_ids, [1, 2, 4])
+        self.assertEqual(sorted(pool.ids), [1, 2, 4])
+        for question_id, position in pool.positions.items():
+            self.assertEqual(pool.ids[position], question_id)
+
+    def test_add_and_remove_many(self):
+        self.index.pick()
+        self.index.remove_many([1, 3, 42])
+        self.index.add_many([(1, 2), (7, 3)])
+
+        self.assertEqual(self.index.size(), 6)
+        self.assertEqual(self.index.size(1), 1)
+        self.assertEqual(self.index.size(2), 3)
+        self.assertEqual(self.index.category_of(1), 2)
+        self.assertEqual(self.index.pick(3), 7)
+
+    def test_pick_from_category(self):
+        for _ in range(20):
+            self.assertIn(self.index.pick(2), [3, 4, 5])
+            self.assertIn(self.index.pick(), [1, 2, 3, 4, 5, 6])
+
+    def test_pick_excludes_previous_questions(self):
+        self.assertEqual(self.index.pick(2, exclude={3, 4}), 5)
+        self.assertIsNone(self.index.pick(2, exclude={3, 4, 5}))
+        self.assertIsNone(self.index.pick(42))
+
+    def test_add_and_remove(self):
+        self.index.pick()
+        self.index.add(7, 3)
+        self.assertEqual(self.index.pick(3), 7)
+
+        self.index.remove(7)
+        self.index.remove(1)
+        self.assertIsNone(self.index.pick(3))
+        self.assertEqual(self.index.pick(1), 2)
+        self.assertIsNone(self.index.pick(exclude={2, 3, 4, 5, 6}))
+
+    def test_reload_again_when_written_during_the_load(self):
+        self.index.pick()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            rows = list(self.rows)
+            if len(loads) == 1:
+                # a question inserted and one deleted after the rows were read, applied before the load ends
+                self.rows = [row for row in self.rows if row[0] != 1] + [(7, 3)]
+                self.index.add(7, 3)
+                self.index.remove(1)
+            return rows
+
+        self.index.loader = loader
+        self.index.reload()
+
+        self.assertEqual(len(loads), 2)
+        self.assertEqual(self.index.pick(3), 7)
+        self.assertEqual(self.index.pick(1), 2)
+
+    def test_reload_keeps_the_last_load_under_constant_writes(self):
+        loads = []
+
+        def loader():
+            loads.append(1)
+            self.index.add(7, 3)
+            return list(self.rows)
+
+        self.index.loader = loader
+
+        self.assertEqual(self.index.size(), 6)
+        self.assertEqual(len(loads), RELOAD_ATTEMPTS)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,17 @@ class TestValidation(unittest.TestCase):
                 f"Values did not match for case {idx} with value {test_value}"
             )
 
+    def test_check_bool(self):
+        test_values = [1, 1.0, True, False, None, "true"]
+        expected_results = [False, False, True, True, False, False]
+
+        for idx, (test_value, expected_result) in enumerate(zip(test_values, expected_results)):
+            self.assertEqual(
+                check_bool(test_value),
+                expected_result,
+                f"Values did not match for case {idx} with value {test_value}"
+            )
+
     def test_check_float(self):
         test_values = [1, 1.0, 1.3, False, None, "hello string"]
         expected_results = [False, True, True, False, False, False]
@@ -0,0 +1,80 @@
+import unittest
+from datetime import datetime
+
+from flaskr.versions import DataVersions, ALL_CATEGORIES
+
+
+class TestDataVersions(unittest.TestCase):
+    """
+    Testing the data versions validating cached responses.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_versions.TestDataVersions
+    """
+
+    def setUp(self):
+        self.rows = [(1, 3, 10, 61, datetime(2026, 10, 1, 12)), (6, 2, 12, 35, datetime(2026, 10, 2, 12))]
+        self.loads = 0
+
+        def loader():
+            self.loads += 1
+            return list(self.rows)
+
+        self.versions = DataVersions(loader=loader)
+
+    def test_etag_is_stable(self):
+        self.assertEqual(self.versions.etag(), self.versions.etag())
+        self.assertEqual(self.versions.etag(1), self.versions.etag(1))
+        self.assertNotEqual(self.versions.etag(1), self.versions.etag(6))
+        self.assertEqual(self.loads, 1)
+
+    def test_last_modified(self):
+        self.assertEqual(self.versions.last_modified(), datetime(2026, 10, 2, 12))
+        self.assertEqual(self.versions.last_modified(1), datetime(2026, 10, 1, 12))
+        self.assertIsNone(self.versions.last_modified(5))
+
+    def test_bump(self):
+        etags = {scope: self.versions.etag(scope) for scope in (ALL_CATEGORIES, 1, 6)}
+
+        # a question of category 1 inserted by this process
+        self.rows = [(1, 4, 11, 72, datetime(2026, 10, 3, 12)), (6, 2, 12, 35, datetime(2026, 10, 2, 12))]
+        self.versions.bump(1)
+
+        self.assertNotEqual(self.versions.etag(), etags[ALL_CATEGORIES])
+        self.assertNotEqual(self.versions.etag(1), etags[1])
+        self.assertEqual(self.versions.etag(6), etags[6])
+        self.assertEqual(self.versions.last_modified(1), datetime(2026, 10, 3, 12))
+        self.assertEqual(self.versions.last_modified(), datetime(2026, 10, 3, 12))
+        self.assertEqual(self.loads, 2)
+
+    def test_reconcile_detects_changes_of_other_processes(self):
+        etags = {scope: self.versions.etag(scope) for scope in (ALL_CATEGORIES, 1, 6)}
+
+        self.assertFalse(self.versions.reconcile())
+        # a question of category 6 deleted and another one inserted: same count, higher id
+        self.rows = [(1, 3, 10, 61, datetime(2026, 10, 1, 12)), (6, 2, 13, 38, datetime(2026, 10, 2, 12))]
+        self.assertTrue(self.versions.reconcile())
+
+        self.assertNotEqual(self.versions.etag(), etags[ALL_CATEGORIES])
+        self.assertEqual(self.versions.etag(1), etags[1])
+        self.assertNotEqual(self.versions.etag(6), etags[6])
+
+    def test_reconcile_detects_updates_of_other_processes(self):
+        etag = self.versions.etag(1)
+
+        # the difficulty of a question of category 1 updated: same count and highest id, other checksum
+        self.rows = [(1, 3, 10, 71, datetime(2026, 10, 1, 12)), (6, 2, 12, 35, datetime(2026, 10, 2, 12))]
+        self.assertTrue(self.versions.reconcile())
+
+        self.assertNotEqual(self.versions.etag(1), etag)
+
+    def test_validators_are_shared_between_instances(self):
+        other = DataVersions(loader=lambda: list(self.rows))
+        for scope in (ALL_CATEGORIES, 1, 5, 6):
+            self.assertEqual(self.versions.etag(scope), other.etag(scope))
+            self.assertEqual(self.versions.last_modified(scope), other.last_modified(scope))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,44 @@
+import unittest
+
+from flaskr.warm_up import WarmUp
+
+
+class TestWarmUp(unittest.TestCase):
+    """
+    Testing the warm-up steps run before the first request.
+
+    Inspection
+    ----------
+    > python -m unittest tests.test_warm_up.TestWarmUp
+    """
+
+    def test_runs_steps_in_order(self):
+        warm_up = WarmUp()
+        calls = []
+        warm_up.step('first')(lambda: calls.append('first'))
+        warm_up.step('second')(lambda: calls.append('second'))
+
+        timings = warm_up.run()
+
+        self.assertEqual(calls, ['first', 'second'])
+        self.assertEqual(list(timings), ['first', 'second'])
+        self.assertEqual(warm_up.timings, timings)
+
+    def test_failing_step_is_skipped(self):
+        warm_up = WarmUp()
+        calls = []
+
+        @warm_up.step('failing')
+        def failing():
+            raise RuntimeError('database not reachable')
+
+        warm_up.step('next')(lambda: calls.append('next'))
+
+        timings = warm_up.run()
+
+        self.assertEqual(calls, ['next'])
+        self.assertIn('failing', timings)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,6 +11,7 @@ class QuizView extends Component {
     this.state = {
         quizCategory: null,
         previousQuestions: [], 
+        upcomingQuestions: [],
         showAnswer: false,
         categories: {},
         numCorrect: 0,
@@ -47,6 +48,13 @@ class QuizView extends Component {
     const previousQuestions = [...this.state.previousQuestions]
     if(this.state.currentQuestion.id) { previousQuestions.push(this.state.currentQuestion.id) }
 
+    // the whole round is fetched with the first question
+    if(this.state.upcomingQuestions.length) {
+      const [nextQuestion, ...upcomingQuestions] = this.state.upcomingQuestions
+      this.showQuestion(nextQuestion, upcomingQuestions, previousQuestions)
+      return;
+    }
+
     $.ajax({
       url: '/play',
       type: "POST",
@@ -54,20 +62,16 @@ class QuizView extends Component {
       contentType: 'application/json',
       data: JSON.stringify({
         previous_questions: previousQuestions,
-        quiz_category: this.state.quizCategory
+        quiz_category: this.state.quizCategory,
+        count: questionsPerPlay - previousQuestions.length
       }),
       xhrFields: {
         withCredentials: true
       },
       crossDomain: true,
       success: (result) => {
-        this.setState({
-          showAnswer: false,
-          previousQuestions: previousQuestions,
-          currentQuestion: result.question,
-          guess: '',
-          forceEnd: result.question ? false : true
-        })
+        const [nextQuestion, ...upcomingQuestions] = result.questions
+        this.showQuestion(nextQuestion, upcomingQuestions, previousQuestions)
         return;
       },
       error: (error) => {
@@ -77,6 +81,17 @@ class QuizView extends Component {
     })
   }
 
+  showQuestion = (question, upcomingQuestions, previousQuestions) => {
+    this.setState({
+      showAnswer: false,
+      previousQuestions: previousQuestions,
+      upcomingQuestions: upcomingQuestions,
+      currentQuestion: question,
+      guess: '',
+      forceEnd: question ? false : true
+    })
+  }
+
   submitGuess = (event) => {
     event.preventDefault();
     const formatGuess = this.state.guess.replace(/[.,\/#!$%\^&\*;:{}=\-_`~()]/g,"").toLowerCase()
@@ -91,6 +106,7 @@ class QuizView extends Component {
     this.setState({
       quizCategory: null,
       previousQuestions: [], 
+      upcomingQuestions: [],
       showAnswer: false,
       numCorrect: 0,
       currentQuestion: {},